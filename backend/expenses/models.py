@@ -20,6 +20,9 @@ class Expense(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['date', 'created_at'], name='expenses_date_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description[:50]} - L {self.amount}"
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer
+
+from utils.pdf import build_data_table, build_header, build_summary_table, get_styles, render_pdf
+
+EXPENSES_MAX_ROWS = 200
+
+
+def render_expenses(queryset, date_range_text='', max_rows=EXPENSES_MAX_ROWS):
+    """Render the expenses report for an already filtered queryset."""
+    styles = get_styles()
+    expenses = queryset.order_by('-date', '-created_at')[:max_rows]
+    summary = queryset.aggregate(total=Sum('amount'), count=Count('id'))
+    total_amount = summary['total'] or 0
+
+    elements = build_header('Reporte de Gastos', with_logo=False, font_size=22, space_after=20)
+    if date_range_text:
+        elements.append(Paragraph(date_range_text, styles['Normal']))
+        elements.append(Spacer(1, 0.2 * inch))
+
+    elements.append(build_summary_table([
+        ['Cantidad de Gastos', str(summary['count'])],
+        ['Total (L)', f"L {total_amount:.2f}"],
+    ], font_size=10, shaded=False))
+    elements.append(Spacer(1, 0.3 * inch))
+
+    if expenses:
+        table_data = [['Fecha y Hora', 'Descripción', 'Monto (L)']]
+        for expense in expenses:
+            if expense.date:
+                base_date = datetime.combine(expense.date, datetime.min.time())
+                if expense.created_at:
+                    created_local = timezone.localtime(expense.created_at)
+                    base_date = base_date.replace(
+                        hour=created_local.hour,
+                        minute=created_local.minute,
+                        second=created_local.second,
+                        microsecond=created_local.microsecond
+                    )
+            else:
+                base_date = expense.created_at
+
+            display_value = base_date.strftime('%d/%m/%Y %H:%M') if base_date else 'N/D'
+
+            table_data.append([
+                display_value,
+                expense.description[:80],
+                f"L {expense.amount:.2f}",
+            ])
+
+        elements.append(build_data_table(
+            table_data,
+            [1.3 * inch, 4.2 * inch, 1.2 * inch],
+            font_size=10,
+            header_padding=10,
+            grid_width=0.5,
+            extra_styles=[('ALIGN', (2, 1), (-1, -1), 'RIGHT')],
+        ))
+    else:
+        elements.append(Paragraph('No hay gastos en el rango seleccionado.', styles['Normal']))
+
+    return render_pdf(elements)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ProductCategory, Product, StockMovement
+from .models import ProductCategory, Product, StockMovement, StockSnapshot
+from .services import stock_ledger
 
 
 @admin.register(ProductCategory)
@@ -19,6 +20,10 @@ class ProductAdmin(admin.ModelAdmin):
     ordering = ['name']
     list_per_page = 25
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        stock_ledger.record_edit(obj, form.initial['quantity_available'] if change else None)
+
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
@@ -27,3 +32,22 @@ class StockMovementAdmin(admin.ModelAdmin):
     search_fields = ['product__name', 'reference']
     ordering = ['-created_at']
     list_per_page = 25
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['product', 'date', 'balance', 'source', 'taken_at']
+    list_filter = ['source', 'date']
+    search_fields = ['product__name', 'product__sku']
+    ordering = ['-taken_at']
+    list_per_page = 25
+
+    # The ledger writes snapshots; editing one would rewrite history.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,87 @@
+"""Compact, versioned snapshot of the active catalog for the document editors.
+
+The quotation and sale forms need every active product for their
+picker. Instead of paging through ``products/``, they fetch this
+snapshot once and revalidate it with ``If-None-Match``. The version is
+the newest ``updated_at`` and the number of active products (every
+stock or price change touches ``updated_at``), plus the ``categories``
+report-cache tag for category renames. The JSON, and its gzip
+encoding, are cached under that version, so an unchanged catalog costs
+one aggregate query and no serialization.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, F, Max, Value, When
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from .models import LOW_STOCK, STOCK_STATUS_FILTERS, Product
+
+CATALOG_FIELDS = (
+    'id', 'name', 'sku', 'category', 'category_name', 'unit_measure',
+    'unit_price', 'price_per_square_inch', 'quantity_available', 'stock_status',
+)
+DECIMAL_FIELDS = ('unit_price', 'price_per_square_inch', 'quantity_available')
+
+
+def active_products():
+    return Product.objects.filter(is_active=True)
+
+
+def catalog_etag():
+    from reports.cache import tag_versions
+
+    version = active_products().aggregate(last_update=Max('updated_at'), count=Count('id'))
+    last_update = version['last_update'].timestamp() if version['last_update'] else 0
+    raw = f"{last_update}:{version['count']}:{tag_versions(['categories'])[0]}"
+    # Weak: the same version is served plain or gzipped.
+    return f'W/"catalog-{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def build_catalog(etag):
+    rows = list(
+        active_products()
+        .annotate(
+            category_name=F('category__name'),
+            stock_status=Case(
+                When(STOCK_STATUS_FILTERS['SIN_STOCK'], then=Value('SIN_STOCK')),
+                When(LOW_STOCK, then=Value('STOCK_BAJO')),
+                default=Value('DISPONIBLE'),
+                output_field=CharField(),
+            ),
+        )
+        .order_by('name', 'id')
+        .values(*CATALOG_FIELDS)
+    )
+    for row in rows:
+        for field in DECIMAL_FIELDS:
+            # Same representation as the product serializers.
+            row[field] = str(row[field])
+    body = JSONRenderer().render({'version': etag, 'count': len(rows), 'products': rows})
+    return {'json': body, 'gzip': compress_string(body)}
+
+
+def catalog_response(request):
+    """The catalog snapshot, or ``304`` when ``If-None-Match`` is current."""
+    from reports.cache import single_flight
+
+    etag = catalog_etag()
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    key = f'inventory:catalog:{etag}'
+    snapshot = cache.get(key) or single_flight(key, lambda: build_catalog(etag))
+    gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    response = HttpResponse(snapshot['gzip' if gzipped else 'json'], content_type='application/json')
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import stock_ledger
+from simple_inventory.services import stock_ledger as simple_stock_ledger
+from utils.ledger import RECONCILE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la existencia de cada producto con su historial de movimientos '
+        '(ambos inventarios) y, con --repair, corrige las diferencias.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Corregir las existencias que no cuadran.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE,
+            help='Productos revisados por consulta.',
+        )
+
+    def handle(self, *args, **options):
+        for label, ledger in (('Inventario', stock_ledger), ('Inventario manual', simple_stock_ledger)):
+            checked, mismatches, unverifiable = ledger.reconcile(
+                repair=options['repair'], chunk_size=options['chunk_size'],
+            )
+            for row in mismatches:
+                self.stdout.write(
+                    f"  {row['sku']} {row['name']}: existencia {row['quantity']}, "
+                    f"historial {row['expected']} ({row['difference']:+})"
+                )
+            verb = 'corregidos' if options['repair'] else 'con diferencias'
+            style = self.style.WARNING if mismatches and not options['repair'] else self.style.SUCCESS
+            self.stdout.write(style(f'{label}: {checked} productos revisados, {len(mismatches)} {verb}.'))
+            if unverifiable:
+                self.stdout.write(self.style.WARNING(
+                    f'{label}: {len(unverifiable)} productos sin saldo inicial no se pudieron verificar; '
+                    'ejecute snapshot_stock para registrarlo.'
+                ))
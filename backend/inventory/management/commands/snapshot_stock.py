@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import StockSnapshot
+from inventory.services import stock_ledger
+from simple_inventory.models import StockSnapshot as SimpleStockSnapshot
+from simple_inventory.services import stock_ledger as simple_stock_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda el saldo de cada producto con movimientos desde su último corte '
+        '(ejecutar cada noche; ambos inventarios).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Guardar también los productos sin movimientos desde su último corte.',
+        )
+
+    def handle(self, *args, **options):
+        for label, ledger, source in (
+            ('Inventario', stock_ledger, StockSnapshot.Source.NIGHTLY),
+            ('Inventario manual', simple_stock_ledger, SimpleStockSnapshot.Source.NIGHTLY),
+        ):
+            with transaction.atomic():
+                balances = ledger.snapshot_changed(source, include_unchanged=options['all'])
+            self.stdout.write(self.style.SUCCESS(f'{label}: {len(balances)} saldos guardados.'))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:32
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def open_ledger(apps, schema_editor):
+    """Snapshot current stock so as-of queries have a starting point."""
+    Product = apps.get_model('inventory', 'Product')
+    StockSnapshot = apps.get_model('inventory', 'StockSnapshot')
+    taken_at = timezone.now()
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(
+            product_id=product_id, date=timezone.localdate(taken_at), taken_at=taken_at,
+            balance=balance, source='NIGHTLY',
+        )
+        for product_id, balance in Product.objects.values_list('pk', 'quantity_available')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_movement_product_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('taken_at', models.DateTimeField(verbose_name='Tomado el')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Saldo')),
+                ('source', models.CharField(choices=[('NIGHTLY', 'Cierre diario'), ('CHECKPOINT', 'Punto de control'), ('ADJUSTMENT', 'Ajuste'), ('EDIT', 'Edición del producto')], max_length=20, verbose_name='Origen')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.product', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Inventario',
+                'verbose_name_plural': 'Saldos de Inventario',
+                'db_table': 'stock_snapshots',
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='stock_snap_product_taken_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
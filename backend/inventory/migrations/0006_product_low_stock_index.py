@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_snapshot_reconciled_source'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('quantity_available__lte', models.F('minimum_stock')), ('is_active', True)), fields=['name'], name='products_low_stock_idx'),
+        ),
+    ]
@@ -1,7 +1,16 @@
 from django.db import models
+from django.db.models import F, Q
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+# SQL twins of ``Product.is_low_stock`` / ``Product.stock_status``.
+LOW_STOCK = Q(quantity_available__lte=F('minimum_stock'))
+STOCK_STATUS_FILTERS = {
+    'SIN_STOCK': Q(quantity_available=0),
+    'STOCK_BAJO': LOW_STOCK & ~Q(quantity_available=0),
+    'DISPONIBLE': ~LOW_STOCK & ~Q(quantity_available=0),
+}
+
 
 class ProductCategory(models.Model):
     """Categories for inventory products."""
@@ -20,6 +29,19 @@ class ProductCategory(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def low_stock(self):
+        """At or below ``minimum_stock``; active ones are in a partial index."""
+        return self.filter(LOW_STOCK)
+
+    def with_stock_status(self, *statuses):
+        """Products in any of ``statuses`` (``SIN_STOCK``, ``STOCK_BAJO``, ``DISPONIBLE``)."""
+        query = Q()
+        for status in statuses:
+            query |= STOCK_STATUS_FILTERS[status]
+        return self.filter(query)
+
+
 class Product(models.Model):
     """Model for inventory products."""
     
@@ -83,10 +105,19 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True, verbose_name='Activo')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         db_table = 'products'
         ordering = ['name']
+        indexes = [
+            # Low-stock listings and counts read only the matching rows,
+            # already in name order, instead of the whole catalog.
+            models.Index(
+                fields=['name'], condition=LOW_STOCK & Q(is_active=True), name='products_low_stock_idx',
+            ),
+        ]
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
     
@@ -157,6 +188,9 @@ class StockMovement(models.Model):
     class Meta:
         db_table = 'stock_movements'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stock_mov_product_created_idx'),
+        ]
         verbose_name = 'Movimiento de Inventario'
         verbose_name_plural = 'Movimientos de Inventario'
     
@@ -165,15 +199,59 @@ class StockMovement(models.Model):
     
     def save(self, *args, **kwargs):
         """Update product quantity on save."""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
-        if is_new:
-            if self.movement_type == self.MovementType.ENTRY:
-                self.product.quantity_available += self.quantity
-            elif self.movement_type == self.MovementType.EXIT:
-                self.product.quantity_available -= self.quantity
-            elif self.movement_type == self.MovementType.ADJUSTMENT:
+        from django.db import transaction
+        from .services import STOCK_SIGNS, apply_stock_deltas, stock_ledger
+
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            # Stock first: the movement's ``created_at`` then comes after the
+            # row lock, which snapshots rely on (utils/ledger.py).
+            if self.movement_type == self.MovementType.ADJUSTMENT:
                 self.product.quantity_available = self.quantity
-            
-            self.product.save()
+                self.product.save(update_fields=['quantity_available', 'updated_at'])
+                super().save(*args, **kwargs)
+                # An adjustment replaces the balance, so deltas cannot cross it.
+                stock_ledger.record({self.product_id: self.quantity}, StockSnapshot.Source.ADJUSTMENT)
+            else:
+                sign = STOCK_SIGNS[self.movement_type]
+                apply_stock_deltas({self.product_id: sign * self.quantity})
+                super().save(*args, **kwargs)
+                stock_ledger.checkpoint([self.product_id])
+                self.product.refresh_from_db(fields=['quantity_available', 'updated_at'])
+
+
+class StockSnapshot(models.Model):
+    """Balance of a product at ``taken_at``, counting every movement up to then."""
+
+    class Source(models.TextChoices):
+        NIGHTLY = 'NIGHTLY', 'Cierre diario'
+        CHECKPOINT = 'CHECKPOINT', 'Punto de control'
+        ADJUSTMENT = 'ADJUSTMENT', 'Ajuste'
+        EDIT = 'EDIT', 'Edición del producto'
+        RECONCILED = 'RECONCILED', 'Conciliación'
+        OPENING = 'OPENING', 'Saldo inicial (sin verificar)'
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name='Producto'
+    )
+    date = models.DateField(verbose_name='Fecha')
+    taken_at = models.DateTimeField(verbose_name='Tomado el')
+    balance = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Saldo')
+    source = models.CharField(max_length=20, choices=Source.choices, verbose_name='Origen')
+
+    class Meta:
+        db_table = 'stock_snapshots'
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='stock_snap_product_taken_idx'),
+        ]
+        verbose_name = 'Saldo de Inventario'
+        verbose_name_plural = 'Saldos de Inventario'
+
+    def __str__(self):
+        return f"{self.product.name} {self.date}: {self.balance}"
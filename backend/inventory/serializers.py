@@ -12,6 +12,9 @@ class ProductCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_product_count(self, obj):
+        # Annotated by ProductCategoryViewSet; freshly saved objects are not.
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
 
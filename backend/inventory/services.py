@@ -0,0 +1,66 @@
+"""Stock posting: the only place that changes ``Product.quantity_available``."""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F
+from django.db.models.functions import Now
+
+from utils.ledger import StockLedger
+
+from .models import Product, StockMovement, StockSnapshot
+
+STOCK_SIGNS = {
+    StockMovement.MovementType.ENTRY: 1,
+    StockMovement.MovementType.EXIT: -1,
+}
+
+stock_ledger = StockLedger(
+    StockMovement, StockSnapshot, STOCK_SIGNS, 'quantity_available',
+    DecimalField(max_digits=12, decimal_places=2), reset_type=StockMovement.MovementType.ADJUSTMENT,
+)
+
+
+def apply_stock_deltas(deltas):
+    """Add ``{product_id: delta}`` to stock with one ``UPDATE`` per product.
+
+    The arithmetic happens in the database, so concurrent postings never
+    overwrite each other. Products are updated in id order so two
+    transactions touching the same products always lock them in the same
+    order.
+    """
+    from reports.cache import invalidate
+
+    for product_id in sorted(deltas):
+        delta = deltas[product_id]
+        if delta:
+            Product.objects.filter(pk=product_id).update(
+                quantity_available=F('quantity_available') + delta,
+                updated_at=Now(),
+            )
+    # Queryset updates send no signals.
+    invalidate('products')
+
+
+def post_stock_movements(movements):
+    """Save unsaved entry/exit movements and apply them to stock in bulk.
+
+    Quantities are summed per product first, so a sale with five lines of
+    the same vinyl roll costs a single stock update. Adjustments set an
+    absolute quantity and go through ``StockMovement.save`` instead.
+    Products due for a ledger checkpoint are snapshotted in the same
+    transaction.
+    """
+    deltas = defaultdict(Decimal)
+    for movement in movements:
+        try:
+            sign = STOCK_SIGNS[movement.movement_type]
+        except KeyError:
+            raise ValueError('Solo se pueden registrar entradas y salidas en lote.')
+        deltas[movement.product_id] += sign * Decimal(movement.quantity)
+
+    with transaction.atomic():
+        apply_stock_deltas(deltas)
+        created = StockMovement.objects.bulk_create(movements)
+        stock_ledger.checkpoint(deltas)
+    return created
@@ -0,0 +1,482 @@
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from sales.models import Sale, SaleItem
+from users.models import User
+from simple_inventory.models import StockSnapshot as SimpleStockSnapshot
+from simple_inventory.services import stock_ledger as simple_stock_ledger
+from utils.dates import local_midnight
+from utils.factories import make_product, make_simple_movement, make_simple_product
+from utils.testing import QueryBudgetMixin
+
+from .models import Product, ProductCategory, StockMovement, StockSnapshot
+from .services import post_stock_movements, stock_ledger
+
+
+class StockFixtureMixin:
+    def make_fixtures(self):
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='x')
+        self.client_obj = Client.objects.create(name='Cliente', phone='1')
+        category = ProductCategory.objects.create(name='Vinil')
+        self.vinyl, self.ink = [
+            Product.objects.create(
+                name=name, category=category, unit_cost=Decimal('1'), unit_price=Decimal('2'),
+                quantity_available=Decimal('1000.00'),
+            )
+            for name in ('Vinil', 'Tinta')
+        ]
+
+    def make_sale(self, lines):
+        sale = Sale.objects.create(client=self.client_obj, created_by=self.user)
+        SaleItem.objects.bulk_create([
+            SaleItem(sale=sale, product=product, unit_price=Decimal('1'), quantity=1, quantity_used=used)
+            for product, used in lines
+        ])
+        return sale
+
+
+class CompleteSaleTests(StockFixtureMixin, TestCase):
+    def setUp(self):
+        self.make_fixtures()
+
+    def test_posts_one_update_per_product(self):
+        sale = self.make_sale([(self.vinyl, Decimal('2.50'))] * 5 + [(self.ink, Decimal('1'))])
+        with CaptureQueriesContext(connection) as queries:
+            sale.complete_sale()
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO "stock_movements"')]), 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "products"')]), 2)
+        self.assertLessEqual(len(statements), 8)
+
+        self.vinyl.refresh_from_db()
+        self.ink.refresh_from_db()
+        self.assertEqual(self.vinyl.quantity_available, Decimal('987.50'))
+        self.assertEqual(self.ink.quantity_available, Decimal('999.00'))
+        self.assertEqual(StockMovement.objects.filter(reference=sale.invoice_number).count(), 6)
+
+    def test_completing_twice_posts_once(self):
+        sale = self.make_sale([(self.vinyl, Decimal('10'))])
+        Sale.objects.get(pk=sale.pk).complete_sale()
+        sale.complete_sale()
+
+        self.vinyl.refresh_from_db()
+        self.assertEqual(self.vinyl.quantity_available, Decimal('990.00'))
+        self.assertEqual(sale.status, Sale.Status.COMPLETED)
+
+
+@skipIf(
+    connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+    'Needs a test database shared by several connections.'
+)
+class ConcurrentStockTests(StockFixtureMixin, TransactionTestCase):
+    THREADS = 8
+
+    def run_threads(self, target, count):
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def run(index):
+            try:
+                barrier.wait()
+                target(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_sales_of_the_same_product(self):
+        self.make_fixtures()
+        sales = [
+            self.make_sale([(self.vinyl, Decimal('3.25')), (self.ink, Decimal('1')), (self.vinyl, Decimal('1'))])
+            for _ in range(self.THREADS)
+        ]
+
+        self.run_threads(lambda index: Sale.objects.get(pk=sales[index].pk).complete_sale(), self.THREADS)
+
+        self.vinyl.refresh_from_db()
+        self.ink.refresh_from_db()
+        self.assertEqual(self.vinyl.quantity_available, Decimal('1000') - self.THREADS * Decimal('4.25'))
+        self.assertEqual(self.ink.quantity_available, Decimal('1000') - self.THREADS)
+
+    def test_same_sale_completed_concurrently(self):
+        self.make_fixtures()
+        sale = self.make_sale([(self.vinyl, Decimal('5'))])
+
+        self.run_threads(lambda index: Sale.objects.get(pk=sale.pk).complete_sale(), 4)
+
+        self.vinyl.refresh_from_db()
+        self.assertEqual(self.vinyl.quantity_available, Decimal('995.00'))
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+
+class CategoryQueryShapingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='u', email='u@example.com', password='x', role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+
+    def test_list_counts_active_products_in_the_query(self):
+        def grow(count):
+            for _ in range(count):
+                category = ProductCategory.objects.create(name=f'Categoría {ProductCategory.objects.count()}')
+                for active in (True, True, False):
+                    Product.objects.create(
+                        name='Producto', category=category, unit_cost=Decimal('1'),
+                        unit_price=Decimal('2'), is_active=active,
+                    )
+
+        self.assertConstantQueries('/api/inventory/categories/', grow)
+        counts = {row['product_count'] for row in self.api.get('/api/inventory/categories/').json()['results']}
+        self.assertEqual(counts, {2})
+
+
+def at(year, month, day, hour=12, minute=0):
+    """Freeze ``timezone.now`` at a local time."""
+    moment = local_midnight(datetime(year, month, day).date()) + timedelta(hours=hour, minutes=minute)
+    return mock.patch('django.utils.timezone.now', return_value=moment)
+
+
+class StockLedgerTests(TestCase):
+    url = '/api/inventory/products/as_of/'
+
+    def setUp(self):
+        user = User.objects.create_user(username='u', email='u@example.com', password='x', role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+        self.category = ProductCategory.objects.create(name='Vinil')
+
+    def move(self, product, kind, quantity):
+        StockMovement.objects.create(product=product, movement_type=kind, quantity=Decimal(quantity))
+
+    def balances(self, day, **params):
+        response = self.api.get(self.url, {'date': day, **params})
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row['balance'] for row in response.data['products']}
+
+    def test_balances_at_the_end_of_past_days(self):
+        with at(2026, 3, 1):
+            response = self.api.post('/api/inventory/products/', {
+                'name': 'Vinil blanco', 'category': self.category.pk, 'unit_measure': 'ROLL',
+                'quantity_available': '10', 'unit_cost': '2.50', 'unit_price': '5',
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+        vinyl = Product.objects.get(pk=response.data['id'])
+        with at(2026, 3, 5):
+            self.move(vinyl, 'ENTRY', 40)
+        with at(2026, 3, 31, 23, 59):
+            self.move(vinyl, 'EXIT', 5)
+        with at(2026, 4, 1, 0, 0):
+            self.move(vinyl, 'EXIT', 15)
+        with at(2026, 4, 2):
+            self.move(vinyl, 'ADJUSTMENT', 100)
+        with at(2026, 4, 3):
+            self.move(vinyl, 'ENTRY', 1)
+
+        self.assertEqual(self.balances('2026-02-28'), {})
+        self.assertEqual(self.balances('2026-03-01'), {vinyl.pk: 10})
+        self.assertEqual(self.balances('2026-03-31'), {vinyl.pk: 45})
+        self.assertEqual(self.balances('2026-04-01'), {vinyl.pk: 30})
+        self.assertEqual(self.balances('2026-04-02'), {vinyl.pk: 100})
+        self.assertEqual(self.balances('2026-04-03'), {vinyl.pk: 101})
+
+        with self.assertNumQueries(1):
+            response = self.api.get(self.url, {'date': '2026-03-31', 'search': 'blanco'})
+        self.assertEqual(response.data['products'][0]['value'], 112.5)
+        self.assertEqual(response.data['total_value'], 112.5)
+
+    def test_products_without_snapshots_are_worked_back_from_stock(self):
+        product = make_product(self.category, quantity_available=Decimal('100'))
+        Product.objects.filter(pk=product.pk).update(created_at=local_midnight(datetime(2026, 1, 1).date()))
+        with at(2026, 3, 10):
+            self.move(product, 'EXIT', 30)
+        self.assertEqual(self.balances('2026-03-09'), {product.pk: 100})
+        self.assertEqual(self.balances('2026-03-10'), {product.pk: 70})
+
+    @override_settings(STOCK_CHECKPOINT_EVERY=3)
+    def test_checkpoint_every_n_movements(self):
+        product = make_product(self.category, quantity_available=Decimal('0'))
+        self.move(product, 'ENTRY', 4)
+        post_stock_movements([
+            StockMovement(product=product, movement_type='ENTRY', quantity=Decimal('1')),
+            StockMovement(product=product, movement_type='EXIT', quantity=Decimal('2')),
+        ])
+        self.assertEqual(
+            list(StockSnapshot.objects.values_list('source', 'balance')),
+            [('CHECKPOINT', Decimal('3.00'))],
+        )
+        self.move(product, 'ENTRY', 1)
+        self.assertEqual(StockSnapshot.objects.count(), 1)
+
+    def test_nightly_command_snapshots_changed_products_of_both_inventories(self):
+        fresh, idle = make_product(self.category), make_product(self.category)
+        material = make_simple_product(quantity=7)
+        StockSnapshot.objects.create(
+            product=idle, date=datetime(2026, 1, 1).date(), source='NIGHTLY',
+            taken_at=local_midnight(datetime(2026, 1, 1).date()), balance=idle.quantity_available,
+        )
+        call_command('snapshot_stock', stdout=mock.Mock())
+        # ``idle`` has not moved since its last snapshot.
+        self.assertEqual(StockSnapshot.objects.filter(source='NIGHTLY').count(), 2)
+        self.assertTrue(StockSnapshot.objects.filter(product=fresh).exists())
+        self.assertEqual(list(SimpleStockSnapshot.objects.values_list('product', 'balance')), [(material.pk, 7)])
+
+        make_simple_movement(material, movement_type='ENTRY', quantity=3)
+        call_command('snapshot_stock', stdout=mock.Mock())
+        self.assertEqual(StockSnapshot.objects.count(), 2)
+        self.assertEqual(SimpleStockSnapshot.objects.filter(balance=10).count(), 1)
+
+
+class ReconcileStockTests(TestCase):
+    url = '/api/inventory/products/reconcile/'
+
+    def setUp(self):
+        admin = User.objects.create_user(username='a', email='a@example.com', password='x', role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(admin)
+        self.category = ProductCategory.objects.create(name='Vinil')
+
+    def make_ledgered(self, quantity):
+        product = make_product(self.category, quantity_available=Decimal(quantity))
+        stock_ledger.record({product.pk: product.quantity_available}, StockSnapshot.Source.EDIT)
+        return product
+
+    def test_reports_and_repairs_drifted_counters(self):
+        products = [self.make_ledgered(10) for _ in range(5)]
+        drifted = products[3]
+        StockMovement.objects.create(product=drifted, movement_type='ENTRY', quantity=Decimal('5'))
+        Product.objects.filter(pk=drifted.pk).update(quantity_available=Decimal('99'))
+        # A nightly run copies the bad counter into the ledger.
+        stock_ledger.record({drifted.pk: Decimal('99')}, StockSnapshot.Source.NIGHTLY)
+        unknown = make_product(self.category)  # no snapshot yet: cannot be judged
+
+        with CaptureQueriesContext(connection) as queries:
+            checked, mismatches, unverifiable = stock_ledger.reconcile(chunk_size=4)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('SELECT')]), 2)
+        self.assertEqual(checked, 5)
+        self.assertEqual([row['id'] for row in unverifiable], [unknown.pk])
+        self.assertEqual(
+            [(row['id'], row['quantity'], row['expected'], row['difference']) for row in mismatches],
+            [(drifted.pk, Decimal('99'), Decimal('15'), Decimal('-84'))],
+        )
+
+        response = self.api.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['mismatches'][0]['expected'], 15.0)
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.quantity_available, Decimal('15'))
+        self.assertEqual(
+            list(drifted.snapshots.order_by('taken_at').values_list('source', 'balance')),
+            [('EDIT', Decimal('10.00')), ('RECONCILED', Decimal('15.00'))],
+        )
+        data = self.api.get(self.url).data
+        self.assertEqual((data['checked'], data['mismatches']), (5, []))
+        self.assertEqual(data['unverifiable'], [{
+            'id': unknown.pk, 'name': unknown.name, 'sku': unknown.sku, 'quantity': float(unknown.quantity_available),
+        }])
+
+        call_command('snapshot_stock', stdout=StringIO())
+        checked, _, unverifiable = stock_ledger.reconcile()
+        self.assertEqual((checked, unverifiable), (6, []))
+
+    def test_admins_only_and_command(self):
+        vendor = APIClient()
+        vendor.force_authenticate(User.objects.create_user(
+            username='v', email='v@example.com', password='x', role=User.Role.DESIGNER,
+        ))
+        self.assertEqual(vendor.get(self.url).status_code, 403)
+
+        material = make_simple_product(quantity=4)
+        simple_stock_ledger.record({material.pk: 4}, SimpleStockSnapshot.Source.EDIT)
+        type(material).objects.filter(pk=material.pk).update(quantity=1)
+        out = StringIO()
+        call_command('reconcile_stock', '--repair', stdout=out)
+        self.assertIn('Inventario manual: 1 productos revisados, 1 corregidos.', out.getvalue())
+        material.refresh_from_db()
+        self.assertEqual(material.quantity, 4)
+
+
+class OpeningSnapshotTests(TransactionTestCase):
+    """Drift from before the ledger existed must not be copied into it."""
+
+    before = [('inventory', '0003_stock_movement_product_index'), ('simple_inventory', '0001_initial')]
+
+    def migrate(self, targets):
+        from django.db.migrations.executor import MigrationExecutor
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_reconcile_reports_drift_older_than_the_ledger(self):
+        from simple_inventory.models import SimpleProduct
+
+        old = self.migrate(self.before)
+        category = old.get_model('inventory', 'ProductCategory').objects.create(name='Vinil')
+        OldProduct = old.get_model('inventory', 'Product')
+        OldMovement = old.get_model('inventory', 'StockMovement')
+        fields = {'category': category, 'unit_cost': Decimal('1'), 'unit_price': Decimal('2')}
+        # A sale deleted without returning its 10 units, and an adjustment overwritten by hand.
+        leaked = OldProduct.objects.create(name='Vinil', sku='V-1', quantity_available=Decimal('40'), **fields)
+        OldMovement.objects.create(product=leaked, movement_type='ENTRY', quantity=Decimal('50'))
+        OldMovement.objects.create(product=leaked, movement_type='EXIT', quantity=Decimal('10'))
+        OldProduct.objects.filter(pk=leaked.pk).update(quantity_available=Decimal('50'))
+        adjusted = OldProduct.objects.create(name='Tinta', sku='T-1', quantity_available=Decimal('7'), **fields)
+        OldMovement.objects.create(product=adjusted, movement_type='ENTRY', quantity=Decimal('20'))
+        OldMovement.objects.create(product=adjusted, movement_type='ADJUSTMENT', quantity=Decimal('5'))
+        OldMovement.objects.create(product=adjusted, movement_type='EXIT', quantity=Decimal('1'))
+        exact = OldProduct.objects.create(name='Lona', sku='L-1', quantity_available=Decimal('3'), **fields)
+        OldMovement.objects.create(product=exact, movement_type='ENTRY', quantity=Decimal('3'))
+        material = old.get_model('simple_inventory', 'SimpleProduct').objects.create(name='Papel', sku='P-1', quantity=9)
+        old.get_model('simple_inventory', 'StockMovement').objects.create(
+            product_id=material.pk, movement_type='ENTRY', quantity=6,
+        )
+
+        self.migrate([('inventory', '0007_snapshot_opening_source'), ('simple_inventory', '0004_snapshot_opening_source')])
+
+        self.assertEqual(set(StockSnapshot.objects.values_list('source', flat=True)), {'OPENING'})
+        checked, mismatches, unverifiable = stock_ledger.reconcile()
+        self.assertEqual((checked, unverifiable), (3, []))
+        self.assertEqual(
+            [(row['id'], row['quantity'], row['expected']) for row in mismatches],
+            [(leaked.pk, Decimal('50'), Decimal('40')), (adjusted.pk, Decimal('7'), Decimal('4'))],
+        )
+        _, mismatches, _ = simple_stock_ledger.reconcile()
+        self.assertEqual([(row['id'], row['expected']) for row in mismatches], [(material.pk, 6)])
+
+        # A nightly run after the opening one does not hide the drift either.
+        call_command('snapshot_stock', stdout=StringIO())
+        self.assertEqual(len(stock_ledger.reconcile()[1]), 2)
+
+        stock_ledger.reconcile(repair=True)
+        self.assertEqual(stock_ledger.reconcile()[1], [])
+        self.assertEqual(
+            list(StockSnapshot.objects.filter(product_id=leaked.pk).values_list('source', 'balance')),
+            [('RECONCILED', Decimal('40.00'))],
+        )
+        self.assertEqual(SimpleProduct.objects.get(pk=material.pk).quantity, 9)
+
+
+class StockStatusTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='a', email='a@example.com', password='x', role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(admin)
+        category = ProductCategory.objects.create(name='Vinil')
+        self.products = {
+            (quantity, minimum): make_product(
+                category, quantity_available=Decimal(quantity), minimum_stock=Decimal(minimum),
+            )
+            for quantity, minimum in (('0', '5'), ('3', '5'), ('5', '5'), ('6', '5'), ('0', '0'), ('9', '0'))
+        }
+        make_product(category, quantity_available=Decimal('1'), minimum_stock=Decimal('5'), is_active=False)
+
+    def test_database_filters_match_the_model_properties(self):
+        products = Product.objects.all()
+        for status in ('SIN_STOCK', 'STOCK_BAJO', 'DISPONIBLE'):
+            with self.subTest(status=status):
+                self.assertEqual(
+                    set(products.with_stock_status(status)),
+                    {p for p in products if p.stock_status == status},
+                )
+        self.assertEqual(set(products.low_stock()), {p for p in products if p.is_low_stock})
+
+    def test_list_filter_and_paginated_low_stock(self):
+        response = self.api.get('/api/inventory/products/', {'stock_status': 'SIN_STOCK,STOCK_BAJO'})
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual({row['stock_status'] for row in response.data['results']}, {'SIN_STOCK', 'STOCK_BAJO'})
+        response = self.api.get('/api/inventory/products/', {'stock_status': 'AGOTADO'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.api.get('/api/inventory/products/low_stock/')
+        self.assertEqual(response.data['count'], 4)
+        self.assertTrue(all(row['is_low_stock'] for row in response.data['results']))
+        response = self.api.get('/api/inventory/products/low_stock/', {'search': self.products['3', '5'].name})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.products['3', '5'].pk])
+
+
+class CatalogTests(TestCase):
+    url = '/api/inventory/products/catalog/'
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        override = override_settings(CACHES={'default': {
+            'BACKEND': 'utils.cache.FileBasedCache',
+            'LOCATION': location,
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+
+        vendor = User.objects.create_user(username='v', email='v@example.com', password='x', role=User.Role.DESIGNER)
+        self.api = APIClient()
+        self.api.force_authenticate(vendor)
+        self.category = ProductCategory.objects.create(name='Vinil')
+        self.vinyl = make_product(self.category, name='Vinil blanco', quantity_available=Decimal('0'))
+        make_product(self.category, name='Lona', is_active=False)
+
+    def test_snapshot_is_cached_and_revalidated(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['products'], [{
+            'id': self.vinyl.pk, 'name': 'Vinil blanco', 'sku': self.vinyl.sku,
+            'category': self.category.pk, 'category_name': 'Vinil', 'unit_measure': 'UNIT',
+            'unit_price': '25.00', 'price_per_square_inch': '0.05', 'quantity_available': '0.00',
+            'stock_status': 'SIN_STOCK',
+        }])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.api.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), data)
+
+    def test_any_product_or_category_write_changes_the_version(self):
+        etags = [self.api.get(self.url)['ETag']]
+
+        def etag_after(func, *args, **kwargs):
+            with self.captureOnCommitCallbacks(execute=True):
+                func(*args, **kwargs)
+            response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etags[-1])
+            self.assertEqual(response.status_code, 200)
+            etags.append(response['ETag'])
+            return json.loads(response.content)
+
+        data = etag_after(StockMovement.objects.create, product=self.vinyl, movement_type='ENTRY', quantity=Decimal('50'))
+        self.assertEqual(data['products'][0]['stock_status'], 'DISPONIBLE')
+        self.category.name = 'Viniles'
+        data = etag_after(self.category.save)
+        self.assertEqual(data['products'][0]['category_name'], 'Viniles')
+        data = etag_after(make_product, self.category, name='Tinta')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(len(set(etags)), 4)
@@ -1,15 +1,27 @@
+from decimal import Decimal
+
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Count, Q
 
-from .models import ProductCategory, Product, StockMovement
+from .catalog import catalog_response
+from .models import STOCK_STATUS_FILTERS, ProductCategory, Product, StockMovement
 from .serializers import (
     ProductCategorySerializer, ProductSerializer, 
     ProductListSerializer, StockMovementSerializer
 )
-from users.permissions import IsAdminOperationsOrVendor
+from .services import stock_ledger
+from users.permissions import IsAdmin, IsAdminOperationsOrVendor
+from utils.dates import day_bounds, parse_local_date
+from utils.export import ExportMixin
+from utils.items import to_cents
+from utils.pagination import OptionalCursorPagination
 
 
 class ProductCategoryViewSet(viewsets.ModelViewSet):
@@ -21,6 +33,11 @@ class ProductCategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering = ['name']
 
+    def get_queryset(self):
+        return super().get_queryset().annotate(
+            active_product_count=Count('products', filter=Q(products__is_active=True))
+        )
+
 
 class ProductViewSet(viewsets.ModelViewSet):
     """ViewSet for Product CRUD operations."""
@@ -36,13 +53,85 @@ class ProductViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             return ProductListSerializer
         return ProductSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        stock_status = self.request.query_params.get('stock_status')
+        if stock_status:
+            statuses = stock_status.split(',')
+            unknown = sorted(set(statuses) - set(STOCK_STATUS_FILTERS))
+            if unknown:
+                raise ParseError(
+                    f"Estado de stock no válido: {', '.join(unknown)}. "
+                    f"Use {', '.join(STOCK_STATUS_FILTERS)}."
+                )
+            queryset = queryset.with_stock_status(*statuses)
+        return queryset
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            stock_ledger.record_edit(serializer.save())
+
+    def perform_update(self, serializer):
+        before = serializer.instance.quantity_available
+        with transaction.atomic():
+            stock_ledger.record_edit(serializer.save(), before)
+
+    @action(detail=False, methods=['get'])
+    def catalog(self, request):
+        """Every active product in one cached payload, with ``ETag``/``304``."""
+        return catalog_response(request)
+
+    @action(detail=False, methods=['get'])
+    def as_of(self, request):
+        """Stock and its value at the end of ``?date=YYYY-MM-DD`` (default today).
+
+        Accepts the list filters. Each balance is the product's latest
+        snapshot before that day ended plus the movements after it, in a
+        single query. Values use the current ``unit_cost``.
+        """
+        day = parse_local_date(request.query_params.get('date'), 'date') or timezone.localdate()
+        products = stock_ledger.balances_before(self.filter_queryset(self.get_queryset()), day_bounds(day)[1])
+
+        rows, total_value = [], Decimal('0')
+        for product in products:
+            value = to_cents(product.balance * product.unit_cost)
+            total_value += value
+            rows.append({
+                'id': product.pk,
+                'name': product.name,
+                'sku': product.sku,
+                'unit_measure': product.unit_measure,
+                'balance': float(product.balance),
+                'unit_cost': float(product.unit_cost),
+                'value': float(value),
+            })
+        return Response({'date': day.isoformat(), 'products': rows, 'total_value': float(total_value)})
     
+    @action(detail=False, methods=['get', 'post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def reconcile(self, request):
+        """Products whose stock disagrees with their movements; ``POST`` repairs them."""
+        repair = request.method == 'POST'
+        checked, mismatches, unverifiable = stock_ledger.reconcile(repair=repair)
+        for row in mismatches:
+            for field in ('quantity', 'expected', 'difference'):
+                row[field] = float(row[field])
+        for row in unverifiable:
+            row['quantity'] = float(row['quantity'])
+        return Response({
+            'checked': checked, 'mismatches': mismatches, 'unverifiable': unverifiable, 'repaired': repair,
+        })
+
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        """Get products with low stock."""
-        low_stock_products = [p for p in self.get_queryset() if p.is_low_stock]
-        serializer = self.get_serializer(low_stock_products, many=True)
-        return Response(serializer.data)
+        """Active products at or below their minimum stock, paginated.
+
+        Accepts the list filters; served from ``products_low_stock_idx``.
+        """
+        queryset = self.filter_queryset(self.get_queryset().low_stock())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def destroy(self, request, *args, **kwargs):
         """Soft delete: deactivate product instead of deleting."""
@@ -57,12 +146,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def out_of_stock(self, request):
         """Get products out of stock."""
-        out_of_stock = self.get_queryset().filter(quantity_available=0)
+        out_of_stock = self.get_queryset().with_stock_status('SIN_STOCK')
         serializer = self.get_serializer(out_of_stock, many=True)
         return Response(serializer.data)
 
 
-class StockMovementViewSet(viewsets.ModelViewSet):
+class StockMovementViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for StockMovement operations."""
     queryset = StockMovement.objects.select_related('product', 'created_by').all()
     serializer_class = StockMovementSerializer
@@ -70,6 +159,20 @@ class StockMovementViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['product', 'movement_type']
     ordering = ['-created_at']
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+
+    export_filename = 'Movimientos_Inventario'
+    export_columns = (
+        ('created_at', 'Fecha'),
+        ('product__name', 'Producto'),
+        ('product__sku', 'SKU'),
+        ('movement_type', 'Tipo de Movimiento'),
+        ('quantity', 'Cantidad'),
+        ('reference', 'Referencia'),
+        ('notes', 'Notas'),
+        ('created_by__username', 'Registrado por'),
+    )
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -2,6 +2,8 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from utils.items import to_cents
+
 
 class Quotation(models.Model):
     """Model for quotations/estimates."""
@@ -88,15 +90,29 @@ class Quotation(models.Model):
     class Meta:
         db_table = 'quotations'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='quotations_created_id_idx'),
+        ]
         verbose_name = 'Cotización'
         verbose_name_plural = 'Cotizaciones'
     
     def __str__(self):
         return f"{self.quotation_number} - {self.client.name}"
     
-    def calculate_totals(self):
-        """Calculate subtotal and total from items."""
-        self.subtotal = sum(item.total for item in self.items.all())
+    def calculate_totals(self, items=None):
+        """Calculate subtotal and total from items.
+
+        ``items`` lets batched writers pass the lines they just saved
+        instead of reading them back.
+        """
+        if items is None:
+            items = self.items.all()
+        self.compute_totals(items)
+        self.save()
+
+    def compute_totals(self, items):
+        """Set the totals from ``items`` without saving."""
+        self.subtotal = sum((item.total for item in items), Decimal('0'))
         self.discount_amount = self.subtotal * (self.discount_percentage / Decimal('100'))
         taxable_base = self.subtotal - self.discount_amount
         if self.apply_tax:
@@ -104,22 +120,18 @@ class Quotation(models.Model):
         else:
             self.tax_amount = Decimal('0')
         self.total_amount = taxable_base + self.tax_amount
-        self.save()
     
     def save(self, *args, **kwargs):
-        if not self.quotation_number:
-            # Auto-generate quotation number
-            last_quotation = Quotation.objects.order_by('-id').first()
-            if last_quotation and last_quotation.quotation_number.startswith('COT-'):
-                try:
-                    last_number = int(last_quotation.quotation_number.split('-')[1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.quotation_number = f"COT-{new_number:06d}"
-        super().save(*args, **kwargs)
+        from django.db import transaction
+        from sequences.models import DocumentSequence, highest_number
+
+        with transaction.atomic():
+            if not self.quotation_number:
+                self.quotation_number = DocumentSequence.objects.next_number(
+                    'COT',
+                    seed=lambda: highest_number(Quotation.objects.all(), 'quotation_number', 'COT'),
+                )
+            super().save(*args, **kwargs)
 
 
 class QuotationItem(models.Model):
@@ -181,10 +193,14 @@ class QuotationItem(models.Model):
     def __str__(self):
         return f"{self.quotation.quotation_number} - {self.product.name}"
     
+    def compute_line(self):
+        """Calculate square inches and total as they will be stored."""
+        square_inches = self.width_inches * self.height_inches
+        self.square_inches = to_cents(square_inches)
+        self.total = to_cents(square_inches * self.price_per_square_inch * self.quantity)
+
     def save(self, *args, **kwargs):
-        # Calculate square inches and total
-        self.square_inches = self.width_inches * self.height_inches
-        self.total = self.square_inches * self.price_per_square_inch * self.quantity
+        self.compute_line()
         super().save(*args, **kwargs)
         # Update quotation totals
         self.quotation.calculate_totals()
@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+from utils.pdf import (
+    build_data_table, build_header, build_info_table,
+    get_signature_label_style, get_styles, render_pdf,
+)
+from utils.pdf_store import PDFArtifactStore
+
+from .models import Quotation
+
+# Converted or rejected quotations are final and rendered only once.
+FINAL_STATUSES = (Quotation.Status.CONVERTED, Quotation.Status.REJECTED)
+quotation_store = PDFArtifactStore('quotations')
+
+
+def render_quotation(quotation):
+    """Render the PDF of a quotation, with logo and signature line."""
+    styles = get_styles()
+    elements = build_header(font_size=22, space_after=20, logo_gap=0.15 * inch)
+
+    elements.append(Paragraph(
+        f"Cotización {quotation.quotation_number}",
+        styles['Heading2']
+    ))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    created_at = timezone.localtime(quotation.created_at)
+    info_data = [
+        ['Cliente:', quotation.client.name],
+        ['Ventas:', quotation.created_by.username if quotation.created_by else 'N/D'],
+        ['Estado:', quotation.get_status_display()],
+        ['Creada:', created_at.strftime('%d/%m/%Y %H:%M')],
+    ]
+    if quotation.include_client_details:
+        if quotation.client_rtn:
+            info_data.append(['RTN Cliente:', quotation.client_rtn])
+        if quotation.client_phone:
+            info_data.append(['Teléfono Cliente:', quotation.client_phone])
+        if quotation.client_address:
+            info_data.append(['Dirección Cliente:', quotation.client_address])
+    if quotation.valid_until:
+        info_data.append(['Válida hasta:', quotation.valid_until.strftime('%d/%m/%Y')])
+    if quotation.notes:
+        info_data.append(['Notas:', quotation.notes])
+
+    elements.append(build_info_table(info_data, [1.5 * inch, 4.5 * inch], padding=4))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    subtotal = quotation.subtotal or Decimal('0')
+    tax_amount = quotation.tax_amount or Decimal('0')
+    total = quotation.total_amount or Decimal('0')
+
+    summary_rows = [
+        ['Subtotal', f'L {subtotal:.2f}'],
+    ]
+    if quotation.discount_amount:
+        summary_rows.append([
+            f"Descuento ({quotation.discount_percentage}%)",
+            f"- L {quotation.discount_amount:.2f}"
+        ])
+    if quotation.apply_tax:
+        summary_rows.append([
+            f"ISV ({quotation.tax_rate}%)",
+            f"L {tax_amount:.2f}"
+        ])
+    summary_rows.append(['Total', f'L {total:.2f}'])
+
+    summary_table = Table(summary_rows, colWidths=[3 * inch, 2 * inch])
+    summary_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+
+    items = quotation.items.all()
+    if items:
+        elements.append(Paragraph('Detalle de Items', styles['Heading3']))
+        elements.append(Spacer(1, 0.1 * inch))
+        item_rows = [[
+            'Producto', 'Descripción', 'Cantidad',
+            'Precio/pulg²', 'Total'
+        ]]
+        for item in items:
+            item_rows.append([
+                item.product.name if item.product else item.description[:30],
+                item.description or 'N/D',
+                str(item.quantity),
+                f'L {item.price_per_square_inch:.2f}',
+                f'L {item.total:.2f}',
+            ])
+        elements.append(build_data_table(
+            item_rows,
+            [1.5 * inch, 2.3 * inch, 0.7 * inch, 1.1 * inch, 1.1 * inch],
+            font_size=10,
+            header_padding=3,
+            grid_width=0.5,
+            extra_styles=[('ALIGN', (2, 1), (-1, -1), 'CENTER')],
+        ))
+        elements.append(Spacer(1, 0.2 * inch))
+    else:
+        elements.append(Spacer(1, 0.1 * inch))
+
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.4 * inch))
+
+    signature_table = Table([[" "]], colWidths=[4 * inch])
+    signature_table.setStyle(TableStyle([
+        ('LINEABOVE', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    signature_table.hAlign = 'CENTER'
+    elements.append(signature_table)
+    elements.append(Paragraph('Firma', get_signature_label_style()))
+
+    return render_pdf(elements)
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Quotation, QuotationItem
+from utils.items import prefetch_line_items, sync_line_items
 from clients.serializers import ClientListSerializer
 from inventory.serializers import ProductListSerializer
 
@@ -15,12 +17,19 @@ class QuotationItemSerializer(serializers.ModelSerializer):
             'width_inches', 'height_inches', 'square_inches',
             'price_per_square_inch', 'quantity', 'total'
         ]
-        read_only_fields = ['id', 'square_inches', 'total']
+        read_only_fields = ['square_inches', 'total']
+
+
+class QuotationLineSerializer(QuotationItemSerializer):
+    """A line nested in its quotation; ``id`` is only writable here."""
+    # Optional on input: items sent back with their id are updated in place.
+    # ``sync_line_items`` only matches ids among the parent's own lines.
+    id = serializers.IntegerField(required=False)
 
 
 class QuotationSerializer(serializers.ModelSerializer):
     """Serializer for Quotation model."""
-    items = QuotationItemSerializer(many=True, required=False)
+    items = QuotationLineSerializer(many=True, required=False)
     client_name = serializers.CharField(source='client.name', read_only=True)
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
     
@@ -47,12 +56,11 @@ class QuotationSerializer(serializers.ModelSerializer):
         if request and hasattr(request, 'user'):
             validated_data['created_by'] = request.user
         
-        quotation = Quotation.objects.create(**validated_data)
-        
-        for item_data in items_data:
-            QuotationItem.objects.create(quotation=quotation, **item_data)
-        
-        quotation.calculate_totals()
+        with transaction.atomic():
+            quotation = Quotation.objects.create(**validated_data)
+            items = sync_line_items(quotation, 'items', items_data, created=True)
+            quotation.calculate_totals(items)
+        prefetch_line_items(quotation)
         return quotation
     
     def update(self, instance, validated_data):
@@ -60,15 +68,14 @@ class QuotationSerializer(serializers.ModelSerializer):
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
-        
-        if items_data is not None:
-            # Delete existing items and create new ones
-            instance.items.all().delete()
-            for item_data in items_data:
-                QuotationItem.objects.create(quotation=instance, **item_data)
-        
-        instance.calculate_totals()
+
+        with transaction.atomic():
+            items = None
+            if items_data is not None:
+                items = sync_line_items(instance, 'items', items_data)
+            # calculate_totals() saves the instance with the new attributes.
+            instance.calculate_totals(items)
+        prefetch_line_items(instance)
         return instance
 
 
@@ -86,4 +93,7 @@ class QuotationListSerializer(serializers.ModelSerializer):
         ]
     
     def get_items_count(self, obj):
+        # Annotated by the viewset's list queryset.
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.items.count()
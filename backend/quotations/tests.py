@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from inventory.models import Product, ProductCategory
+from users.models import User
+from utils.testing import QueryBudgetMixin
+
+from .models import Quotation, QuotationItem
+
+
+class QuotationQueryShapingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client_obj = Client.objects.create(name='Cliente', phone='9999-9999')
+        self.category = ProductCategory.objects.create(name='Vinil')
+        self.quotation = Quotation.objects.create(client=self.client_obj, created_by=self.user)
+
+    def add_lines(self, quotation, count):
+        for _ in range(count):
+            product = Product.objects.create(
+                name=f'Producto {Product.objects.count()}', category=self.category,
+                unit_cost=Decimal('1'), unit_price=Decimal('2'),
+            )
+            QuotationItem.objects.bulk_create([QuotationItem(
+                quotation=quotation, product=product, description='Rótulo',
+                width_inches=Decimal('10'), height_inches=Decimal('10'),
+                price_per_square_inch=Decimal('0.10'),
+            )])
+
+    def test_list(self):
+        def grow(count):
+            for _ in range(count):
+                self.add_lines(Quotation.objects.create(client=self.client_obj, created_by=self.user), 3)
+
+        self.assertConstantQueries('/api/quotations/', grow)
+        row = next(r for r in self.api.get('/api/quotations/').json()['results'] if r['id'] != self.quotation.pk)
+        self.assertEqual(row['items_count'], 3)
+
+    def test_detail(self):
+        self.assertConstantQueries(
+            f'/api/quotations/{self.quotation.pk}/', lambda count: self.add_lines(self.quotation, count)
+        )
+
+
+class QuotationItemEndpointTests(TestCase):
+    def test_id_is_read_only(self):
+        user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        api = APIClient()
+        api.force_authenticate(user)
+        client = Client.objects.create(name='Cliente', phone='9999-9999')
+        product = Product.objects.create(
+            name='Vinil', category=ProductCategory.objects.create(name='Vinil'),
+            unit_cost=Decimal('1'), unit_price=Decimal('2'),
+        )
+        mine, other = (
+            QuotationItem.objects.create(
+                quotation=Quotation.objects.create(client=client, created_by=user), product=product,
+                description='Rótulo', width_inches=Decimal('10'), height_inches=Decimal('10'),
+                price_per_square_inch=Decimal('0.10'),
+            )
+            for _ in range(2)
+        )
+        response = api.patch(f'/api/quotations/items/{mine.pk}/', {'id': other.pk, 'description': 'Cambio'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['id'], mine.pk)
+        other.refresh_from_db()
+        self.assertEqual(other.description, 'Rótulo')
@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import QuotationViewSet, QuotationItemViewSet
 
 router = DefaultRouter()
-router.register(r'', QuotationViewSet, basename='quotation')
+# 'items' goes first: the empty prefix's detail route would take it as a pk.
 router.register(r'items', QuotationItemViewSet, basename='quotation-item')
+router.register(r'', QuotationViewSet, basename='quotation')
 
 urlpatterns = [
     path('', include(router.urls)),
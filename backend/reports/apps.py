@@ -5,3 +5,8 @@ class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
     verbose_name = 'Reportes'
+
+    def ready(self):
+        from .cache import connect_signals
+
+        connect_signals()
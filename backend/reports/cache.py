@@ -0,0 +1,147 @@
+"""Report payloads cached per parameter set, invalidated by version tags.
+
+Every report depends on a few tags (``sales``, ``products``...). A tag's
+version is a random token kept in the shared cache; saving or deleting a
+model bumps the tags it feeds, so the next read builds a fresh payload
+under a new key and old entries simply expire. Writes that skip model
+signals (``QuerySet.update``, ``bulk_create``) call ``invalidate``
+themselves.
+
+A miss is built by one request at a time per key across all workers
+(``single_flight``); the others wait for its result instead of running
+the same queries in parallel.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework.response import Response
+
+TAG_KEY = 'reports:tag:{}'
+IGNORED_PARAMS = {'token', '__profile'}
+
+# Seconds a builder holds a key's lock, how long others wait for its
+# result before building it themselves, and how often they look.
+LOCK_LEASE = 60
+LOCK_WAIT = 15
+LOCK_POLL = 0.05
+
+# model label: tags bumped when one of its rows is saved or deleted
+MODEL_TAGS = {
+    'sales.Sale': ('sales',),
+    'quotations.Quotation': ('quotations',),
+    'inventory.Product': ('products',),
+    'inventory.ProductCategory': ('categories',),
+    'simple_inventory.SimpleProduct': ('products',),
+    'clients.Client': ('clients',),
+    'expenses.Expense': ('expenses',),
+}
+ALL_TAGS = sorted({tag for tags in MODEL_TAGS.values() for tag in tags})
+
+
+def tag_versions(tags):
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # ``add`` so that concurrent first readers agree on one token.
+            token = uuid.uuid4().hex
+            versions[key] = token if cache.add(key, token, timeout=None) else cache.get(key, token)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*tags):
+    """Bump ``tags`` once the current transaction commits."""
+    tags = tags or ALL_TAGS
+
+    def bump():
+        cache.set_many({TAG_KEY.format(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def report_key(name, tags, params):
+    items = sorted(
+        (key, value)
+        for key in params if key not in IGNORED_PARAMS
+        for value in params.getlist(key)
+    )
+    digest = hashlib.sha1(repr(items).encode()).hexdigest()
+    # Reports that look at "today" must not outlive the day.
+    day = timezone.localdate().isoformat()
+    return f"reports:{name}:{day}:{':'.join(tag_versions(tags))}:{digest}"
+
+
+def single_flight(key, build, lease=LOCK_LEASE, wait=LOCK_WAIT):
+    """Return the cached ``key``, building it in one request at a time.
+
+    The lock is a cache entry taken with ``add`` and a lease, so a worker
+    that dies while building only delays the others by ``lease``. When
+    the result does not show up within ``wait`` seconds, the caller builds
+    it without the lock rather than failing.
+    """
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, token, lease):
+        time.sleep(LOCK_POLL)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+        if time.monotonic() >= deadline:
+            return store(key, build())
+    try:
+        # Another worker may have finished between our miss and the lock.
+        payload = cache.get(key)
+        return store(key, build()) if payload is None else payload
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def store(key, payload):
+    cache.set(key, payload, settings.REPORT_CACHE_TIMEOUT)
+    return payload
+
+
+def cached_report(name, tags, params, build):
+    key = report_key(name, tags, params)
+    payload = cache.get(key)
+    return single_flight(key, build) if payload is None else payload
+
+
+class CachedReportMixin:
+    """Serve ``get`` from the report cache; subclasses implement ``build``.
+
+    ``report_tags`` lists the tags whose writes change the payload.
+    Payloads must not depend on the requesting user.
+    """
+
+    report_tags = ()
+
+    def get(self, request):
+        return Response(cached_report(
+            type(self).__name__, self.report_tags, request.query_params,
+            lambda: self.build(request),
+        ))
+
+    def build(self, request):
+        raise NotImplementedError
+
+
+def invalidate_for_instance(sender, **kwargs):
+    invalidate(*MODEL_TAGS[sender._meta.label])
+
+
+def connect_signals():
+    from django.apps import apps
+
+    for label in MODEL_TAGS:
+        model = apps.get_model(label)
+        post_save.connect(invalidate_for_instance, sender=model, dispatch_uid=f'report-cache-save-{label}')
+        post_delete.connect(invalidate_for_instance, sender=model, dispatch_uid=f'report-cache-delete-{label}')
@@ -0,0 +1,251 @@
+"""Database-backed queue for heavy report and PDF generation.
+
+Endpoints enqueue a ``ReportJob`` and answer ``202`` right away; the
+``run_report_jobs`` worker claims pending jobs with ``SKIP LOCKED`` and
+renders them in a process pool so request workers never block on
+ReportLab. Every claim carries a lease: a worker that dies mid-render
+simply lets the lease expire and the job is picked up again.
+"""
+import os
+import tempfile
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from utils.slow_queries import slow_query_log
+
+from .models import ReportJob
+
+MAX_ATTEMPTS = 3
+DEFAULT_LEASE_SECONDS = 300
+RESULTS_DIR = 'report_jobs'
+
+# Query parameters that only make sense for the original request and must
+# never be persisted (``token`` carries the user's JWT).
+IGNORED_PARAMS = ('async', 'token', 'format')
+
+
+def wants_async(request):
+    """``?async=1`` opts a PDF endpoint into background generation."""
+    return request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def enqueue(kind, request):
+    """Queue a job for ``request`` and return the ``202`` response."""
+    params = {
+        key: request.query_params.getlist(key)
+        for key in request.query_params
+        if key not in IGNORED_PARAMS
+    }
+    job = ReportJob.objects.create(kind=kind, params=params, requested_by=request.user)
+    return Response(
+        {
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('report-job-detail', args=[job.pk]),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def results_root():
+    return Path(settings.MEDIA_ROOT) / RESULTS_DIR
+
+
+def _replay_view(viewset_class, job, action):
+    """Rebuild ``viewset_class`` as it was when the job was requested.
+
+    The stored query parameters are replayed through a synthetic DRF
+    request, so filtering, search and ordering follow exactly the same
+    code path as the synchronous endpoint.
+    """
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(urlencode(job.params, doseq=True))
+    request = Request(http_request)
+    request.user = job.requested_by
+    view = viewset_class(request=request, action=action, format_kwarg=None, args=(), kwargs={})
+    return view, request
+
+
+def _render_total_sales(job):
+    from .pdf import render_total_sales
+
+    filename = f'Ventas_Totales_{timezone.now().strftime("%Y%m%d")}.pdf'
+    return filename, render_total_sales()
+
+
+def _render_sales_list(job):
+    from sales.pdf import render_sales_list
+    from sales.views import SaleViewSet
+
+    view, request = _replay_view(SaleViewSet, job, 'export_pdf')
+    queryset = view.filter_queryset(view.get_queryset())
+    pdf = render_sales_list(
+        queryset,
+        request.query_params.get('date_from'),
+        request.query_params.get('date_to'),
+    )
+    return timezone.localtime().strftime('Ventas_Filtradas_%Y%m%d_%H%M.pdf'), pdf
+
+
+def _render_expenses(job):
+    from expenses.pdf import render_expenses
+    from expenses.views import ExpenseViewSet
+
+    view, request = _replay_view(ExpenseViewSet, job, 'export_pdf')
+    queryset = view.filter_queryset(view.get_queryset())
+    pdf = render_expenses(queryset, view._get_date_range_text(request))
+    return timezone.localtime().strftime('Gastos_%Y%m%d_%H%M.pdf'), pdf
+
+
+RENDERERS = {
+    ReportJob.Kind.TOTAL_SALES_PDF: _render_total_sales,
+    ReportJob.Kind.SALES_LIST_PDF: _render_sales_list,
+    ReportJob.Kind.EXPENSES_PDF: _render_expenses,
+}
+
+
+def fail_exhausted_jobs(now=None):
+    """Give up on jobs whose lease expired after the last allowed attempt."""
+    now = now or timezone.now()
+    return ReportJob.objects.filter(
+        status=ReportJob.Status.RUNNING,
+        lease_expires_at__lt=now,
+        attempts__gte=MAX_ATTEMPTS,
+    ).update(
+        status=ReportJob.Status.FAILED,
+        error='El trabajo se interrumpió demasiadas veces.',
+        finished_at=now,
+        claim_token='',
+    )
+
+
+def claim_jobs(limit, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Lease up to ``limit`` runnable jobs; return ``(job_id, token)`` pairs.
+
+    Pending jobs and running jobs whose lease expired are both runnable.
+    ``skip_locked`` lets several workers poll the same table without
+    handing the same job out twice.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    fail_exhausted_jobs(now)
+    runnable = Q(status=ReportJob.Status.PENDING) | Q(
+        status=ReportJob.Status.RUNNING,
+        lease_expires_at__lt=now,
+        attempts__lt=MAX_ATTEMPTS,
+    )
+    claimed = []
+    with transaction.atomic():
+        jobs = list(
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by('created_at', 'id')[:limit]
+        )
+        for job in jobs:
+            job.status = ReportJob.Status.RUNNING
+            job.claim_token = uuid.uuid4().hex
+            job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            job.attempts += 1
+            job.started_at = now
+            job.error = ''
+            job.save(update_fields=[
+                'status', 'claim_token', 'lease_expires_at', 'attempts', 'started_at', 'error',
+            ])
+            claimed.append((job.pk, job.claim_token))
+    return claimed
+
+
+def renew_leases(claims, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Extend the lease of jobs still being rendered by this worker."""
+    tokens = [token for _, token in claims]
+    if not tokens:
+        return 0
+    return ReportJob.objects.filter(
+        status=ReportJob.Status.RUNNING, claim_token__in=tokens,
+    ).update(lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds))
+
+
+def release_jobs(claims, error):
+    """Put claimed jobs back in the queue after their worker process died.
+
+    Jobs with attempts left become ``PENDING`` again right away instead
+    of waiting for their lease to expire; the others fail.
+    """
+    tokens = [token for _, token in claims]
+    if not tokens:
+        return 0
+    owned = ReportJob.objects.filter(status=ReportJob.Status.RUNNING, claim_token__in=tokens)
+    owned.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ReportJob.Status.FAILED, error=error, finished_at=timezone.now(), claim_token='',
+    )
+    return owned.update(status=ReportJob.Status.PENDING, error=error, claim_token='', lease_expires_at=None)
+
+
+def _write_result(job, pdf):
+    root = results_root()
+    root.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=root, prefix=f'.{job.pk}-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(pdf)
+        relative = f'{RESULTS_DIR}/{job.pk}-{job.claim_token}.pdf'
+        os.replace(tmp_name, Path(settings.MEDIA_ROOT) / relative)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    return relative
+
+
+def run_job(job_id, token):
+    """Render one claimed job. Safe to call from a pool worker process.
+
+    Results are only recorded while the claim token still matches, so a
+    worker whose lease was taken over cannot overwrite the newer run.
+    """
+    job = ReportJob.objects.select_related('requested_by').get(pk=job_id)
+    if job.claim_token != token or job.status != ReportJob.Status.RUNNING:
+        return False
+
+    owned = ReportJob.objects.filter(
+        pk=job_id, claim_token=token, status=ReportJob.Status.RUNNING,
+    )
+    try:
+        with slow_query_log(f'reports.jobs.{job.kind}'):
+            filename, pdf = RENDERERS[job.kind](job)
+        result_path = _write_result(job, pdf)
+    except Exception:
+        owned.update(
+            status=ReportJob.Status.FAILED,
+            error=traceback.format_exc(limit=5),
+            finished_at=timezone.now(),
+        )
+        return False
+
+    updated = owned.update(
+        status=ReportJob.Status.DONE,
+        filename=filename,
+        result_path=result_path,
+        finished_at=timezone.now(),
+    )
+    if not updated:
+        (Path(settings.MEDIA_ROOT) / result_path).unlink(missing_ok=True)
+    return bool(updated)
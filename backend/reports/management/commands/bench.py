@@ -0,0 +1,232 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from quotations.models import Quotation
+from sales.models import Sale
+from users.models import User
+
+# (name, route, kind); routes that need an object get the most recent one.
+ENDPOINTS = [
+    ('dashboard', 'dashboard-stats', 'report'),
+    ('sales_report', 'sales-report', 'report'),
+    ('inventory_report', 'inventory-report', 'report'),
+    ('quotations_report', 'quotations-report', 'report'),
+    ('clients_report', 'clients-report', 'report'),
+    ('clients_report_period', 'clients-report', 'report'),
+    ('sales_list', 'sale-list', 'list'),
+    ('sales_list_cursor', 'sale-list', 'list'),
+    ('sales_list_deep', 'sale-list', 'list'),
+    ('sales_list_cursor_deep', 'sale-list', 'list'),
+    ('quotations_list', 'quotation-list', 'list'),
+    ('clients_list', 'client-list', 'list'),
+    ('products_list', 'product-list', 'list'),
+    ('stock_movements_list', 'movement-list', 'list'),
+    ('expenses_list', 'expense-list', 'list'),
+    ('daily_sales_pdf', 'daily-sales-pdf', 'pdf'),
+    ('total_sales_pdf', 'total-sales-pdf', 'pdf'),
+    ('sales_export_pdf', 'sale-export-pdf', 'pdf'),
+    ('expenses_export_pdf', 'expense-export-pdf', 'pdf'),
+    ('sale_pdf', 'sale-generate-pdf', 'pdf'),
+    ('quotation_pdf', 'quotation-generate-pdf', 'pdf'),
+]
+
+QUERY_STRINGS = {
+    'sales_list_cursor': '?pagination=cursor',
+    'sales_list_cursor_deep': '?pagination=cursor',
+    # The last 90 days, so the date range reaches the join.
+    'clients_report_period': lambda: '?start_date={}&end_date={}'.format(
+        timezone.localdate() - timedelta(days=90), timezone.localdate(),
+    ),
+}
+
+# Lists measured at ``--page`` instead of the first page, by page number
+# (``OFFSET``) or by following the cursor's ``next`` links.
+DEEP_PAGES = {
+    'sales_list_deep': 'page',
+    'sales_list_cursor_deep': 'cursor',
+}
+
+DETAIL_MODELS = {
+    'sale-generate-pdf': Sale,
+    'quotation-generate-pdf': Quotation,
+}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile; exact for the small samples used here."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide los reportes, listados y PDF a través del cliente de pruebas de Django: '
+        'latencia p50/p95, consultas SQL por petición y pico de memoria, en JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Peticiones medidas por endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Peticiones previas sin medir.')
+        parser.add_argument('--page', type=int, default=500,
+                            help='Página profunda de los listados *_deep (la última si hay menos).')
+        parser.add_argument('--only', nargs='+', metavar='NOMBRE', help='Medir solo estos endpoints.')
+        parser.add_argument('--kind', choices=['report', 'list', 'pdf'], help='Medir solo un tipo de endpoint.')
+        parser.add_argument('--user', help='Usuario con el que se hacen las peticiones (por defecto, un administrador).')
+        parser.add_argument('--output', help='Archivo donde guardar el JSON; por defecto se imprime.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat debe ser al menos 1.')
+        if options['page'] < 1:
+            raise CommandError('--page debe ser al menos 1.')
+        self.page = options['page']
+
+        endpoints = self.select(options)
+        self.api = APIClient()
+        self.api.force_authenticate(self.get_user(options['user']))
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, route, kind in endpoints:
+                url = self.url_for(name, route)
+                if url is None:
+                    results.append({'name': name, 'kind': kind, 'skipped': 'sin datos'})
+                    continue
+                results.append(self.measure(name, kind, url, options['repeat'], options['warmup']))
+
+        report = {
+            'revision': git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'rows': {
+                'sales': Sale.objects.count(),
+                'quotations': Quotation.objects.count(),
+            },
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            Path(options['output']).write_text(payload + '\n', encoding='utf-8')
+            self.stderr.write(f"Resultados guardados en {options['output']}.")
+        else:
+            self.stdout.write(payload)
+
+    def select(self, options):
+        endpoints = ENDPOINTS
+        if options['only']:
+            unknown = set(options['only']) - {name for name, _, _ in ENDPOINTS}
+            if unknown:
+                raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(unknown))}.")
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['only']]
+        if options['kind']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint[2] == options['kind']]
+        return endpoints
+
+    def get_user(self, username):
+        users = User.objects.filter(is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(role=User.Role.ADMIN).first()
+        if user is None:
+            raise CommandError('No se encontró un usuario activo para hacer las peticiones.')
+        return user
+
+    def url_for(self, name, route):
+        kwargs = {}
+        model = DETAIL_MODELS.get(route)
+        if model is not None:
+            pk = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            kwargs['pk'] = pk
+        query = QUERY_STRINGS.get(name, '')
+        url = reverse(route, kwargs=kwargs) + (query() if callable(query) else query)
+        if name in DEEP_PAGES:
+            return self.deep_url(url, DEEP_PAGES[name])
+        return url
+
+    def deep_url(self, url, mode):
+        """URL of page ``--page`` of ``url``; the walk there is not timed."""
+        first = self.api.get(url).data
+        if not first['results']:
+            return None
+        if mode == 'page':
+            pages = -(-first['count'] // len(first['results']))
+            return f'{url}?page={min(self.page, pages)}'
+        data = first
+        for _ in range(self.page - 1):
+            if not data['next']:
+                break
+            url = data['next']
+            data = self.api.get(url).data
+        return url
+
+    def request(self, url):
+        response = self.api.get(url)
+        if response.streaming:
+            body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+        if response.status_code != 200:
+            raise CommandError(f'{url} respondió {response.status_code}: {body[:200]!r}')
+        return body
+
+    def measure(self, name, kind, url, repeat, warmup):
+        for _ in range(warmup):
+            self.request(url)
+
+        timings = []
+        queries = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                body = self.request(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Tracing slows everything down, so memory gets its own request.
+        tracemalloc.start()
+        try:
+            self.request(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'name': name,
+            'kind': kind,
+            'url': url,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'queries': max(queries),
+            'peak_memory_kib': round(peak / 1024, 1),
+            'response_bytes': len(body),
+        }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports.models import SalesDailyRollup
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el resumen diario de ventas usado por los reportes.'
+
+    def handle(self, *args, **options):
+        buckets = SalesDailyRollup.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Resumen diario reconstruido: {buckets} registros.'))
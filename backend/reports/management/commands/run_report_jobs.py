@@ -0,0 +1,88 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reports import worker
+from reports.jobs import DEFAULT_LEASE_SECONDS, claim_jobs, release_jobs, renew_leases
+
+
+class Command(BaseCommand):
+    help = 'Procesa en segundo plano los reportes y PDFs encolados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Procesos de generación en paralelo.')
+        parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS,
+                            help='Segundos de reserva de cada trabajo antes de considerarlo abandonado.')
+        parser.add_argument('--poll', type=float, default=2.0, help='Segundos entre revisiones de la cola.')
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        lease = options['lease']
+        poll = options['poll']
+        processed = 0
+
+        pool = self.start_pool(workers)
+        running = {}
+        try:
+            while True:
+                close_old_connections()
+                renew_leases(running.values(), lease)
+                broken = []
+                for claim in claim_jobs(workers - len(running), lease):
+                    try:
+                        running[pool.submit(worker.run, *claim)] = claim
+                    except BrokenProcessPool:
+                        broken.append(claim)
+
+                if running and not broken:
+                    done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id, _token = claim = running.pop(future)
+                        try:
+                            ok = future.result()
+                        except BrokenProcessPool:
+                            broken.append(claim)
+                            continue
+                        except Exception as exc:
+                            # The job keeps its lease and is retried once it expires.
+                            processed += 1
+                            self.stderr.write(f'Trabajo #{job_id}: el proceso falló ({exc}).')
+                            continue
+                        processed += 1
+                        message = f'Trabajo #{job_id}: {"completado" if ok else "fallido"}.'
+                        self.stdout.write(self.style.SUCCESS(message) if ok else self.style.WARNING(message))
+
+                if broken:
+                    # A worker process died: every job still in the pool is lost with it.
+                    broken += running.values()
+                    running.clear()
+                    requeued = release_jobs(broken, 'El proceso de generación terminó inesperadamente.')
+                    self.stderr.write(
+                        f'Se reinició el grupo de procesos; {requeued} de {len(broken)} trabajos '
+                        'vuelven a la cola.'
+                    )
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.start_pool(workers)
+                    continue
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll)
+        finally:
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Trabajos procesados: {processed}.'))
+
+    def start_pool(self, workers):
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=worker.init_worker,
+        )
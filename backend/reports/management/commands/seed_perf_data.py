@@ -0,0 +1,285 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from clients.models import Client
+from inventory.models import Product, ProductCategory, StockMovement, StockSnapshot
+from quotations.models import Quotation, QuotationItem
+from reports.cache import invalidate
+from reports.models import SalesDailyRollup
+from sales.models import Sale, SaleItem
+from sequences.models import DocumentSequence, format_number, highest_number
+from users.models import User
+
+BATCH_SIZE = 1000
+
+FIRST_NAMES = ['Ana', 'Carlos', 'María', 'José', 'Lucía', 'Jorge', 'Sofía', 'Luis', 'Daniela', 'Mario']
+LAST_NAMES = ['López', 'Martínez', 'Hernández', 'Flores', 'Reyes', 'Mejía', 'Castillo', 'Rivera']
+COMPANIES = ['Publicidad', 'Eventos', 'Comercial', 'Restaurante', 'Farmacia', 'Ferretería', 'Colegio']
+CATEGORIES = ['Vinil', 'Lona', 'Papel', 'Tinta', 'Acabados']
+MATERIALS = ['Mate', 'Brillante', 'Transparente', 'Microperforado', 'Reflectivo', 'Blackout']
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos de rendimiento (clientes, productos, cotizaciones y ventas con sus '
+        'líneas) con bulk_create. La misma semilla produce siempre los mismos datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500, help='Clientes a crear.')
+        parser.add_argument('--products', type=int, default=200, help='Productos a crear.')
+        parser.add_argument('--quotations', type=int, default=3000, help='Cotizaciones a crear.')
+        parser.add_argument('--sales', type=int, default=10000, help='Ventas a crear.')
+        parser.add_argument('--max-items', type=int, default=5, help='Máximo de líneas por documento.')
+        parser.add_argument('--days', type=int, default=365, help='Días hacia atrás en que se reparten las fechas.')
+        parser.add_argument('--seed', type=int, default=1, help='Semilla del generador.')
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        self.random = random.Random(seed)
+        self.max_items = max(1, options['max_items'])
+        self.days = max(1, options['days'])
+        self.today = timezone.localdate()
+        self.tag = f'PERF{seed}'
+
+        if Product.objects.filter(sku__startswith=f'{self.tag}-').exists():
+            raise CommandError(f'Ya existen datos de rendimiento con la semilla {seed}; use otra semilla.')
+
+        with transaction.atomic():
+            self.user = self.get_user()
+            clients = self.create_clients(options['clients'])
+            products = self.create_products(options['products'])
+            if not clients or not products:
+                raise CommandError('Se necesita al menos un cliente y un producto.')
+            quotations = self.create_quotations(options['quotations'], clients, products)
+            sales = self.create_sales(options['sales'], clients, products)
+            self.open_stock(products)
+            rollups = SalesDailyRollup.objects.rebuild()
+            # Everything above was bulk-created, without signals.
+            invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Semilla {seed}: {len(clients)} clientes, {len(products)} productos, '
+            f'{quotations} cotizaciones y {sales} ventas creadas; '
+            f'resumen diario con {rollups} registros.'
+        ))
+
+    def get_user(self):
+        user, _ = User.objects.get_or_create(
+            username='perf_seed',
+            defaults={'email': 'perf_seed@example.com', 'role': User.Role.ADMIN},
+        )
+        return user
+
+    def opening(self):
+        """Before the earliest ``moment``: when the products were stocked."""
+        day = self.today - timedelta(days=self.days)
+        return timezone.make_aware(datetime.combine(day, time(7)))
+
+    def moment(self):
+        """A business-hours timestamp within the last ``--days`` days."""
+        day = self.today - timedelta(days=self.random.randrange(self.days))
+        clock = time(self.random.randint(8, 17), self.random.randrange(60))
+        return timezone.make_aware(datetime.combine(day, clock))
+
+    def create_clients(self, count):
+        clients = []
+        for index in range(count):
+            first = self.random.choice(FIRST_NAMES)
+            last = self.random.choice(LAST_NAMES)
+            clients.append(Client(
+                name=f'{first} {last}',
+                company=f'{self.random.choice(COMPANIES)} {last}',
+                phone=f'{self.random.randint(2000, 9999)}-{index % 10000:04d}',
+                email=f'{self.tag.lower()}.cliente{index}@example.com',
+            ))
+        return Client.objects.bulk_create(clients, batch_size=BATCH_SIZE)
+
+    def create_products(self, count):
+        categories = []
+        for name in CATEGORIES:
+            category, _ = ProductCategory.objects.get_or_create(name=name)
+            categories.append(category)
+
+        opened_at = self.opening()
+        products = []
+        for index in range(count):
+            category = self.random.choice(categories)
+            cost = Decimal(self.random.randint(50, 5000)) / 100
+            products.append(Product(
+                name=f'{category.name} {self.random.choice(MATERIALS)} {index + 1}',
+                category=category,
+                sku=f'{self.tag}-{index + 1:06d}',
+                unit_measure=Product.UnitMeasure.SQUARE_INCH,
+                quantity_available=Decimal(self.random.randint(0, 50000)),
+                unit_cost=cost,
+                unit_price=cost * 2,
+                price_per_square_inch=Decimal(self.random.randint(2, 15)) / 100,
+                minimum_stock=Decimal(self.random.choice([0, 100, 500, 1000])),
+                created_at=opened_at,
+                updated_at=opened_at,
+            ))
+        return self.bulk_create_backdated(Product, products)
+
+    def dimensions(self):
+        return Decimal(self.random.choice([12, 18, 24, 36, 48])), Decimal(self.random.choice([12, 24, 36, 60]))
+
+    def create_quotations(self, count, clients, products):
+        if count < 1:
+            return 0
+        first = DocumentSequence.objects.reserve(
+            'COT', count,
+            seed=lambda: highest_number(Quotation.objects.all(), 'quotation_number', 'COT'),
+        )
+        statuses = [Quotation.Status.PENDING, Quotation.Status.APPROVED, Quotation.Status.REJECTED]
+        quotations, lines = [], []
+        for index in range(count):
+            created_at = self.moment()
+            quotation = Quotation(
+                quotation_number=format_number('COT', first + index),
+                client=self.random.choice(clients),
+                created_by=self.user,
+                status=self.random.choice(statuses),
+                apply_tax=self.random.random() < 0.5,
+                valid_until=timezone.localdate(created_at) + timedelta(days=15),
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            items = []
+            for _ in range(self.random.randint(1, self.max_items)):
+                width, height = self.dimensions()
+                product = self.random.choice(products)
+                item = QuotationItem(
+                    product=product,
+                    description=f'{product.name} {width}x{height}',
+                    width_inches=width,
+                    height_inches=height,
+                    price_per_square_inch=product.price_per_square_inch,
+                    quantity=self.random.randint(1, 5),
+                )
+                item.compute_line()
+                items.append(item)
+            quotation.compute_totals(items)
+            quotations.append(quotation)
+            lines.append(items)
+
+        self.bulk_create_documents(Quotation, quotations, QuotationItem, 'quotation', lines)
+        return count
+
+    def create_sales(self, count, clients, products):
+        if count < 1:
+            return 0
+        first = DocumentSequence.objects.reserve(
+            'FAC', count,
+            seed=lambda: highest_number(Sale.objects.all(), 'invoice_number', 'FAC'),
+        )
+        sales, lines = [], []
+        for index in range(count):
+            created_at = self.moment()
+            roll = self.random.random()
+            status = (
+                Sale.Status.COMPLETED if roll < 0.8
+                else Sale.Status.CANCELLED if roll < 0.85
+                else Sale.Status.PENDING
+            )
+            sale = Sale(
+                invoice_number=format_number('FAC', first + index),
+                client=self.random.choice(clients),
+                created_by=self.user,
+                status=status,
+                payment_method=self.random.choice(Sale.PaymentMethod.values),
+                discount_percentage=Decimal(self.random.choice([0, 0, 0, 5, 10])),
+                created_at=created_at,
+                updated_at=created_at,
+                completed_at=(
+                    created_at + timedelta(minutes=self.random.randint(5, 240))
+                    if status == Sale.Status.COMPLETED else None
+                ),
+            )
+            items = []
+            for _ in range(self.random.randint(1, self.max_items)):
+                width, height = self.dimensions()
+                product = self.random.choice(products)
+                quantity = self.random.randint(1, 5)
+                item = SaleItem(
+                    product=product,
+                    description=f'{product.name} {width}x{height}',
+                    width_inches=width,
+                    height_inches=height,
+                    unit_price=product.price_per_square_inch * width * height,
+                    quantity=quantity,
+                    quantity_used=width * height * quantity,
+                )
+                item.compute_line()
+                items.append(item)
+            sale.compute_totals(items)
+            sales.append(sale)
+            lines.append(items)
+
+        self.bulk_create_documents(Sale, sales, SaleItem, 'sale', lines)
+        # Stock levels are generated directly, so the exits are history only;
+        # ``open_stock`` then declares the balances they were taken from.
+        self.bulk_create_backdated(StockMovement, [
+            StockMovement(
+                product_id=item.product_id,
+                movement_type=StockMovement.MovementType.EXIT,
+                quantity=item.quantity_used,
+                reference=sale.invoice_number,
+                notes=f'Venta - {item.description}',
+                created_by=self.user,
+                created_at=sale.completed_at,
+            )
+            for sale, items in zip(sales, lines)
+            if sale.status == Sale.Status.COMPLETED
+            for item in items
+        ])
+        return count
+
+    def open_stock(self, products):
+        """Snapshot each product when it was stocked: its quantity plus every exit since."""
+        exits = dict(
+            StockMovement.objects.filter(product__in=products).order_by().values('product')
+            .annotate(total=Sum('quantity')).values_list('product', 'total')
+        )
+        taken_at = self.opening()
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(
+                product=product,
+                date=timezone.localdate(taken_at),
+                taken_at=taken_at,
+                balance=product.quantity_available + exits.get(product.pk, 0),
+                source=StockSnapshot.Source.EDIT,
+            )
+            for product in products
+        ], batch_size=BATCH_SIZE)
+
+    def bulk_create_backdated(self, model, objects):
+        """``bulk_create`` that keeps the ``created_at`` set on each object.
+
+        ``auto_now_add`` overwrites the timestamp on insert, so the spread
+        of dates is written back with one batched ``UPDATE``.
+        """
+        created_at = [obj.created_at for obj in objects]
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        for obj, moment in zip(objects, created_at):
+            obj.created_at = moment
+        fields = [field for field in ('created_at', 'updated_at') if hasattr(model, field)]
+        model.objects.bulk_update(objects, fields, batch_size=BATCH_SIZE)
+        return objects
+
+    def bulk_create_documents(self, model, documents, item_model, parent_field, lines):
+        """Insert documents with their dates, then their lines."""
+        self.bulk_create_backdated(model, documents)
+
+        items = []
+        for document, document_items in zip(documents, lines):
+            for item in document_items:
+                setattr(item, parent_field, document)
+                items.append(item)
+        item_model.objects.bulk_create(items, batch_size=BATCH_SIZE)
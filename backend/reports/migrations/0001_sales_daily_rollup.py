@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    Sale = apps.get_model('sales', 'Sale')
+    SalesDailyRollup = apps.get_model('reports', 'SalesDailyRollup')
+    amount_fields = ('subtotal', 'tax_amount', 'discount_amount', 'total_amount')
+    rows = []
+    for status, date_field in (('COMPLETED', 'completed_at'), ('CANCELLED', 'created_at')):
+        grouped = (
+            Sale.objects.filter(status=status, **{f'{date_field}__isnull': False})
+            .annotate(day=TruncDate(date_field))
+            .values('day', 'status', 'payment_method', 'created_by_id')
+            .annotate(sales_count=Count('id'), **{field: Sum(field) for field in amount_fields})
+            .order_by()
+        )
+        for row in grouped:
+            rows.append(SalesDailyRollup(
+                date=row['day'],
+                status=row['status'],
+                payment_method=row['payment_method'],
+                created_by_id=row['created_by_id'],
+                sales_count=row['sales_count'],
+                **{field: row[field] or 0 for field in amount_fields},
+            ))
+    SalesDailyRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sales', '0005_alter_sale_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('status', models.CharField(max_length=20, verbose_name='Estado')),
+                ('payment_method', models.CharField(max_length=20, verbose_name='Método de Pago')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Subtotal')),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Impuesto (ISV)')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto Descuento')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Ventas')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'db_table': 'sales_daily_rollup',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['status', 'date'], name='sales_rollup_status_date')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salesdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'status', 'payment_method', 'created_by'), name='sales_rollup_unique_bucket'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0001_sales_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('TOTAL_SALES_PDF', 'Reporte de Ventas Totales'), ('SALES_LIST_PDF', 'Ventas Filtradas'), ('EXPENSES_PDF', 'Reporte de Gastos')], max_length=30, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('RUNNING', 'En Proceso'), ('DONE', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('claim_token', models.CharField(blank=True, max_length=32, verbose_name='Token de Ejecución')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Vence Reserva')),
+                ('filename', models.CharField(blank=True, max_length=150, verbose_name='Nombre de Archivo')),
+                ('result_path', models.CharField(blank=True, max_length=255, verbose_name='Archivo Generado')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_jobs_status_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,231 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from utils.items import to_cents
+
+from .cache import invalidate
+
+
+ROLLUP_AMOUNT_FIELDS = ('subtotal', 'tax_amount', 'discount_amount', 'total_amount')
+
+
+class SalesDailyRollupManager(models.Manager):
+    """Keeps the daily sales rollup in sync with the ``sales`` table."""
+
+    # Only closed sales are rolled up; pending sales are still mutable and
+    # are counted live from the ``sales`` table.
+    tracked_statuses = ('COMPLETED', 'CANCELLED')
+
+    @staticmethod
+    def rollup_date(status, completed_at, created_at):
+        """Local business date a sale is reported under, or ``None`` if it has none.
+
+        A completed sale without ``completed_at`` (only possible when the
+        row is written directly) is left out, as ``rebuild`` does.
+        """
+        moment = completed_at if status == 'COMPLETED' else created_at
+        if moment is None:
+            return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, timezone.get_current_timezone())
+        return timezone.localdate(moment)
+
+    def record_sale(self, sale, sign=1):
+        """Add (``sign=1``) or remove (``sign=-1``) a single sale."""
+        if sale.status not in self.tracked_statuses:
+            return
+        date = self.rollup_date(sale.status, sale.completed_at, sale.created_at)
+        if date is None:
+            return
+        key = {
+            'date': date,
+            'status': sale.status,
+            'payment_method': sale.payment_method,
+            'created_by_id': sale.created_by_id,
+        }
+        # As stored, so that ``discard_sales`` later takes back the same amounts.
+        amounts = {field: to_cents(getattr(sale, field) or 0) for field in ROLLUP_AMOUNT_FIELDS}
+        self._apply(key, sign, 1, amounts)
+
+    def discard_sales(self, sales):
+        """Remove every tracked sale of ``sales`` before it is deleted or edited."""
+        rows = sales.filter(status__in=self.tracked_statuses).values(
+            'status', 'payment_method', 'created_by_id', 'completed_at', 'created_at',
+            *ROLLUP_AMOUNT_FIELDS
+        )
+        deltas = {}
+        for row in rows:
+            date = self.rollup_date(row['status'], row['completed_at'], row['created_at'])
+            if date is None:
+                continue
+            key = (date, row['status'], row['payment_method'], row['created_by_id'])
+            delta = deltas.setdefault(key, {'count': 0, **{f: Decimal('0') for f in ROLLUP_AMOUNT_FIELDS}})
+            delta['count'] += 1
+            for field in ROLLUP_AMOUNT_FIELDS:
+                delta[field] += row[field] or Decimal('0')
+
+        for (date, status, payment_method, created_by_id), delta in deltas.items():
+            count = delta.pop('count')
+            self._apply(
+                {
+                    'date': date,
+                    'status': status,
+                    'payment_method': payment_method,
+                    'created_by_id': created_by_id,
+                },
+                -1, count, delta,
+            )
+
+    def rebuild(self):
+        """Recompute the whole rollup from the ``sales`` table."""
+        from sales.models import Sale
+
+        amounts = {field: Sum(field) for field in ROLLUP_AMOUNT_FIELDS}
+        completed = (
+            Sale.objects.filter(status=Sale.Status.COMPLETED, completed_at__isnull=False)
+            .annotate(day=TruncDate('completed_at'))
+            .values('day', 'status', 'payment_method', 'created_by_id')
+            .annotate(sales_count=Count('id'), **amounts)
+            .order_by()
+        )
+        cancelled = (
+            Sale.objects.filter(status=Sale.Status.CANCELLED)
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'status', 'payment_method', 'created_by_id')
+            .annotate(sales_count=Count('id'), **amounts)
+            .order_by()
+        )
+        rows = [
+            self.model(
+                date=row['day'],
+                status=row['status'],
+                payment_method=row['payment_method'],
+                created_by_id=row['created_by_id'],
+                sales_count=row['sales_count'],
+                **{field: row[field] or Decimal('0') for field in ROLLUP_AMOUNT_FIELDS},
+            )
+            for queryset in (completed, cancelled)
+            for row in queryset
+        ]
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+            invalidate('sales')
+        return len(rows)
+
+    def _apply(self, key, sign, count, amounts):
+        updates = {'sales_count': F('sales_count') + sign * count}
+        for field, value in amounts.items():
+            updates[field] = F(field) + sign * value
+
+        with transaction.atomic():
+            row = self.select_for_update().filter(**key).order_by('pk').first()
+            if row is None:
+                try:
+                    with transaction.atomic():
+                        self.create(
+                            **key,
+                            sales_count=sign * count,
+                            **{field: sign * value for field, value in amounts.items()},
+                        )
+                    return
+                except IntegrityError:
+                    # Another transaction created the bucket first.
+                    row = self.select_for_update().filter(**key).order_by('pk').first()
+            self.filter(pk=row.pk).update(**updates)
+
+
+class SalesDailyRollup(models.Model):
+    """Daily sales totals per status, payment method and seller."""
+
+    date = models.DateField(verbose_name='Fecha')
+    status = models.CharField(max_length=20, verbose_name='Estado')
+    payment_method = models.CharField(max_length=20, verbose_name='Método de Pago')
+    created_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Ventas'
+    )
+    sales_count = models.IntegerField(default=0, verbose_name='Cantidad')
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Subtotal')
+    tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Impuesto (ISV)')
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Monto Descuento')
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Total')
+
+    objects = SalesDailyRollupManager()
+
+    class Meta:
+        db_table = 'sales_daily_rollup'
+        ordering = ['-date']
+        verbose_name = 'Resumen Diario de Ventas'
+        verbose_name_plural = 'Resúmenes Diarios de Ventas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'status', 'payment_method', 'created_by'],
+                name='sales_rollup_unique_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'date'], name='sales_rollup_status_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status} {self.payment_method} ({self.sales_count})"
+
+
+class ReportJob(models.Model):
+    """Heavy report/PDF generation queued for the background worker."""
+
+    class Kind(models.TextChoices):
+        TOTAL_SALES_PDF = 'TOTAL_SALES_PDF', 'Reporte de Ventas Totales'
+        SALES_LIST_PDF = 'SALES_LIST_PDF', 'Ventas Filtradas'
+        EXPENSES_PDF = 'EXPENSES_PDF', 'Reporte de Gastos'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        RUNNING = 'RUNNING', 'En Proceso'
+        DONE = 'DONE', 'Completado'
+        FAILED = 'FAILED', 'Fallido'
+
+    kind = models.CharField(max_length=30, choices=Kind.choices, verbose_name='Tipo')
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Estado'
+    )
+    params = models.JSONField(default=dict, blank=True, verbose_name='Parámetros')
+    requested_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+        verbose_name='Solicitado por'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    claim_token = models.CharField(max_length=32, blank=True, verbose_name='Token de Ejecución')
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name='Vence Reserva')
+    filename = models.CharField(max_length=150, blank=True, verbose_name='Nombre de Archivo')
+    result_path = models.CharField(max_length=255, blank=True, verbose_name='Archivo Generado')
+    error = models.TextField(blank=True, verbose_name='Error')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reportes'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_jobs_status_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
@@ -0,0 +1,135 @@
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer
+
+from sales.models import Sale
+from utils.dates import day_bounds
+from utils.pdf import build_data_table, build_header, build_summary_table, get_styles, render_pdf
+
+TOTAL_SALES_MAX_ROWS = 100
+
+
+def _products_text(sale, limit):
+    products_text = ', '.join(filter(None, [
+        item.description or (item.product.name if item.product else None)
+        for item in sale.items.all()
+    ])) or 'N/D'
+    return products_text[:limit] + ('…' if len(products_text) > limit else '')
+
+
+def render_daily_sales(day):
+    """Render the report of every sale created on ``day`` (local date)."""
+    styles = get_styles()
+    start, end = day_bounds(day)
+    day_sales = (
+        Sale.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .select_related('client')
+        .order_by('-created_at')
+        .prefetch_related('items__product')
+    )
+    summary = day_sales.aggregate(
+        total=Sum('total_amount'),
+        count=Count('id'),
+        completed=Count('id', filter=Q(status=Sale.Status.COMPLETED)),
+        pending=Count('id', filter=Q(status=Sale.Status.PENDING)),
+    )
+    total_amount = summary['total'] or Decimal('0')
+
+    elements = build_header()
+    elements.append(Paragraph(f"Reporte de Ventas del Día - {day.strftime('%d/%m/%Y')}", styles['Heading2']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    summary_data = [
+        ['Total Ventas:', f'L {total_amount:.2f}'],
+        ['Ventas Completadas:', str(summary['completed'])],
+        ['Ventas Pendientes:', str(summary['pending'])],
+        ['Total Ventas:', str(summary['count'])],
+    ]
+    elements.append(build_summary_table(summary_data))
+    elements.append(Spacer(1, 0.3*inch))
+
+    if summary['count']:
+        elements.append(Paragraph("Detalle de Ventas", styles['Heading3']))
+        elements.append(Spacer(1, 0.2*inch))
+
+        sales_data = [['Factura', 'Cliente', 'Productos', 'Estado', 'Total', 'Hora']]
+        for sale in day_sales:
+            created_at_local = timezone.localtime(sale.created_at)
+            status_text = 'Completada' if sale.status == Sale.Status.COMPLETED else 'Pendiente'
+            sales_data.append([
+                sale.invoice_number,
+                sale.client.name[:30],
+                _products_text(sale, 50),
+                status_text,
+                f'L {sale.total_amount:.2f}',
+                created_at_local.strftime('%H:%M')
+            ])
+
+        elements.append(build_data_table(
+            sales_data,
+            [1.2*inch, 1.8*inch, 2.3*inch, 1.0*inch, 1.0*inch, 0.8*inch],
+            extra_styles=[('ALIGN', (2, 0), (-1, -1), 'CENTER')],
+        ))
+    else:
+        elements.append(Paragraph("No hay ventas registradas hoy.", styles['Normal']))
+
+    return render_pdf(elements)
+
+
+def render_total_sales(max_rows=TOTAL_SALES_MAX_ROWS):
+    """Render the report of all completed sales."""
+    styles = get_styles()
+    all_sales = (
+        Sale.objects
+        .filter(status=Sale.Status.COMPLETED)
+        .select_related('client')
+        .order_by('-completed_at')
+        .prefetch_related('items__product')
+    )
+    summary = all_sales.aggregate(total=Sum('total_amount'), count=Count('id'))
+    total_amount = summary['total'] or Decimal('0')
+    total_count = summary['count']
+
+    elements = build_header()
+    elements.append(Paragraph(f"Reporte de Ventas Totales - {timezone.localdate().strftime('%d/%m/%Y')}", styles['Heading2']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    summary_data = [
+        ['Total Ventas:', f'L {total_amount:.2f}'],
+        ['Cantidad de Ventas:', str(total_count)],
+        ['Promedio por Venta:', f'L {(total_amount / total_count if total_count > 0 else 0):.2f}'],
+    ]
+    elements.append(build_summary_table(summary_data))
+    elements.append(Spacer(1, 0.3*inch))
+
+    if total_count:
+        elements.append(Paragraph("Detalle de Ventas", styles['Heading3']))
+        elements.append(Spacer(1, 0.2*inch))
+
+        sales_data = [['Factura', 'Cliente', 'Productos', 'Total', 'Fecha']]
+        for sale in all_sales[:max_rows]:  # Limit rows to keep the PDF size reasonable
+            sales_data.append([
+                sale.invoice_number,
+                sale.client.name[:30],
+                _products_text(sale, 60),
+                f'L {sale.total_amount:.2f}',
+                timezone.localtime(sale.completed_at or sale.created_at).strftime('%d/%m/%Y')
+            ])
+
+        elements.append(build_data_table(
+            sales_data,
+            [1.2*inch, 1.8*inch, 2.8*inch, 1.2*inch, 1.0*inch],
+            extra_styles=[('ALIGN', (2, 0), (-1, -1), 'CENTER')],
+        ))
+
+        if total_count > max_rows:
+            elements.append(Spacer(1, 0.2*inch))
+            elements.append(Paragraph(f"Mostrando las primeras {max_rows} ventas de {total_count} totales.", styles['Normal']))
+    else:
+        elements.append(Paragraph("No hay ventas registradas.", styles['Normal']))
+
+    return render_pdf(elements)
@@ -0,0 +1,103 @@
+"""Dashboard statistics computed with one conditional aggregate per table."""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from clients.models import Client
+from inventory.models import STOCK_STATUS_FILTERS, Product
+from quotations.models import Quotation
+from sales.models import Sale
+from simple_inventory.models import SimpleProduct
+from utils.dates import day_bounds
+
+from .models import SalesDailyRollup
+
+MANUAL_LOW_STOCK_THRESHOLD = 3
+MANUAL_LOW_STOCK_PREVIEW = 8
+
+
+def sales_stats(today):
+    """Completed figures from the daily rollup plus live pending counts."""
+    thirty_days_ago = today - timedelta(days=30)
+    today_start, today_end = day_bounds(today)
+    completed = SalesDailyRollup.objects.filter(status=Sale.Status.COMPLETED).aggregate(
+        total=Sum('total_amount'),
+        count=Sum('sales_count'),
+        recent_total=Sum('total_amount', filter=Q(date__gte=thirty_days_ago)),
+        today_total=Sum('total_amount', filter=Q(date=today)),
+        today_count=Sum('sales_count', filter=Q(date=today)),
+    )
+    pending = Sale.objects.filter(status=Sale.Status.PENDING).aggregate(
+        count=Count('id'),
+        today_count=Count('id', filter=Q(created_at__gte=today_start, created_at__lt=today_end)),
+    )
+
+    today_amount = float(completed['today_total'] or Decimal('0'))
+    today_count = completed['today_count'] or 0
+    return {
+        'total_amount': float(completed['total'] or Decimal('0')),
+        'total_count': completed['count'] or 0,
+        'pending_count': pending['count'],
+        'recent_30_days': float(completed['recent_total'] or Decimal('0')),
+        'today_amount': today_amount,
+        'today_count': today_count,
+        'today_completed_amount': today_amount,
+        'today_completed_count': today_count,
+        'today_pending_count': pending['today_count'],
+    }
+
+
+def quotation_stats():
+    totals = Quotation.objects.aggregate(
+        active=Count('id', filter=Q(status__in=[Quotation.Status.PENDING, Quotation.Status.APPROVED])),
+        total=Count('id'),
+    )
+    return {
+        'active': totals['active'],
+        'total': totals['total'],
+    }
+
+
+def inventory_stats():
+    """Main catalog counters plus the manual (SimpleProduct) low stock snapshot."""
+    active = Product.objects.filter(is_active=True)
+    products = active.aggregate(
+        out_of_stock=Count('id', filter=STOCK_STATUS_FILTERS['SIN_STOCK']),
+        total=Count('id'),
+    )
+    # Its own query, so it is answered from ``products_low_stock_idx``.
+    low_stock = active.low_stock().count()
+
+    manual_low_stock = SimpleProduct.objects.filter(quantity__lte=MANUAL_LOW_STOCK_THRESHOLD)
+    manual_low_stock_count = manual_low_stock.count()
+    manual_preview = list(
+        manual_low_stock.values('id', 'name', 'sku', 'quantity', 'description')[:MANUAL_LOW_STOCK_PREVIEW]
+    )
+
+    return {
+        'low_stock': low_stock,
+        'out_of_stock': products['out_of_stock'],
+        'total_products': products['total'],
+        'manual_low_stock_threshold': MANUAL_LOW_STOCK_THRESHOLD,
+        'manual_low_stock_count': manual_low_stock_count,
+        'manual_low_stock': manual_preview,
+    }
+
+
+def client_stats():
+    return {
+        'total': Client.objects.filter(is_active=True).count(),
+    }
+
+
+def dashboard_stats():
+    """Payload served by ``DashboardStatsView``; runs a fixed number of queries."""
+    today = timezone.localdate()
+    return {
+        'sales': sales_stats(today),
+        'quotations': quotation_stats(),
+        'inventory': inventory_stats(),
+        'clients': client_stats(),
+    }
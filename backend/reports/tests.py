@@ -0,0 +1,529 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from inventory.models import Product, ProductCategory, StockMovement
+from inventory.services import stock_ledger
+from quotations.models import Quotation
+from reports.cache import cached_report, single_flight
+from reports.jobs import MAX_ATTEMPTS, claim_jobs, release_jobs, run_job
+from reports.models import ROLLUP_AMOUNT_FIELDS, ReportJob, SalesDailyRollup
+from sales.models import Sale, SaleItem
+from simple_inventory.models import SimpleProduct
+from users.models import User
+from utils.factories import make_client, make_expense, make_product, make_sale
+
+
+class DashboardStatsViewTests(TestCase):
+    """The dashboard must run a fixed number of queries whatever the data size."""
+
+    # rollup, pending sales, quotations, products, low stock, manual count, manual preview, clients
+    EXPECTED_QUERIES = 8
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.category = ProductCategory.objects.create(name='Vinil')
+
+    def seed(self, count):
+        offset = Client.objects.count()
+        for index in range(offset, offset + count):
+            client = Client.objects.create(name=f'Cliente {index}', phone='9999-9999')
+            Product.objects.create(
+                name=f'Producto {index}', category=self.category,
+                unit_cost=Decimal('1'), unit_price=Decimal('2'),
+                quantity_available=Decimal(index % 4), minimum_stock=Decimal('2'),
+            )
+            SimpleProduct.objects.create(name=f'Manual {index}', quantity=index % 6)
+            Quotation.objects.create(client=client, created_by=self.user)
+            Sale.objects.create(client=client, created_by=self.user)
+            completed = Sale.objects.create(client=client, created_by=self.user, total_amount=Decimal('100'))
+            completed.complete_sale()
+
+    def get_stats(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.api.get('/api/reports/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(3)
+        self.get_stats()
+        self.seed(30)
+        self.get_stats()
+
+    def test_figures(self):
+        self.seed(12)
+        data = self.get_stats()
+
+        self.assertEqual(data['sales']['total_count'], 12)
+        self.assertEqual(data['sales']['total_amount'], 1200.0)
+        self.assertEqual(data['sales']['today_completed_count'], 12)
+        self.assertEqual(data['sales']['pending_count'], 12)
+        self.assertEqual(data['quotations'], {'active': 12, 'total': 12})
+
+        products = Product.objects.filter(is_active=True)
+        self.assertEqual(data['inventory']['low_stock'], len([p for p in products if p.is_low_stock]))
+        self.assertEqual(data['inventory']['out_of_stock'], products.filter(quantity_available=0).count())
+
+        manual_low = SimpleProduct.objects.filter(quantity__lte=3)
+        self.assertEqual(data['inventory']['manual_low_stock_count'], manual_low.count())
+        self.assertEqual(len(data['inventory']['manual_low_stock']), 8)
+        self.assertEqual(data['clients']['total'], 12)
+
+
+class ClientsReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.day = timezone.localdate() - timedelta(days=10)
+
+    def sale(self, client, total, days=0, status=Sale.Status.COMPLETED):
+        moment = timezone.make_aware(datetime.combine(self.day + timedelta(days=days), datetime.min.time()))
+        return Sale.objects.create(
+            client=client, created_by=self.user, status=status, total_amount=Decimal(total),
+            completed_at=moment + timedelta(hours=12) if status == Sale.Status.COMPLETED else None,
+        )
+
+    def test_totals_and_ranking_within_the_period(self):
+        steady, big, old = make_client(name='Constante'), make_client(name='Grande'), make_client(name='Antiguo')
+        self.sale(steady, '100')
+        self.sale(steady, '50', days=1)
+        self.sale(steady, '1000', days=-1)
+        self.sale(steady, '500', status=Sale.Status.PENDING)
+        self.sale(big, '200', days=1)
+        self.sale(old, '900', days=2)
+
+        end = self.day + timedelta(days=1)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.api.get(f'/api/reports/clients/?start_date={self.day}&end_date={end}')
+        self.assertEqual(response.status_code, 200)
+        ranking = [(row['name'], row['total_sales'], row['sales_count']) for row in response.json()['top_clients']]
+        self.assertEqual(ranking, [('Grande', 200.0, 1), ('Constante', 150.0, 2)])
+
+        # One join to ``sales``: a second one would multiply the sums.
+        [report_sql] = [query['sql'] for query in captured if 'SUM(' in query['sql']]
+        self.assertEqual(report_sql.count('JOIN "sales"'), 1)
+
+        everything = self.api.get('/api/reports/clients/').json()['top_clients']
+        self.assertEqual(
+            [(row['name'], row['total_sales'], row['sales_count']) for row in everything],
+            [('Constante', 1150.0, 3), ('Antiguo', 900.0, 1), ('Grande', 200.0, 1)],
+        )
+
+
+class ReportCacheTests(TestCase):
+    """Report payloads come from the shared cache until a write bumps a tag."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        override = override_settings(CACHES={'default': {
+            'BACKEND': 'utils.cache.FileBasedCache',
+            'LOCATION': location,
+        }})
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client_record = make_client()
+        self.product = make_product()
+
+    def write(self, func, *args, **kwargs):
+        # Tags are bumped on commit, which TestCase never reaches on its own.
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args, **kwargs)
+
+    def test_dashboard_is_served_from_cache_until_a_write(self):
+        first = self.api.get('/api/reports/dashboard/').json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get('/api/reports/dashboard/?token=x').json(), first)
+
+        sale = self.write(make_sale, self.client_record, [self.product], self.user, lines=1)
+        data = self.api.get('/api/reports/dashboard/').json()
+        self.assertEqual(data['sales']['pending_count'], first['sales']['pending_count'] + 1)
+
+        # complete_sale writes with QuerySet.update, which sends no signals.
+        self.assertEqual(self.api.get('/api/reports/clients/').json()['top_clients'], [])
+        self.write(sale.complete_sale)
+        data = self.api.get('/api/reports/dashboard/').json()
+        self.assertEqual(data['sales']['total_count'], first['sales']['total_count'] + 1)
+        self.assertEqual(len(self.api.get('/api/reports/clients/').json()['top_clients']), 1)
+
+        other = make_client()
+        self.assertEqual(self.api.get('/api/reports/dashboard/').json()['clients']['total'], 1)
+        self.write(other.delete)
+        self.assertEqual(self.api.get('/api/reports/dashboard/').json()['clients']['total'], 1)
+
+    def test_each_parameter_set_has_its_own_entry(self):
+        for index in range(2):
+            sale = make_sale(make_client(), [self.product], self.user, lines=1)
+            sale.complete_sale()
+        one = self.api.get('/api/reports/clients/?limit=1').json()
+        two = self.api.get('/api/reports/clients/?limit=2').json()
+        self.assertEqual((len(one['top_clients']), len(two['top_clients'])), (1, 2))
+
+    def test_unrelated_writes_keep_the_entry(self):
+        self.api.get('/api/reports/inventory/')
+        self.write(make_expense, self.user)
+        with self.assertNumQueries(0):
+            self.api.get('/api/reports/inventory/')
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return {'total': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached_report('Herd', (), QueryDict(), build)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [{'total': 42}] * 8)
+
+    def test_lock_is_released_when_the_build_fails(self):
+        def fail():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            single_flight('reports:failing', fail)
+        self.assertEqual(single_flight('reports:failing', lambda: 'ok', wait=0), 'ok')
+
+    def test_gives_up_waiting_on_a_stuck_builder(self):
+        cache.add('reports:stuck:lock', 'other-worker', 60)
+        self.assertEqual(single_flight('reports:stuck', lambda: 'built', wait=0.1), 'built')
+
+    def test_total_sales_pdf_is_cached(self):
+        first = self.api.get('/api/reports/total-sales-pdf/')
+        with self.assertNumQueries(0):
+            second = self.api.get('/api/reports/total-sales-pdf/')
+        self.assertEqual(second.content, first.content)
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            response = self.api.get('/api/reports/clients/?limit=muchos')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.api.get('/api/reports/clients/?limit=5').status_code, 200)
+
+
+class SalesDailyRollupTests(TestCase):
+    """Every write path must leave the rollup equal to a live aggregate over ``sales``."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client_obj = make_client()
+        self.products = [make_product(quantity_available=Decimal('500')) for _ in range(2)]
+
+    def sale(self, complete=False, **fields):
+        return make_sale(self.client_obj, self.products, self.user, complete=complete, **fields)
+
+    def assertRollupMatchesSales(self):
+        live = {}
+        for sale in Sale.objects.filter(status__in=SalesDailyRollup.objects.tracked_statuses):
+            date = SalesDailyRollup.objects.rollup_date(sale.status, sale.completed_at, sale.created_at)
+            if date is None:
+                continue
+            key = (date, sale.status, sale.payment_method, sale.created_by_id)
+            bucket = live.setdefault(key, [0] + [Decimal('0')] * len(ROLLUP_AMOUNT_FIELDS))
+            bucket[0] += 1
+            for index, field in enumerate(ROLLUP_AMOUNT_FIELDS, start=1):
+                bucket[index] += getattr(sale, field)
+        rolled = {
+            (row.date, row.status, row.payment_method, row.created_by_id):
+                [row.sales_count] + [getattr(row, field) for field in ROLLUP_AMOUNT_FIELDS]
+            for row in SalesDailyRollup.objects.exclude(sales_count=0)
+        }
+        self.assertEqual(rolled, live)
+
+    def test_complete_and_cancel(self):
+        completed, cancelled = self.sale(), self.sale()
+        self.assertEqual(self.api.post(f'/api/sales/{completed.pk}/complete/').status_code, 200)
+        self.assertEqual(self.api.post(f'/api/sales/{cancelled.pk}/cancel/').status_code, 200)
+        self.assertEqual(SalesDailyRollup.objects.filter(sales_count=1).count(), 2)
+        self.assertRollupMatchesSales()
+
+    def test_update_moves_the_totals(self):
+        sale = self.sale(complete=True)
+        response = self.api.patch(
+            f'/api/sales/{sale.pk}/', {'discount_percentage': '10', 'payment_method': 'TRANSFER'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRollupMatchesSales()
+
+    def test_status_changes_through_the_api(self):
+        sale = self.sale()
+        response = self.api.patch(f'/api/sales/{sale.pk}/', {'status': 'COMPLETED'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], Sale.Status.COMPLETED)
+        self.assertIsNotNone(response.json()['completed_at'])
+        self.assertEqual(SalesDailyRollup.objects.get(status=Sale.Status.COMPLETED).sales_count, 1)
+        self.assertRollupMatchesSales()
+
+        response = self.api.patch(f'/api/sales/{sale.pk}/', {'status': 'CANCELLED'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertRollupMatchesSales()
+
+        response = self.api.post('/api/sales/', {
+            'client': self.client_obj.pk, 'status': 'CANCELLED', 'payment_method': 'CASH', 'items': [],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['status'], Sale.Status.CANCELLED)
+        self.assertEqual(SalesDailyRollup.objects.get(status=Sale.Status.CANCELLED).sales_count, 2)
+        self.assertRollupMatchesSales()
+
+    def test_line_edits_on_a_closed_sale(self):
+        sale = self.sale(complete=True)
+        first, second = sale.items.order_by('pk')
+        response = self.api.patch(f'/api/sales/items/{first.pk}/', {'unit_price': '3.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertRollupMatchesSales()
+        self.assertEqual(self.api.delete(f'/api/sales/items/{second.pk}/').status_code, 204)
+        sale.refresh_from_db()
+        self.assertEqual(sale.subtotal, Decimal('3.00'))
+        self.assertRollupMatchesSales()
+
+    def test_destroy_and_delete_bulk(self):
+        sales = [self.sale(complete=True) for _ in range(3)] + [self.sale()]
+        self.api.post(f'/api/sales/{sales[3].pk}/cancel/')
+        self.assertEqual(self.api.delete(f'/api/sales/{sales[0].pk}/').status_code, 204)
+        self.assertRollupMatchesSales()
+        response = self.api.post('/api/sales/delete_bulk/', {'ids': [sales[1].pk, sales[3].pk]}, format='json')
+        self.assertEqual(response.json()['deleted'], 2)
+        self.assertRollupMatchesSales()
+
+    def test_rebuild(self):
+        self.sale(complete=True)
+        self.sale(complete=True, payment_method='TRANSFER')
+        cancelled = self.sale()
+        Sale.objects.filter(pk=cancelled.pk).update(status=Sale.Status.CANCELLED)
+        # Written behind the rollup's back, without a completion moment.
+        Sale.objects.create(client=self.client_obj, created_by=self.user, status=Sale.Status.COMPLETED)
+        SalesDailyRollup.objects.update(sales_count=99)
+        SalesDailyRollup.objects.rebuild()
+        self.assertRollupMatchesSales()
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            username='vendedor', email='v@example.com', password='x', role=User.Role.SELLER
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_async_export_enqueues_job_and_serves_result(self):
+        response = self.api.get('/api/expenses/export_pdf/?async=1&start_date=2024-01-01&token=secret')
+        self.assertEqual(response.status_code, 202)
+        job = ReportJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual(job.kind, ReportJob.Kind.EXPENSES_PDF)
+        self.assertEqual(job.params, {'start_date': ['2024-01-01']})
+
+        status_url = response.json()['status_url']
+        self.assertEqual(self.api.get(status_url).json()['status'], ReportJob.Status.PENDING)
+        self.assertEqual(self.api.get(f'{status_url}download/').status_code, 409)
+
+        [(job_id, token)] = claim_jobs(limit=5)
+        self.assertTrue(run_job(job_id, token))
+
+        data = self.api.get(status_url).json()
+        self.assertEqual(data['status'], ReportJob.Status.DONE)
+        download = self.api.get(data['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    def test_synchronous_export_is_unchanged(self):
+        response = self.api.get('/api/sales/export_pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_expired_lease_is_reclaimed_and_stale_worker_cannot_finish(self):
+        job = ReportJob.objects.create(kind=ReportJob.Kind.TOTAL_SALES_PDF, requested_by=self.user)
+        [(_, first_token)] = claim_jobs(limit=1)
+        self.assertEqual(claim_jobs(limit=1), [])
+
+        ReportJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        [(_, second_token)] = claim_jobs(limit=1)
+        self.assertNotEqual(first_token, second_token)
+
+        self.assertFalse(run_job(job.pk, first_token))
+        self.assertTrue(run_job(job.pk, second_token))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ReportJob.Status.DONE, 2))
+
+    def test_job_is_abandoned_after_max_attempts(self):
+        job = ReportJob.objects.create(
+            kind=ReportJob.Kind.TOTAL_SALES_PDF, requested_by=self.user,
+            status=ReportJob.Status.RUNNING, attempts=MAX_ATTEMPTS,
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(claim_jobs(limit=1), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.FAILED)
+
+    def test_runner_requeues_jobs_when_the_pool_breaks(self):
+        job = ReportJob.objects.create(kind=ReportJob.Kind.TOTAL_SALES_PDF, requested_by=self.user)
+        pools = []
+
+        class Pool:
+            """First pool loses its process; the next one renders in-process."""
+
+            def __init__(self, **kwargs):
+                self.broken = not pools
+                pools.append(self)
+
+            def submit(self, func, job_id, token):
+                future = Future()
+                if self.broken:
+                    future.set_exception(BrokenProcessPool('worker killed'))
+                else:
+                    future.set_result(run_job(job_id, token))
+                return future
+
+            def shutdown(self, **kwargs):
+                pass
+
+        out, err = StringIO(), StringIO()
+        command = 'reports.management.commands.run_report_jobs'
+        # close_old_connections() would close the test transaction's connection.
+        with mock.patch(f'{command}.ProcessPoolExecutor', Pool), mock.patch(f'{command}.close_old_connections'):
+            call_command('run_report_jobs', once=True, workers=1, poll=0, stdout=out, stderr=err)
+        self.assertEqual(len(pools), 2)
+        self.assertIn('1 de 1 trabajos vuelven a la cola', err.getvalue())
+        self.assertIn('Trabajos procesados: 1.', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ReportJob.Status.DONE, 2))
+
+    def test_released_jobs_fail_after_max_attempts(self):
+        job = ReportJob.objects.create(
+            kind=ReportJob.Kind.TOTAL_SALES_PDF, requested_by=self.user, attempts=MAX_ATTEMPTS - 1,
+        )
+        claims = claim_jobs(limit=1)
+        self.assertEqual(release_jobs(claims, 'boom'), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ReportJob.Status.FAILED, 'boom'))
+
+    def test_jobs_are_private_to_their_requester(self):
+        other = User.objects.create_user(
+            username='otro', email='o@example.com', password='x', role=User.Role.SELLER
+        )
+        job = ReportJob.objects.create(kind=ReportJob.Kind.TOTAL_SALES_PDF, requested_by=other)
+        self.assertEqual(self.api.get(f'/api/reports/jobs/{job.pk}/').status_code, 404)
+
+
+class PerfCommandTests(TestCase):
+    SIZES = {'clients': 4, 'products': 5, 'quotations': 6, 'sales': 12, 'max_items': 3}
+
+    def seed(self, seed):
+        call_command('seed_perf_data', seed=seed, stdout=StringIO(), **self.SIZES)
+
+    def snapshot(self):
+        return list(Sale.objects.order_by('invoice_number').values_list(
+            'invoice_number', 'status', 'total_amount', 'client__name'
+        ))
+
+    def test_same_seed_same_data(self):
+        snapshots = []
+        for _ in range(2):
+            with transaction.atomic():
+                self.seed(7)
+                snapshots.append(self.snapshot())
+                transaction.set_rollback(True)
+        self.assertEqual(len(snapshots[0]), 12)
+        self.assertEqual(snapshots[0], snapshots[1])
+
+    def test_totals_match_the_lines(self):
+        self.seed(3)
+        self.assertEqual(Quotation.objects.count(), 6)
+        for sale in Sale.objects.prefetch_related('items'):
+            self.assertGreaterEqual(len(sale.items.all()), 1)
+            expected = Sale(discount_percentage=sale.discount_percentage, tax_rate=sale.tax_rate)
+            expected.compute_totals(sale.items.all())
+            self.assertEqual(sale.total_amount, expected.total_amount.quantize(Decimal('0.01')))
+        self.assertEqual(SaleItem.objects.filter(sale__isnull=True).count(), 0)
+
+    def test_stock_history_is_backdated(self):
+        self.seed(4)
+        first_sale = Sale.objects.order_by('created_at').first().created_at
+        self.assertFalse(Product.objects.filter(created_at__gte=first_sale).exists())
+        movements = StockMovement.objects.values_list('reference', 'created_at')
+        self.assertTrue(movements)
+        completed = dict(Sale.objects.values_list('invoice_number', 'completed_at'))
+        self.assertTrue(all(moment == completed[reference] for reference, moment in movements))
+        # The opening snapshots plus the exits give back the generated stock.
+        checked, mismatches, unverifiable = stock_ledger.reconcile()
+        self.assertEqual((checked, mismatches, unverifiable), (5, [], []))
+
+    def test_bench_reports_json(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.seed(5)
+        out = StringIO()
+        call_command('bench', only=['dashboard', 'sales_list', 'sale_pdf'], repeat=2, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([row['name'] for row in report['results']], ['dashboard', 'sales_list', 'sale_pdf'])
+        for row in report['results']:
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+            self.assertGreater(row['queries'], 0)
+            self.assertGreater(row['peak_memory_kib'], 0)
+
+    def test_bench_deep_pages(self):
+        call_command('seed_perf_data', seed=1, stdout=StringIO(), **{**self.SIZES, 'sales': 45})
+        out = StringIO()
+        call_command(
+            'bench', only=['sales_list_deep', 'sales_list_cursor_deep'], page=2, repeat=1, warmup=0, stdout=out,
+        )
+        deep, cursor = json.loads(out.getvalue())['results']
+        self.assertTrue(deep['url'].endswith('/api/sales/?page=2'))
+        self.assertIn('cursor=', cursor['url'])
+        # Numbered pages pay for a COUNT(*); the keyset page does not.
+        self.assertEqual(deep['queries'], cursor['queries'] + 1)
@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     DashboardStatsView, SalesReportView, InventoryReportView,
-    QuotationsReportView, ClientsReportView, DailySalesPDFView, TotalSalesPDFView
+    QuotationsReportView, ClientsReportView, DailySalesPDFView, TotalSalesPDFView,
+    ReportJobDetailView, ReportJobDownloadView
 )
 
 urlpatterns = [
@@ -12,4 +13,6 @@ urlpatterns = [
     path('clients/', ClientsReportView.as_view(), name='clients-report'),
     path('daily-sales-pdf/', DailySalesPDFView.as_view(), name='daily-sales-pdf'),
     path('total-sales-pdf/', TotalSalesPDFView.as_view(), name='total-sales-pdf'),
+    path('jobs/<int:pk>/', ReportJobDetailView.as_view(), name='report-job-detail'),
+    path('jobs/<int:pk>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
@@ -1,36 +1,30 @@
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count
 from django.db.models.functions import TruncMonth
-from datetime import datetime, timedelta, time
 from decimal import Decimal
-from pathlib import Path
 
-from django.conf import settings
 from django.utils import timezone
+from django.http import FileResponse
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from pathlib import Path
 
 from sales.models import Sale
 from quotations.models import Quotation
-from inventory.models import Product
 from clients.models import Client
-from utils.pdf import add_branding_to_canvas
+from utils.pdf import pdf_response
 from simple_inventory.models import SimpleProduct
-
-
-def get_logo_path():
-    """Return an absolute path to the logo image if available."""
-    candidates = [
-        Path(settings.BASE_DIR) / 'logo.png',
-        Path(settings.BASE_DIR) / 'static' / 'logo.png',
-        Path(settings.BASE_DIR) / 'staticfiles' / 'logo.png',
-        Path(settings.BASE_DIR).parent / 'frontend' / 'public' / 'logo.png',
-        Path(settings.BASE_DIR) / 'frontend_dist' / 'logo.png',
-    ]
-    for path in candidates:
-        if path.exists():
-            return str(path)
-    return None
+from utils.dates import DateRange
+from .cache import CachedReportMixin, cached_report
+from .jobs import enqueue, wants_async
+from .models import ReportJob, SalesDailyRollup
+from .pdf import render_daily_sales, render_total_sales
+from .stats import dashboard_stats
 
 
 def safe_localtime(dt):
@@ -42,125 +36,36 @@ def safe_localtime(dt):
     return timezone.localtime(dt)
 
 
-class DashboardStatsView(APIView):
+class DashboardStatsView(CachedReportMixin, APIView):
     """General dashboard statistics."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('sales', 'quotations', 'products', 'clients')
     
-    def get(self, request):
-        # Sales statistics
-        total_sales = Sale.objects.filter(status=Sale.Status.COMPLETED).aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0')
-        
-        sales_count = Sale.objects.filter(status=Sale.Status.COMPLETED).count()
-        pending_sales = Sale.objects.filter(status=Sale.Status.PENDING).count()
-        
-        # Quotations statistics
-        active_quotations = Quotation.objects.filter(
-            status__in=[Quotation.Status.PENDING, Quotation.Status.APPROVED]
-        ).count()
-        
-        total_quotations = Quotation.objects.count()
-        
-        # Inventory statistics (main catalog)
-        low_stock_products = len([p for p in Product.objects.filter(is_active=True) if p.is_low_stock])
-        out_of_stock_products = Product.objects.filter(quantity_available=0, is_active=True).count()
-        total_products = Product.objects.filter(is_active=True).count()
-
-        # Manual inventory (SimpleProduct) low stock snapshot
-        manual_low_stock_threshold = 3
-        manual_products = SimpleProduct.objects.all()
-        manual_low_stock_all = [
-            {
-                'id': product.id,
-                'name': product.name,
-                'sku': product.sku,
-                'quantity': product.quantity,
-                'description': product.description,
-            }
-            for product in manual_products
-            if product.quantity <= manual_low_stock_threshold
-        ]
-        
-        # Clients statistics
-        total_clients = Client.objects.filter(is_active=True).count()
-        
-        # Recent sales (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_sales = Sale.objects.filter(
-            status=Sale.Status.COMPLETED,
-            completed_at__gte=thirty_days_ago
-        ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        # Today's sales (respecting local timezone date)
-        today = timezone.localdate()
-        today_completed_qs = Sale.objects.filter(
-            status=Sale.Status.COMPLETED,
-            completed_at__date=today
-        )
-        today_completed = today_completed_qs.aggregate(
-            total=Sum('total_amount'),
-            count=Count('id')
-        )
-        today_pending_count = Sale.objects.filter(
-            status=Sale.Status.PENDING,
-            created_at__date=today
-        ).count()
-        
-        return Response({
-            'sales': {
-                'total_amount': float(total_sales),
-                'total_count': sales_count,
-                'pending_count': pending_sales,
-                'recent_30_days': float(recent_sales),
-                'today_amount': float(today_completed['total'] or Decimal('0')),
-                'today_count': today_completed['count'] or 0,
-                'today_completed_amount': float(today_completed['total'] or Decimal('0')),
-                'today_completed_count': today_completed['count'] or 0,
-                'today_pending_count': today_pending_count
-            },
-            'quotations': {
-                'active': active_quotations,
-                'total': total_quotations
-            },
-            'inventory': {
-                'low_stock': low_stock_products,
-                'out_of_stock': out_of_stock_products,
-                'total_products': total_products,
-                'manual_low_stock_threshold': manual_low_stock_threshold,
-                'manual_low_stock_count': len(manual_low_stock_all),
-                'manual_low_stock': manual_low_stock_all[:8],
-            },
-            'clients': {
-                'total': total_clients
-            }
-        })
+    def build(self, request):
+        return dashboard_stats()
 
 
-class SalesReportView(APIView):
+class SalesReportView(CachedReportMixin, APIView):
     """Sales reports with filtering."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('sales', 'products')
     
-    def get(self, request):
+    def build(self, request):
         # Get query parameters
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        date_range = DateRange.from_params(request.query_params)
         group_by = request.query_params.get('group_by', 'month')  # month, week, day
         
-        queryset = Sale.objects.filter(status=Sale.Status.COMPLETED)
-        
-        if start_date:
-            queryset = queryset.filter(completed_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(completed_at__lte=end_date)
+        queryset = date_range.filter(
+            SalesDailyRollup.objects.filter(status=Sale.Status.COMPLETED), 'date'
+        )
         
         # Sales by period
         if group_by == 'month':
             sales_by_period = queryset.annotate(
-                period=TruncMonth('completed_at')
+                period=TruncMonth('date')
             ).values('period').annotate(
                 total=Sum('total_amount'),
-                count=Count('id')
+                count=Sum('sales_count')
             ).order_by('period')
         else:
             sales_by_period = []
@@ -179,13 +84,13 @@ class SalesReportView(APIView):
         # Sales by payment method
         sales_by_payment = queryset.values('payment_method').annotate(
             total=Sum('total_amount'),
-            count=Count('id')
+            count=Sum('sales_count')
         ).order_by('-total')
         
         # Total summary
         summary = queryset.aggregate(
             total_sales=Sum('total_amount'),
-            total_count=Count('id')
+            total_count=Sum('sales_count')
         )
         total_sales = summary['total_sales'] or Decimal('0')
         total_count = summary['total_count'] or 0
@@ -194,16 +99,16 @@ class SalesReportView(APIView):
         # Current month summary
         today = timezone.localdate()
         start_of_month = today.replace(day=1)
-        month_queryset = queryset.filter(completed_at__date__gte=start_of_month)
+        month_queryset = queryset.filter(date__gte=start_of_month)
         month_summary = month_queryset.aggregate(
             total_sales=Sum('total_amount'),
-            total_count=Count('id')
+            total_count=Sum('sales_count')
         )
         month_total = month_summary['total_sales'] or Decimal('0')
         month_count = month_summary['total_count'] or 0
         month_average = (month_total / month_count) if month_count else Decimal('0')
         
-        return Response({
+        return {
             'summary': {
                 'total_sales': float(total_sales),
                 'total_count': total_count,
@@ -239,14 +144,15 @@ class SalesReportView(APIView):
                 }
                 for item in sales_by_payment
             ]
-        })
+        }
 
 
-class InventoryReportView(APIView):
+class InventoryReportView(CachedReportMixin, APIView):
     """Inventory reports."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('products',)
     
-    def get(self, request):
+    def build(self, request):
         manual_products = SimpleProduct.objects.all().order_by('name')
         low_stock_threshold = int(request.query_params.get('low_stock_threshold', 3))
 
@@ -275,20 +181,21 @@ class InventoryReportView(APIView):
 
         total_units = sum(product.quantity for product in manual_products)
 
-        return Response({
+        return {
             'low_stock_products': low_stock,
             'categories': categories_stats,
             'total_inventory_value': float(total_units),
             'total_products': manual_products.count(),
             'low_stock_threshold': low_stock_threshold
-        })
+        }
 
 
-class QuotationsReportView(APIView):
+class QuotationsReportView(CachedReportMixin, APIView):
     """Quotations reports."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('quotations', 'clients')
     
-    def get(self, request):
+    def build(self, request):
         quotations = Quotation.objects.all()
         
         # Quotations by status
@@ -315,7 +222,7 @@ class QuotationsReportView(APIView):
             total=Sum('total_amount')
         ).order_by('-count')[:10]
         
-        return Response({
+        return {
             'by_status': [
                 {
                     'status': item['status'],
@@ -335,41 +242,51 @@ class QuotationsReportView(APIView):
                 }
                 for item in top_clients
             ]
-        })
+        }
 
 
-class ClientsReportView(APIView):
-    """Clients reports."""
+class ClientsReportView(CachedReportMixin, APIView):
+    """Clients reports (top clients by completed sales)."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('sales', 'clients')
+    default_limit = 20
+    max_limit = 100
     
-    def get(self, request):
-        clients = Client.objects.filter(is_active=True)
+    def build(self, request):
+        date_range = DateRange.from_params(request.query_params)
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ParseError('El límite debe ser un número entero.')
+        limit = max(1, min(limit, self.max_limit))
         
-        # Top clients by sales
-        top_clients = []
-        for client in clients:
-            total_sales = client.sales.filter(
-                status=Sale.Status.COMPLETED
-            ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-            
-            if total_sales > 0:
-                top_clients.append({
-                    'id': client.id,
-                    'name': client.name,
-                    'company': client.company,
-                    'total_sales': float(total_sales),
-                    'sales_count': client.sales.filter(
-                        status=Sale.Status.COMPLETED
-                    ).count()
-                })
+        clients = Client.objects.filter(is_active=True)
         
-        # Sort by total sales
-        top_clients.sort(key=lambda x: x['total_sales'], reverse=True)
+        # Top clients by sales, ranked and limited in the database
+        completed_sales = clients.filter(
+            date_range.q('sales__completed_at'), sales__status=Sale.Status.COMPLETED
+        )
+        top_clients = (
+            completed_sales
+            .values('id', 'name', 'company')
+            .annotate(total_sales=Sum('sales__total_amount'), sales_count=Count('sales__id'))
+            .filter(total_sales__gt=0)
+            .order_by('-total_sales', 'id')[:limit]
+        )
         
-        return Response({
-            'top_clients': top_clients[:20],
+        return {
+            'top_clients': [
+                {
+                    'id': item['id'],
+                    'name': item['name'],
+                    'company': item['company'],
+                    'total_sales': float(item['total_sales']),
+                    'sales_count': item['sales_count']
+                }
+                for item in top_clients
+            ],
             'total_active_clients': clients.count()
-        })
+        }
 
 
 class DailySalesPDFView(APIView):
@@ -377,277 +294,76 @@ class DailySalesPDFView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        from django.http import HttpResponse
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-        from reportlab.lib.enums import TA_CENTER
-        from io import BytesIO
-        
-        # Get today's sales using local date boundaries
-        today = timezone.localdate()
-        today_sales = (
-            Sale.objects
-            .filter(created_at__date=today)
-            .order_by('-created_at')
-            .prefetch_related('items__product')
-        )
-        
-        # Calculate totals
-        total_amount = today_sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        completed_count = today_sales.filter(status=Sale.Status.COMPLETED).count()
-        pending_count = today_sales.filter(status=Sale.Status.PENDING).count()
-        
-        # Create PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title with optional logo inline
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#FF6600'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-
-        logo_path = get_logo_path()
-        logo = None
-        if logo_path:
-            try:
-                logo = Image(logo_path, width=1.0 * inch, height=1.0 * inch)
-            except Exception:
-                logo = None
-        title_paragraph = Paragraph("RotuPrinters", title_style)
-        if logo:
-            from reportlab.platypus import Table
-            header_table = Table([[logo, title_paragraph]], colWidths=[1.2 * inch, 5.8 * inch])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            header_table.hAlign = 'CENTER'
-            elements.append(header_table)
-            elements.append(Spacer(1, 0.1 * inch))
-        else:
-            elements.append(Paragraph("RotuPrinters", title_style))
-        elements.append(Paragraph(f"Reporte de Ventas del Día - {today.strftime('%d/%m/%Y')}", styles['Heading2']))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Summary
-        summary_data = [
-            ['Total Ventas:', f'L {total_amount:.2f}'],
-            ['Ventas Completadas:', str(completed_count)],
-            ['Ventas Pendientes:', str(pending_count)],
-            ['Total Ventas:', str(today_sales.count())],
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F5F5F5')),
-        ]))
-        elements.append(summary_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Sales table
-        if today_sales.exists():
-            elements.append(Paragraph("Detalle de Ventas", styles['Heading3']))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            sales_data = [['Factura', 'Cliente', 'Productos', 'Estado', 'Total', 'Hora']]
-            
-            for sale in today_sales:
-                created_at_local = timezone.localtime(sale.created_at)
-                status_text = 'Completada' if sale.status == Sale.Status.COMPLETED else 'Pendiente'
-                products_text = ', '.join(filter(None, [
-                    item.description or (item.product.name if item.product else None)
-                    for item in sale.items.all()
-                ])) or 'N/D'
-                sales_data.append([
-                    sale.invoice_number,
-                    sale.client.name[:30],
-                    products_text[:50] + ('…' if len(products_text) > 50 else ''),
-                    status_text,
-                    f'L {sale.total_amount:.2f}',
-                    created_at_local.strftime('%H:%M')
-                ])
-            
-            sales_table = Table(sales_data, colWidths=[1.2*inch, 1.8*inch, 2.3*inch, 1.0*inch, 1.0*inch, 0.8*inch])
-            sales_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0055A4')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')])
-            ]))
-            elements.append(sales_table)
-        else:
-            elements.append(Paragraph("No hay ventas registradas hoy.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(
-            elements,
-            onFirstPage=add_branding_to_canvas,
-            onLaterPages=add_branding_to_canvas
-        )
-        
-        # Get PDF from buffer
-        pdf = buffer.getvalue()
-        buffer.close()
-        
-        # Create response
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Ventas_Dia_{timezone.now().strftime("%Y%m%d")}.pdf"'
-        response.write(pdf)
-        
-        return response
+        # Today's sales using local date boundaries
+        pdf = render_daily_sales(timezone.localdate())
+        return pdf_response(pdf, f'Ventas_Dia_{timezone.now().strftime("%Y%m%d")}.pdf')
 
 
 class TotalSalesPDFView(APIView):
     """Generate PDF report of all sales."""
     permission_classes = [IsAuthenticated]
+    report_tags = ('sales', 'clients', 'products')
     
     def get(self, request):
-        from django.http import HttpResponse
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-        from reportlab.lib.enums import TA_CENTER
-        from io import BytesIO
-        
-        # Get all completed sales
-        all_sales = (
-            Sale.objects
-            .filter(status=Sale.Status.COMPLETED)
-            .order_by('-completed_at')
-            .prefetch_related('items__product')
-        )
-        
-        # Calculate totals
-        total_amount = all_sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        total_count = all_sales.count()
-        
-        # Create PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title with optional logo inline
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#FF6600'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        logo_path = get_logo_path()
-        if logo_path:
-            logo = Image(logo_path, width=1.0 * inch, height=1.0 * inch)
-            title_paragraph = Paragraph("RotuPrinters", title_style)
-            from reportlab.platypus import Table
-            header_table = Table([[logo, title_paragraph]], colWidths=[1.2 * inch, 5.8 * inch])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            header_table.hAlign = 'CENTER'
-            elements.append(header_table)
-            elements.append(Spacer(1, 0.1 * inch))
-        else:
-            elements.append(Paragraph("RotuPrinters", title_style))
-        elements.append(Paragraph(f"Reporte de Ventas Totales - {timezone.localdate().strftime('%d/%m/%Y')}", styles['Heading2']))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Summary
-        summary_data = [
-            ['Total Ventas:', f'L {total_amount:.2f}'],
-            ['Cantidad de Ventas:', str(total_count)],
-            ['Promedio por Venta:', f'L {(total_amount / total_count if total_count > 0 else 0):.2f}'],
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F5F5F5')),
-        ]))
-        elements.append(summary_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Sales table
-        if all_sales.exists():
-            elements.append(Paragraph("Detalle de Ventas", styles['Heading3']))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            sales_data = [['Factura', 'Cliente', 'Productos', 'Total', 'Fecha']]
-            
-            for sale in all_sales[:100]:  # Limit to 100 sales for PDF size
-                products_text = ', '.join(filter(None, [
-                    item.description or (item.product.name if item.product else None)
-                    for item in sale.items.all()
-                ])) or 'N/D'
-                sales_data.append([
-                    sale.invoice_number,
-                    sale.client.name[:30],
-                    products_text[:60] + ('…' if len(products_text) > 60 else ''),
-                    f'L {sale.total_amount:.2f}',
-                    timezone.localtime(sale.completed_at or sale.created_at).strftime('%d/%m/%Y')
-                ])
-            
-            sales_table = Table(sales_data, colWidths=[1.2*inch, 1.8*inch, 2.8*inch, 1.2*inch, 1.0*inch])
-            sales_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0055A4')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')])
-            ]))
-            elements.append(sales_table)
-            
-            if all_sales.count() > 100:
-                elements.append(Spacer(1, 0.2*inch))
-                elements.append(Paragraph(f"Mostrando las primeras 100 ventas de {all_sales.count()} totales.", styles['Normal']))
-        else:
-            elements.append(Paragraph("No hay ventas registradas.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(
-            elements,
-            onFirstPage=add_branding_to_canvas,
-            onLaterPages=add_branding_to_canvas
+        if wants_async(request):
+            return enqueue(ReportJob.Kind.TOTAL_SALES_PDF, request)
+
+        pdf = cached_report(type(self).__name__, self.report_tags, request.query_params, render_total_sales)
+        return pdf_response(pdf, f'Ventas_Totales_{timezone.now().strftime("%Y%m%d")}.pdf')
+
+
+def get_report_job(request, pk):
+    """Jobs are visible to whoever requested them and to administrators."""
+    jobs = ReportJob.objects.all()
+    if not request.user.is_admin:
+        jobs = jobs.filter(requested_by=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+class ReportJobDetailView(APIView):
+    """Poll the status of a background report job."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_report_job(request, pk)
+        data = {
+            'job_id': job.pk,
+            'kind': job.kind,
+            'kind_display': job.get_kind_display(),
+            'status': job.status,
+            'attempts': job.attempts,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'error': 'No se pudo generar el reporte.' if job.status == ReportJob.Status.FAILED else '',
+            'download_url': None,
+        }
+        if job.status == ReportJob.Status.DONE:
+            data['download_url'] = reverse('report-job-download', args=[job.pk])
+        return Response(data)
+
+
+class ReportJobDownloadView(APIView):
+    """Download the PDF produced by a finished report job."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_report_job(request, pk)
+        if job.status != ReportJob.Status.DONE:
+            return Response(
+                {'detail': 'El reporte aún no está listo.', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        path = Path(settings.MEDIA_ROOT) / job.result_path
+        if not path.exists():
+            return Response(
+                {'detail': 'El archivo del reporte ya no está disponible.'},
+                status=status.HTTP_410_GONE
+            )
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=job.filename,
+            content_type='application/pdf',
         )
-        
-        # Get PDF from buffer
-        pdf = buffer.getvalue()
-        buffer.close()
-        
-        # Create response
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Ventas_Totales_{timezone.now().strftime("%Y%m%d")}.pdf"'
-        response.write(pdf)
-        
-        return response
@@ -0,0 +1,17 @@
+"""Entry points executed inside the report worker processes.
+
+Kept free of model imports at module level: pool processes are spawned
+fresh and must call ``django.setup()`` before anything touches the ORM.
+"""
+
+
+def init_worker():
+    import django
+
+    django.setup()
+
+
+def run(job_id, token):
+    from .jobs import run_job
+
+    return run_job(job_id, token)
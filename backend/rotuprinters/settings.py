@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'reports',
     'simple_inventory',
     'expenses',
+    'sequences',
 ]
 
 MIDDLEWARE = [
@@ -57,6 +58,37 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Prometheus metrics at /api/metrics/, shared by all workers through
+# one SQLite file.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_DB_PATH = os.getenv('METRICS_DB_PATH', str(BASE_DIR / 'metrics.sqlite3'))
+if METRICS_ENABLED:
+    MIDDLEWARE.append('utils.metrics.MetricsMiddleware')
+
+# Slow-query log: statements slower than SLOW_QUERY_THRESHOLD_MS are
+# logged with their view and call site, optionally explained, and the
+# worst ones listed at /api/metrics/slow-queries/ (stored in the
+# metrics file).
+SLOW_QUERY_THRESHOLD_MS = (
+    float(os.getenv('SLOW_QUERY_THRESHOLD_MS')) if os.getenv('SLOW_QUERY_THRESHOLD_MS') else None
+)
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'False') == 'True'
+SLOW_QUERY_TOP_N = int(os.getenv('SLOW_QUERY_TOP_N', '50'))
+if SLOW_QUERY_THRESHOLD_MS is not None:
+    MIDDLEWARE.append('utils.slow_queries.SlowQueryMiddleware')
+
+# Per-view Server-Timing headers, a log line per request and
+# ?__profile=1 (cProfile) for administrators.
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'False') == 'True'
+if REQUEST_PROFILING:
+    MIDDLEWARE.append('utils.profiling.RequestProfilingMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {'console': {'class': 'logging.StreamHandler'}},
+        'loggers': {'utils.profiling': {'handlers': ['console'], 'level': 'INFO'}},
+    }
+
 ROOT_URLCONF = 'rotuprinters.urls'
 
 TEMPLATES = [
@@ -85,6 +117,30 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Concurrency tests open one connection per thread; an in-memory
+    # SQLite database cannot make them wait on each other's locks.
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# A directory every worker on the host shares; report payloads are cached
+# here and invalidated on writes (reports/cache.py).
+CACHES = {
+    'default': {
+        'BACKEND': 'utils.cache.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '2000'))},
+    }
+}
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', '600'))
+
+# A product's balance is snapshotted after this many movements, so an
+# as-of-date stock query never replays more than that (utils/ledger.py).
+STOCK_CHECKPOINT_EVERY = int(os.getenv('STOCK_CHECKPOINT_EVERY', '50'))
+
+# Tests roll the database back but not the cache, so the suite runs
+# without one; cache tests install their own.
+TEST_RUNNER = 'rotuprinters.test_runner.TestRunner'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -0,0 +1,157 @@
+"""Query budgets for every GET endpoint of the API.
+
+Each route below has the number of queries it was measured at. The suite
+walks the URLconf, so a new endpoint fails here until it is given a
+budget, and every endpoint is requested twice: once over a small dataset
+and once after more rows are added. Going over budget or issuing more
+queries for the bigger dataset means a new N+1 slipped in.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reports.models import ReportJob
+from utils.factories import add_quotation_items, add_sale_items, make_user, seed_dataset
+from utils.testing import QueryBudgetMixin, api_routes
+
+QUERY_BUDGETS = {
+    # Numbers from an authenticated administrator (forced auth, so no user lookup).
+    'user-list': 2,
+    'user-me': 0,
+    'user-detail': 1,
+    'client-list': 2,
+    'client-detail': 3,
+    'category-list': 2,
+    'category-detail': 1,
+    'product-list': 2,
+    'product-low-stock': 2,
+    'product-out-of-stock': 1,
+    'product-as-of': 1,
+    'product-catalog': 2,
+    'product-detail': 1,
+    'product-reconcile': 1,
+    'movement-list': 2,
+    'movement-export-csv': 1,
+    'movement-export-ndjson': 1,
+    'movement-detail': 1,
+    'simple-product-list': 2,
+    'simple-product-as-of': 1,
+    'simple-product-detail': 2,
+    'simple-product-reconcile': 1,
+    'stock-movement-list': 2,
+    'stock-movement-export-csv': 1,
+    'stock-movement-export-ndjson': 1,
+    'stock-movement-detail': 1,
+    'quotation-list': 2,
+    'quotation-export-csv': 1,
+    'quotation-export-ndjson': 1,
+    'quotation-detail': 2,
+    'quotation-generate-pdf': 2,
+    'quotation-item-list': 2,
+    'quotation-item-detail': 1,
+    'sale-list': 2,
+    'sale-export-csv': 1,
+    'sale-export-ndjson': 1,
+    'sale-export-pdf': 2,
+    'sale-detail': 2,
+    'sale-generate-pdf': 2,
+    'sale-item-list': 2,
+    'sale-item-detail': 1,
+    'dashboard-stats': 8,
+    'sales-report': 5,
+    'inventory-report': 1,
+    'quotations-report': 4,
+    'clients-report': 2,
+    'daily-sales-pdf': 4,
+    'total-sales-pdf': 4,
+    'report-job-detail': 1,
+    'report-job-download': 1,
+    'expense-list': 1,
+    'expense-export-csv': 1,
+    'expense-export-ndjson': 1,
+    'expense-export-pdf': 2,
+    'expense-detail': 1,
+    'metrics': 0,
+    'slow-queries': 0,
+}
+
+
+class EndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.data = seed_dataset(self.user, size=2)
+        self.job = self.make_finished_job()
+
+    def make_finished_job(self):
+        result_path = 'report_jobs/budget.pdf'
+        path = Path(self.media_root) / result_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'%PDF-1.4\n')
+        return ReportJob.objects.create(
+            kind=ReportJob.Kind.TOTAL_SALES_PDF,
+            status=ReportJob.Status.DONE,
+            requested_by=self.user,
+            filename='budget.pdf',
+            result_path=result_path,
+        )
+
+    def grow(self):
+        """More rows everywhere, plus more lines on the documents under test."""
+        seed_dataset(self.user, size=6)
+        products = self.data['products']
+        add_sale_items(self.data['sales'][0], products, lines=6)
+        add_quotation_items(self.data['quotations'][0], products, lines=6)
+
+    def url_for(self, name, entry):
+        kwargs = {}
+        if 'pk' in entry.pattern.regex.groupindex or '<int:pk>' in str(entry.pattern):
+            kwargs['pk'] = self.detail_pk(entry)
+        return reverse(name, kwargs=kwargs)
+
+    def detail_pk(self, entry):
+        queryset = getattr(entry.callback.cls, 'queryset', None)
+        if queryset is None:
+            return self.job.pk
+        return queryset.model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+    def measure_all(self):
+        return {
+            name: len(self.count_queries(self.url_for(name, entry)))
+            for name, entry in api_routes()
+        }
+
+    def test_every_route_has_a_budget(self):
+        routes = {name for name, _ in api_routes()}
+        self.assertEqual(sorted(routes - set(QUERY_BUDGETS)), [], 'Routes without a query budget.')
+        self.assertEqual(sorted(set(QUERY_BUDGETS) - routes), [], 'Budgets for routes that no longer exist.')
+
+    def test_routes_stay_within_budget_as_data_grows(self):
+        small = self.measure_all()
+        self.grow()
+        large = self.measure_all()
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(route=name):
+                self.assertLessEqual(small[name], budget, f'{name} went over its query budget.')
+                self.assertEqual(
+                    small[name], large[name],
+                    f'{name}: query count grew with the data ({small[name]} -> {large[name]}).'
+                )
@@ -10,6 +10,9 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from utils.metrics import MetricsView
+from utils.slow_queries import SlowQueryView
+
 # Swagger/ReDoc Configuration
 schema_view = get_schema_view(
     openapi.Info(
@@ -36,6 +39,8 @@ urlpatterns = [
     path('api/sales/', include('sales.urls')),
     path('api/reports/', include('reports.urls')),
     path('api/expenses/', include('expenses.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/metrics/slow-queries/', SlowQueryView.as_view(), name='slow-queries'),
     
     # API Documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator
 from django.conf import settings
 from decimal import Decimal
 
+from utils.items import to_cents
+
 
 class Sale(models.Model):
     """Model for sales/invoices."""
@@ -101,69 +103,104 @@ class Sale(models.Model):
     class Meta:
         db_table = 'sales'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='sales_created_id_idx'),
+            models.Index(fields=['status', 'completed_at'], name='sales_status_completed_idx'),
+        ]
         verbose_name = 'Venta'
         verbose_name_plural = 'Ventas'
     
     def __str__(self):
         return f"{self.invoice_number} - {self.client.name}"
     
-    def calculate_totals(self):
-        """Calculate subtotal, tax and total from items."""
-        self.subtotal = sum(item.total for item in self.items.all())
+    def calculate_totals(self, items=None):
+        """Calculate subtotal, tax and total from items.
+
+        ``items`` lets batched writers pass the lines they just saved
+        instead of reading them back.
+        """
+        if items is None:
+            items = self.items.all()
+        self.compute_totals(items)
+        self.save()
+
+    def compute_totals(self, items):
+        """Set the totals from ``items`` without saving."""
+        self.subtotal = sum((item.total for item in items), Decimal('0'))
         self.discount_amount = self.subtotal * (self.discount_percentage / Decimal('100'))
         subtotal_after_discount = self.subtotal - self.discount_amount
-        self.tax_amount = subtotal_after_discount * (self.tax_rate / Decimal('100'))
+        # The model default comes from a float setting.
+        tax_rate = Decimal(str(self.tax_rate))
+        self.tax_amount = subtotal_after_discount * (tax_rate / Decimal('100'))
         self.total_amount = subtotal_after_discount + self.tax_amount
-        self.save()
     
     def complete_sale(self):
         """Complete the sale and update inventory."""
+        from django.db import transaction
         from django.utils import timezone
         from inventory.models import StockMovement
+        from inventory.services import post_stock_movements
+        from quotations.models import Quotation
+        from reports.cache import invalidate
+        from reports.models import SalesDailyRollup
         
         if self.status == self.Status.COMPLETED:
             return
         
-        # Update inventory for each item
-        for item in self.items.all():
-            # Create stock movement
-            StockMovement.objects.create(
-                product=item.product,
-                movement_type=StockMovement.MovementType.EXIT,
-                quantity=item.quantity_used,
-                reference=self.invoice_number,
-                notes=f'Venta - {item.description}',
-                created_by=self.created_by
+        with transaction.atomic():
+            now = timezone.now()
+            # Claim the status change first: when two requests complete the
+            # same sale at once only one of them posts the stock.
+            claimed = Sale.objects.filter(pk=self.pk).exclude(status=self.Status.COMPLETED).update(
+                status=self.Status.COMPLETED, completed_at=now, updated_at=now
             )
-        
-        self.status = self.Status.COMPLETED
-        self.completed_at = timezone.now()
-        self.save()
-        
-        # Update quotation status if exists
-        if self.quotation:
-            self.quotation.status = 'CONVERTED'
-            self.quotation.save()
+            if not claimed:
+                self.refresh_from_db()
+                return
+            self.status = self.Status.COMPLETED
+            self.completed_at = now
+            self.updated_at = now
+            invalidate('sales', 'quotations')
+
+            # One movement per item, one stock update per product
+            post_stock_movements([
+                StockMovement(
+                    product_id=item.product_id,
+                    movement_type=StockMovement.MovementType.EXIT,
+                    quantity=item.quantity_used,
+                    reference=self.invoice_number,
+                    notes=f'Venta - {item.description}',
+                    created_by_id=self.created_by_id
+                )
+                for item in self.items.all()
+            ])
+            SalesDailyRollup.objects.record_sale(self)
+            
+            # Update quotation status if exists
+            if self.quotation_id:
+                Quotation.objects.filter(pk=self.quotation_id).update(
+                    status=Quotation.Status.CONVERTED, updated_at=now
+                )
+                if Sale.quotation.is_cached(self):
+                    self.quotation.status = Quotation.Status.CONVERTED
     
     def save(self, *args, **kwargs):
+        from django.db import transaction
         from django.utils import timezone
-
-        if not self.invoice_number:
-            # Auto-generate invoice number
-            last_sale = Sale.objects.order_by('-id').first()
-            if last_sale and last_sale.invoice_number.startswith('FAC-'):
-                try:
-                    last_number = int(last_sale.invoice_number.split('-')[1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.invoice_number = f"FAC-{new_number:06d}"
+        from sequences.models import DocumentSequence, highest_number
 
         if self.completed_at and timezone.is_naive(self.completed_at):
             self.completed_at = timezone.make_aware(self.completed_at, timezone.get_current_timezone())
-        super().save(*args, **kwargs)
+
+        # The number is taken in the same transaction as the insert, so a
+        # failed insert gives it back and invoices stay gapless.
+        with transaction.atomic():
+            if not self.invoice_number:
+                self.invoice_number = DocumentSequence.objects.next_number(
+                    'FAC',
+                    seed=lambda: highest_number(Sale.objects.all(), 'invoice_number', 'FAC'),
+                )
+            super().save(*args, **kwargs)
 
 
 class SaleItem(models.Model):
@@ -233,11 +270,14 @@ class SaleItem(models.Model):
     def __str__(self):
         return f"{self.sale.invoice_number} - {self.product.name}"
     
-    def save(self, *args, **kwargs):
-        # Calculate square inches and total
+    def compute_line(self):
+        """Calculate square inches and total as they will be stored."""
         if self.width_inches and self.height_inches:
-            self.square_inches = self.width_inches * self.height_inches
-        self.total = self.unit_price * self.quantity
+            self.square_inches = to_cents(self.width_inches * self.height_inches)
+        self.total = to_cents(self.unit_price * self.quantity)
+
+    def save(self, *args, **kwargs):
+        self.compute_line()
         super().save(*args, **kwargs)
         # Update sale totals
         self.sale.calculate_totals()
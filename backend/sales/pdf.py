@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+from utils.pdf import (
+    BRAND_COLOR, build_data_table, build_header, build_info_table,
+    build_summary_table, get_styles, render_pdf,
+)
+from utils.pdf_store import PDFArtifactStore
+
+from .models import Sale
+
+SALES_LIST_MAX_ROWS = 200
+
+# Invoices of completed sales never change, so they are rendered once.
+invoice_store = PDFArtifactStore('invoices')
+
+
+def render_invoice(sale):
+    """Render the PDF invoice of a single sale."""
+    styles = get_styles()
+    elements = build_header(with_logo=False)
+
+    # Company header
+    elements.append(Paragraph("Diseño Gráfico, Rotulación e Impresión", styles['Normal']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Invoice info
+    invoice_data = [
+        ['Factura #:', sale.invoice_number],
+        ['Fecha:', sale.created_at.strftime('%d/%m/%Y %H:%M')],
+        ['Cliente:', sale.client.name],
+        ['RTN Cliente:', sale.client.rtn or 'N/A'],
+        ['Ventas:', sale.created_by.get_full_name() or sale.created_by.username],
+        ['Método de Pago:', sale.get_payment_method_display()],
+    ]
+    elements.append(build_info_table(invoice_data, [2*inch, 4*inch]))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Items table
+    items_data = [['Producto', 'Cantidad', 'Precio Unit.', 'Total']]
+    for item in sale.items.all():
+        items_data.append([
+            item.product.name,
+            str(item.quantity),
+            f'L {item.unit_price:.2f}',
+            f'L {(item.quantity * item.unit_price):.2f}'
+        ])
+
+    elements.append(build_data_table(
+        items_data,
+        [3*inch, 1*inch, 1.5*inch, 1.5*inch],
+        font_size=10,
+        extra_styles=[('ALIGN', (1, 0), (-1, -1), 'RIGHT')],
+    ))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Totals
+    totals_data = [
+        ['Subtotal:', f'L {sale.subtotal:.2f}'],
+        ['ISV (15%):', f'L {sale.tax_amount:.2f}'],
+    ]
+
+    if sale.discount_amount > 0:
+        totals_data.append(['Descuento:', f'- L {sale.discount_amount:.2f}'])
+
+    totals_data.append(['TOTAL:', f'L {sale.total_amount:.2f}'])
+
+    totals_table = Table(totals_data, colWidths=[5*inch, 2*inch])
+    totals_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 14),
+        ('TEXTCOLOR', (0, -1), (-1, -1), BRAND_COLOR),
+        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(totals_table)
+
+    return render_pdf(elements)
+
+
+def render_sales_list(queryset, date_from=None, date_to=None, max_rows=SALES_LIST_MAX_ROWS):
+    """Render a filtered sales listing with its summary block."""
+    styles = get_styles()
+    queryset = queryset.order_by('-created_at')
+
+    summary = queryset.aggregate(
+        total=Sum('total_amount'),
+        count=Count('id'),
+        completed=Count('id', filter=Q(status=Sale.Status.COMPLETED)),
+        pending=Count('id', filter=Q(status=Sale.Status.PENDING)),
+        cancelled=Count('id', filter=Q(status=Sale.Status.CANCELLED)),
+    )
+    total_amount = summary['total'] or Decimal('0')
+    total_count = summary['count']
+    sales = list(queryset[:max_rows])
+
+    elements = build_header(space_after=20)
+
+    elements.append(Paragraph("Ventas Filtradas", styles['Heading2']))
+    if date_from or date_to:
+        date_range_text = f"Rango: {date_from or 'inicio'} - {date_to or 'hoy'}"
+        elements.append(Paragraph(date_range_text, styles['Normal']))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    summary_data = [
+        ['Monto Total:', f'L {total_amount:.2f}'],
+        ['Cantidad de Ventas:', str(total_count)],
+        ['Completadas:', str(summary['completed'])],
+        ['Pendientes:', str(summary['pending'])],
+        ['Canceladas:', str(summary['cancelled'])],
+    ]
+    elements.append(build_summary_table(summary_data, font_size=11, padding=6))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    if sales:
+        elements.append(Paragraph('Detalle de Ventas', styles['Heading3']))
+        elements.append(Spacer(1, 0.1 * inch))
+        table_data = [[
+            '# Factura', 'Cliente', 'Ventas',
+            'Pago', 'Fecha y Hora', 'Total'
+        ]]
+        payment_map = dict(Sale.PaymentMethod.choices)
+        for sale in sales:
+            created_local = timezone.localtime(sale.created_at)
+            table_data.append([
+                sale.invoice_number,
+                sale.client.name[:25],
+                (sale.created_by.get_full_name() or sale.created_by.username)[:20] if sale.created_by else 'N/D',
+                payment_map.get(sale.payment_method, sale.payment_method),
+                created_local.strftime('%d/%m/%Y %H:%M'),
+                f'L {sale.total_amount:.2f}',
+            ])
+
+        elements.append(build_data_table(
+            table_data,
+            [1.0 * inch, 1.6 * inch, 1.6 * inch, 1.0 * inch, 1.2 * inch, 1.0 * inch],
+            header_padding=10,
+            grid_width=0.5,
+            extra_styles=[('ALIGN', (3, 1), (-1, -1), 'CENTER')],
+        ))
+
+        if total_count > max_rows:
+            elements.append(Spacer(1, 0.1 * inch))
+            elements.append(Paragraph(
+                f"Mostrando las primeras {max_rows} ventas de {total_count} registros filtrados.",
+                styles['Normal']
+            ))
+    else:
+        elements.append(Paragraph('No hay ventas para los filtros seleccionados.', styles['Normal']))
+
+    return render_pdf(elements)
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Sale, SaleItem
+from utils.items import prefetch_line_items, sync_line_items
 
 
 class SaleItemSerializer(serializers.ModelSerializer):
@@ -13,12 +15,19 @@ class SaleItemSerializer(serializers.ModelSerializer):
             'width_inches', 'height_inches', 'square_inches',
             'unit_price', 'quantity', 'quantity_used', 'total'
         ]
-        read_only_fields = ['id', 'square_inches', 'total']
+        read_only_fields = ['square_inches', 'total']
+
+
+class SaleLineSerializer(SaleItemSerializer):
+    """A line nested in its sale; ``id`` is only writable here."""
+    # Optional on input: items sent back with their id are updated in place.
+    # ``sync_line_items`` only matches ids among the parent's own lines.
+    id = serializers.IntegerField(required=False)
 
 
 class SaleSerializer(serializers.ModelSerializer):
     """Serializer for Sale model."""
-    items = SaleItemSerializer(many=True, required=False)
+    items = SaleLineSerializer(many=True, required=False)
     client_name = serializers.CharField(source='client.name', read_only=True)
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
     quotation_number = serializers.CharField(source='quotation.quotation_number', read_only=True)
@@ -44,12 +53,11 @@ class SaleSerializer(serializers.ModelSerializer):
         if request and hasattr(request, 'user'):
             validated_data['created_by'] = request.user
         
-        sale = Sale.objects.create(**validated_data)
-        
-        for item_data in items_data:
-            SaleItem.objects.create(sale=sale, **item_data)
-        
-        sale.calculate_totals()
+        with transaction.atomic():
+            sale = Sale.objects.create(**validated_data)
+            items = sync_line_items(sale, 'items', items_data, created=True)
+            sale.calculate_totals(items)
+        prefetch_line_items(sale)
         return sale
     
     def update(self, instance, validated_data):
@@ -57,15 +65,14 @@ class SaleSerializer(serializers.ModelSerializer):
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
-        
-        if items_data is not None:
-            # Delete existing items and create new ones
-            instance.items.all().delete()
-            for item_data in items_data:
-                SaleItem.objects.create(sale=instance, **item_data)
-        
-        instance.calculate_totals()
+
+        with transaction.atomic():
+            items = None
+            if items_data is not None:
+                items = sync_line_items(instance, 'items', items_data)
+            # calculate_totals() saves the instance with the new attributes.
+            instance.calculate_totals(items)
+        prefetch_line_items(instance)
         return instance
 
 
@@ -83,6 +90,9 @@ class SaleListSerializer(serializers.ModelSerializer):
         ]
     
     def get_items_count(self, obj):
+        # Annotated by the viewset's list queryset.
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.items.count()
 
 
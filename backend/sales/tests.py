@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from clients.models import Client
+from inventory.models import Product, ProductCategory
+from users.models import User
+from utils.testing import QueryBudgetMixin
+
+from .models import Sale, SaleItem
+
+
+class SaleExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        client = Client.objects.create(name='Cliente Ñandú', phone='9999-9999')
+        for index in range(5):
+            Sale.objects.create(
+                client=client, created_by=self.user, total_amount=Decimal(index),
+                status=Sale.Status.COMPLETED if index % 2 else Sale.Status.PENDING,
+            )
+
+    def test_csv_streams_filtered_rows(self):
+        response = self.api.get('/api/sales/export_csv/?status=COMPLETED')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][0], 'Factura')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[5] for row in rows[1:]}, {'Cliente Ñandú'})
+
+    def test_csv_neutralises_formulas(self):
+        Client.objects.update(name='=HYPERLINK("http://x","y")')
+        Sale.objects.filter(total_amount=1).update(total_amount=Decimal('-1'))
+        response = self.api.get('/api/sales/export_csv/?status=COMPLETED&ordering=total_amount')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        row = list(csv.reader(io.StringIO(content)))[1]
+        self.assertEqual(row[5], '\'=HYPERLINK("http://x","y")')
+        self.assertIn('-1.00', row)  # numbers are left alone
+        response = self.api.get('/api/sales/export_ndjson/')
+        record = json.loads(b''.join(response.streaming_content).decode().splitlines()[0])
+        self.assertEqual(record['client_name'], '=HYPERLINK("http://x","y")')
+
+    def test_ndjson_one_object_per_line(self):
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/sales/export_ndjson/?ordering=total_amount')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['total_amount'] for r in records], ['0.00', '1.00', '2.00', '3.00', '4.00'])
+        self.assertEqual(records[0]['client_name'], 'Cliente Ñandú')
+
+
+class SaleItemsWriteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client_obj = Client.objects.create(name='Cliente', phone='9999-9999')
+        category = ProductCategory.objects.create(name='Vinil')
+        self.product = Product.objects.create(
+            name='Vinil', category=category, unit_cost=Decimal('1'), unit_price=Decimal('2'),
+        )
+
+    def item(self, index, **extra):
+        return {
+            'product': self.product.pk, 'description': f'Linea {index}',
+            'width_inches': '12.50', 'height_inches': '3.33',
+            'unit_price': f'{index}.35', 'quantity': index % 3 + 1, **extra,
+        }
+
+    def test_create_writes_items_in_bulk(self):
+        payload = {
+            'client': self.client_obj.pk, 'payment_method': 'CASH', 'tax_rate': '15.00',
+            'discount_percentage': '5.00', 'items': [self.item(i) for i in range(30)],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.post('/api/sales/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        writes = [q['sql'].split()[0] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        # invoice number, sale, all items, totals
+        self.assertEqual(writes, ['UPDATE', 'INSERT', 'INSERT', 'UPDATE'])
+
+        # Same figures as saving every line through SaleItem.save().
+        legacy = Sale.objects.create(
+            client=self.client_obj, created_by=self.user,
+            tax_rate=Decimal('15.00'), discount_percentage=Decimal('5.00'),
+        )
+        for index in range(30):
+            data = self.item(index)
+            data['product'] = self.product
+            for field in ('width_inches', 'height_inches', 'unit_price'):
+                data[field] = Decimal(data[field])
+            SaleItem.objects.create(sale=legacy, **data)
+        legacy.refresh_from_db()
+
+        sale = Sale.objects.get(pk=response.json()['id'])
+        for field in ('subtotal', 'discount_amount', 'tax_amount', 'total_amount'):
+            self.assertEqual(getattr(sale, field), getattr(legacy, field), field)
+
+    def test_update_diffs_items_by_id(self):
+        response = self.api.post('/api/sales/', {
+            'client': self.client_obj.pk, 'payment_method': 'CASH', 'tax_rate': '15.00',
+            'items': [self.item(i) for i in range(3)],
+        }, format='json')
+        sale_id = response.json()['id']
+        first, second, third = response.json()['items']
+
+        response = self.api.patch(f'/api/sales/{sale_id}/', {'items': [
+            first,
+            {**second, 'quantity': 10},
+            self.item(7),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        items = {item.pk: item for item in SaleItem.objects.filter(sale_id=sale_id)}
+        self.assertEqual(len(items), 3)
+        self.assertIn(first['id'], items)
+        self.assertEqual(items[second['id']].quantity, 10)
+        self.assertEqual(items[second['id']].total, Decimal('1.35') * 10)
+        self.assertNotIn(third['id'], items)
+
+        sale = Sale.objects.get(pk=sale_id)
+        self.assertEqual(sale.subtotal, sum(item.total for item in items.values()))
+
+
+    def test_line_ids_stay_with_their_sale(self):
+        sales = [
+            self.api.post('/api/sales/', {
+                'client': self.client_obj.pk, 'payment_method': 'CASH', 'items': [self.item(1)],
+            }, format='json').json()
+            for _ in range(2)
+        ]
+        mine, other = sales[0]['items'][0], sales[1]['items'][0]
+
+        response = self.api.patch(f"/api/sales/items/{mine['id']}/", {
+            'id': other['id'], 'description': 'Cambio',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['id'], mine['id'])
+        self.assertEqual(SaleItem.objects.get(pk=mine['id']).description, 'Cambio')
+        untouched = SaleItem.objects.get(pk=other['id'])
+        self.assertEqual((untouched.sale_id, untouched.description), (sales[1]['id'], 'Linea 1'))
+
+        # A nested id from another sale is a new line, never a move.
+        response = self.api.patch(f"/api/sales/{sales[0]['id']}/", {'items': [other]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotEqual(response.json()['items'][0]['id'], other['id'])
+        self.assertEqual(SaleItem.objects.get(pk=other['id']).sale_id, sales[1]['id'])
+
+
+class SaleCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        client = Client.objects.create(name='Cliente', phone='9999-9999')
+        Sale.objects.bulk_create([Sale(client=client, created_by=self.user, invoice_number=f'T-{i}') for i in range(45)])
+
+    def test_page_numbers_stay_the_default(self):
+        data = self.api.get('/api/sales/').json()
+        self.assertEqual(data['count'], 45)
+
+    def test_cursor_pages_walk_every_row_once(self):
+        seen = []
+        url = '/api/sales/?pagination=cursor'
+        while url:
+            data = self.api.get(url).json()
+            self.assertNotIn('count', data)
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, sorted(Sale.objects.values_list('id', flat=True), reverse=True))
+
+
+class SaleQueryShapingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role=User.Role.ADMIN
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client_obj = Client.objects.create(name='Cliente', phone='9999-9999')
+        self.category = ProductCategory.objects.create(name='Vinil')
+        self.sale = Sale.objects.create(client=self.client_obj, created_by=self.user, invoice_number='FAC-900000')
+
+    def add_lines(self, sale, count):
+        for index in range(count):
+            product = Product.objects.create(
+                name=f'Producto {Product.objects.count()}', category=self.category,
+                unit_cost=Decimal('1'), unit_price=Decimal('2'),
+            )
+            SaleItem.objects.bulk_create([SaleItem(sale=sale, product=product, unit_price=Decimal('1'))])
+
+    def test_list(self):
+        def grow(count):
+            for _ in range(count):
+                sale = Sale.objects.create(client=self.client_obj, created_by=self.user)
+                self.add_lines(sale, 2)
+
+        self.assertConstantQueries('/api/sales/', grow)
+        row = next(r for r in self.api.get('/api/sales/').json()['results'] if r['id'] != self.sale.pk)
+        self.assertEqual(row['items_count'], 2)
+
+    def test_detail(self):
+        self.assertConstantQueries(f'/api/sales/{self.sale.pk}/', lambda count: self.add_lines(self.sale, count))
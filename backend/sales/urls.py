@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import SaleViewSet, SaleItemViewSet
 
 router = DefaultRouter()
-router.register(r'', SaleViewSet, basename='sale')
+# 'items' goes first: the empty prefix's detail route would take it as a pk.
 router.register(r'items', SaleItemViewSet, basename='sale-item')
+router.register(r'', SaleViewSet, basename='sale')
 
 urlpatterns = [
     path('', include(router.urls)),
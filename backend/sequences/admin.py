@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import DocumentSequence
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'last_value', 'block_size', 'updated_at']
+    readonly_fields = ['last_value', 'updated_at']
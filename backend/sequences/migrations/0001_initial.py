@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:58
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_sequences(apps, schema_editor):
+    """Continue numbering after the highest existing invoice and quotation."""
+    from sequences.models import highest_number
+
+    DocumentSequence = apps.get_model('sequences', 'DocumentSequence')
+    sources = [
+        ('FAC', apps.get_model('sales', 'Sale'), 'invoice_number'),
+        ('COT', apps.get_model('quotations', 'Quotation'), 'quotation_number'),
+    ]
+    for prefix, model, field in sources:
+        DocumentSequence.objects.update_or_create(
+            prefix=prefix,
+            defaults={
+                'last_value': highest_number(model.objects.all(), field, prefix),
+                'updated_at': timezone.now(),
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('sales', '0005_alter_sale_created_by'),
+        ('quotations', '0004_quotation_client_address_quotation_client_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10, unique=True, verbose_name='Prefijo')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Último Número')),
+                ('block_size', models.PositiveIntegerField(default=1, help_text='Números reservados por proceso. Las facturas siempre usan 1.', verbose_name='Tamaño de Bloque')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Documentos',
+                'verbose_name_plural': 'Secuencias de Documentos',
+                'db_table': 'document_sequences',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
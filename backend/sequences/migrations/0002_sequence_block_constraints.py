@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+def unblock_fiscal(apps, schema_editor):
+    """Rows saved around ``clean()`` would make the constraints fail to apply."""
+    DocumentSequence = apps.get_model('sequences', 'DocumentSequence')
+    DocumentSequence.objects.filter(block_size=0).update(block_size=1)
+    DocumentSequence.objects.filter(prefix__in=('FAC',)).exclude(block_size=1).update(block_size=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sequences', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(unblock_fiscal, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.CheckConstraint(check=models.Q(('block_size__gte', 1)), name='doc_seq_block_size_positive', violation_error_message='El tamaño de bloque debe ser al menos 1.'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('prefix__in', ('FAC',)), _negated=True), ('block_size', 1), _connector='OR'), name='doc_seq_fiscal_no_blocks', violation_error_message='Las facturas deben numerarse sin saltos; use un bloque de 1.'),
+        ),
+    ]
@@ -0,0 +1,171 @@
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Now
+
+NUMBER_WIDTH = 6
+
+# Fiscal documents must be numbered without gaps, so they never use blocks.
+FISCAL_PREFIXES = ('FAC',)
+
+
+def format_number(prefix, value):
+    return f"{prefix}-{value:0{NUMBER_WIDTH}d}"
+
+
+def parse_number(value, prefix):
+    """Return the numeric part of ``PREFIX-000123`` or ``None``."""
+    head, _, number = (value or '').partition('-')
+    if head != prefix or not number.isdigit():
+        return None
+    return int(number)
+
+
+def highest_number(queryset, field, prefix):
+    """Largest number already used in ``queryset``; seeds new sequences.
+
+    Numbers are compared as integers because past ``999999`` the
+    zero-padded strings stop sorting correctly.
+    """
+    highest = 0
+    values = queryset.filter(**{f'{field}__startswith': f'{prefix}-'}).values_list(field, flat=True)
+    for value in values.iterator():
+        number = parse_number(value, prefix)
+        if number and number > highest:
+            highest = number
+    return highest
+
+
+class DocumentSequenceManager(models.Manager):
+    # Numbers pre-allocated by this process, per prefix: [next, last].
+    _blocks = {}
+    _blocks_lock = threading.Lock()
+
+    def next_value(self, prefix, seed=None):
+        """Allocate the next number of ``prefix``.
+
+        The counter row is incremented with a single ``UPDATE`` inside the
+        caller's transaction, so concurrent callers queue on the row lock
+        instead of racing on ``MAX()``. Until the caller commits nobody
+        else can take a number, and a rollback releases it again: with
+        ``block_size`` 1 the sequence has no gaps.
+
+        With a larger ``block_size`` a whole block is reserved and the
+        rest of it is served from memory once the transaction commits.
+        Numbers a worker never hands out stay unused, so blocks are only
+        allowed for non-fiscal documents.
+
+        ``seed`` returns the highest number already in use and is only
+        called the first time ``prefix`` is seen.
+        """
+        cached = self._take_cached(prefix)
+        if cached is not None:
+            return cached
+
+        # Whatever the row says, fiscal numbers are never taken in blocks.
+        increment = 1 if prefix in FISCAL_PREFIXES else F('block_size')
+        with transaction.atomic():
+            last_value, block_size = self._advance(prefix, seed, increment)
+            if prefix in FISCAL_PREFIXES:
+                return last_value
+            value = last_value - block_size + 1
+            if block_size > 1:
+                transaction.on_commit(lambda: self._cache_block(prefix, value + 1, last_value))
+        return value
+
+    def next_number(self, prefix, seed=None):
+        return format_number(prefix, self.next_value(prefix, seed))
+
+    def reserve(self, prefix, count, seed=None):
+        """Allocate ``count`` consecutive numbers and return the first one.
+
+        Meant for bulk inserts, which skip ``save()``: the whole range
+        costs one ``UPDATE`` and, like ``next_value``, is only taken once
+        the caller's transaction commits.
+        """
+        if count < 1:
+            raise ValueError('count must be at least 1')
+        with transaction.atomic():
+            last_value, _ = self._advance(prefix, seed, count)
+        return last_value - count + 1
+
+    def _advance(self, prefix, seed, increment):
+        rows = self.filter(prefix=prefix)
+        changes = {'last_value': F('last_value') + increment, 'updated_at': Now()}
+        if not rows.update(**changes):
+            self._create(prefix, seed)
+            rows.update(**changes)
+        return rows.values_list('last_value', 'block_size').get()
+
+    def _create(self, prefix, seed):
+        try:
+            with transaction.atomic():
+                self.create(prefix=prefix, last_value=seed() if seed else 0)
+        except IntegrityError:
+            # Another worker created it first.
+            pass
+
+    @classmethod
+    def _take_cached(cls, prefix):
+        with cls._blocks_lock:
+            block = cls._blocks.get(prefix)
+            if not block or block[0] > block[1]:
+                return None
+            value = block[0]
+            block[0] += 1
+            return value
+
+    @classmethod
+    def _cache_block(cls, prefix, first, last):
+        with cls._blocks_lock:
+            cls._blocks[prefix] = [first, last]
+
+    @classmethod
+    def clear_cached_blocks(cls):
+        with cls._blocks_lock:
+            cls._blocks.clear()
+
+
+class DocumentSequence(models.Model):
+    """Counter behind the ``FAC-``/``COT-`` document numbers."""
+
+    prefix = models.CharField(max_length=10, unique=True, verbose_name='Prefijo')
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name='Último Número')
+    block_size = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Tamaño de Bloque',
+        help_text='Números reservados por proceso. Las facturas siempre usan 1.'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DocumentSequenceManager()
+
+    class Meta:
+        db_table = 'document_sequences'
+        verbose_name = 'Secuencia de Documentos'
+        verbose_name_plural = 'Secuencias de Documentos'
+        constraints = [
+            models.CheckConstraint(
+                check=Q(block_size__gte=1),
+                name='doc_seq_block_size_positive',
+                violation_error_message='El tamaño de bloque debe ser al menos 1.',
+            ),
+            models.CheckConstraint(
+                check=~Q(prefix__in=FISCAL_PREFIXES) | Q(block_size=1),
+                name='doc_seq_fiscal_no_blocks',
+                violation_error_message='Las facturas deben numerarse sin saltos; use un bloque de 1.',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix} ({self.last_value})"
+
+    def clean(self):
+        if self.block_size < 1:
+            raise ValidationError({'block_size': 'El tamaño de bloque debe ser al menos 1.'})
+        if self.prefix in FISCAL_PREFIXES and self.block_size != 1:
+            raise ValidationError({
+                'block_size': 'Las facturas deben numerarse sin saltos; use un bloque de 1.'
+            })
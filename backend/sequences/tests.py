@@ -0,0 +1,105 @@
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from unittest import mock, skipIf
+
+from django.test import TestCase, TransactionTestCase
+
+from clients.models import Client
+from quotations.models import Quotation
+from sales.models import Sale
+from users.models import User
+
+from .models import DocumentSequence
+
+
+class DocumentSequenceTests(TestCase):
+    def tearDown(self):
+        DocumentSequence.objects.clear_cached_blocks()
+
+    def test_seeds_from_existing_numbers(self):
+        user = User.objects.create_user(username='u', email='u@example.com', password='x')
+        client = Client.objects.create(name='Cliente', phone='1')
+        DocumentSequence.objects.filter(prefix='COT').delete()
+        Quotation.objects.bulk_create([
+            Quotation(client=client, created_by=user, quotation_number='COT-000041'),
+            Quotation(client=client, created_by=user, quotation_number='COT-1000002'),
+        ])
+
+        quotation = Quotation.objects.create(client=client, created_by=user)
+        self.assertEqual(quotation.quotation_number, 'COT-1000003')
+
+    def test_rollback_releases_the_number(self):
+        first = DocumentSequence.objects.next_value('TST')
+        try:
+            with transaction.atomic():
+                DocumentSequence.objects.next_value('TST')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(DocumentSequence.objects.next_value('TST'), first + 1)
+
+    def test_blocks_are_served_from_memory(self):
+        DocumentSequence.objects.create(prefix='BLK', block_size=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(DocumentSequence.objects.next_value('BLK'), 1)
+
+        with self.assertNumQueries(0):
+            values = [DocumentSequence.objects.next_value('BLK') for _ in range(4)]
+        self.assertEqual(values, [2, 3, 4, 5])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(DocumentSequence.objects.next_value('BLK'), 6)
+
+    def test_invoices_are_never_numbered_in_blocks(self):
+        sequence = DocumentSequence.objects.get(prefix='FAC')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DocumentSequence.objects.filter(pk=sequence.pk).update(block_size=5)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DocumentSequence.objects.filter(prefix='COT').update(block_size=0)
+
+        # The allocator does not rely on the row either.
+        with mock.patch.object(DocumentSequence.objects, '_advance', wraps=DocumentSequence.objects._advance) as advance:
+            first = DocumentSequence.objects.next_value('FAC')
+        self.assertEqual(advance.call_args.args[2], 1)
+        self.assertEqual(DocumentSequence.objects.next_value('FAC'), first + 1)
+
+    def test_reserve_takes_a_range(self):
+        DocumentSequence.objects.create(prefix='RNG', last_value=10)
+        self.assertEqual(DocumentSequence.objects.reserve('RNG', 50), 11)
+        self.assertEqual(DocumentSequence.objects.next_value('RNG'), 61)
+
+
+@skipIf(
+    connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+    'Needs a test database shared by several connections.'
+)
+class ConcurrentNumberingTests(TransactionTestCase):
+    THREADS = 8
+    SALES_PER_THREAD = 5
+
+    def test_concurrent_sales_get_distinct_consecutive_numbers(self):
+        user = User.objects.create_user(username='u', email='u@example.com', password='x')
+        client = Client.objects.create(name='Cliente', phone='1')
+        barrier = threading.Barrier(self.THREADS)
+        numbers, errors = [], []
+
+        def checkout():
+            try:
+                barrier.wait()
+                for _ in range(self.SALES_PER_THREAD):
+                    numbers.append(Sale.objects.create(client=client, created_by=user).invoice_number)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.THREADS * self.SALES_PER_THREAD
+        self.assertEqual(sorted(numbers), [f'FAC-{n:06d}' for n in range(1, total + 1)])
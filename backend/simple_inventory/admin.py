@@ -1,6 +1,8 @@
+from django import forms
 from django.contrib import admin
 
-from .models import SimpleProduct, StockMovement
+from .models import SimpleProduct, StockMovement, StockSnapshot
+from .services import InsufficientStock, stock_ledger
 
 
 @admin.register(SimpleProduct)
@@ -10,10 +12,50 @@ class SimpleProductAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     readonly_fields = ('created_at', 'updated_at')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        stock_ledger.record_edit(obj, form.initial['quantity'] if change else None)
+
+
+class StockMovementAdminForm(forms.ModelForm):
+    class Meta:
+        model = StockMovement
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get('product')
+        quantity = cleaned_data.get('quantity')
+        if (
+            self.instance.pk is None and product is not None and quantity is not None
+            and cleaned_data.get('movement_type') == StockMovement.MovementType.EXIT
+            and quantity > product.quantity
+        ):
+            self.add_error('quantity', InsufficientStock([product.pk]).args[0])
+        return cleaned_data
+
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
+    form = StockMovementAdminForm
     list_display = ('product', 'movement_type', 'quantity', 'created_by', 'created_at')
     list_filter = ('movement_type', 'created_at')
     search_fields = ('product__name', 'notes')
     readonly_fields = ('created_at',)
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('product', 'date', 'balance', 'source', 'taken_at')
+    list_filter = ('source', 'date')
+    search_fields = ('product__name', 'product__sku')
+
+    # The ledger writes snapshots; editing one would rewrite history.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:32
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def open_ledger(apps, schema_editor):
+    """Snapshot current stock so as-of queries have a starting point."""
+    Product = apps.get_model('simple_inventory', 'SimpleProduct')
+    StockSnapshot = apps.get_model('simple_inventory', 'StockSnapshot')
+    taken_at = timezone.now()
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(
+            product_id=product_id, date=timezone.localdate(taken_at), taken_at=taken_at,
+            balance=balance, source='NIGHTLY',
+        )
+        for product_id, balance in Product.objects.values_list('pk', 'quantity')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('taken_at', models.DateTimeField(verbose_name='Tomado el')),
+                ('balance', models.IntegerField(verbose_name='Saldo')),
+                ('source', models.CharField(choices=[('NIGHTLY', 'Cierre diario'), ('CHECKPOINT', 'Punto de control'), ('EDIT', 'Edición del producto')], max_length=20, verbose_name='Origen')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Inventario',
+                'verbose_name_plural': 'Saldos de Inventario',
+                'db_table': 'simple_inventory_snapshots',
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='simple_mov_product_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='simple_inventory.simpleproduct', verbose_name='Producto'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['product', 'taken_at'], name='simple_snap_product_taken_idx'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
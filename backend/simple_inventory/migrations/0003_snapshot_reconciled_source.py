@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_inventory', '0002_stock_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stocksnapshot',
+            name='source',
+            field=models.CharField(choices=[('NIGHTLY', 'Cierre diario'), ('CHECKPOINT', 'Punto de control'), ('EDIT', 'Edición del producto'), ('RECONCILED', 'Conciliación')], max_length=20, verbose_name='Origen'),
+        ),
+    ]
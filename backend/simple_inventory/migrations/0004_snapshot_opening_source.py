@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def mark_opening(apps, schema_editor):
+    """Flag 0002's opening copies so reconciliation replays the movements instead."""
+    StockSnapshot = apps.get_model('simple_inventory', 'StockSnapshot')
+    taken_at = StockSnapshot.objects.aggregate(first=Min('taken_at'))['first']
+    if taken_at is not None:
+        StockSnapshot.objects.filter(taken_at=taken_at, source='NIGHTLY').update(source='OPENING')
+
+
+def unmark_opening(apps, schema_editor):
+    StockSnapshot = apps.get_model('simple_inventory', 'StockSnapshot')
+    StockSnapshot.objects.filter(source='OPENING').update(source='NIGHTLY')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_inventory', '0003_snapshot_reconciled_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stocksnapshot',
+            name='source',
+            field=models.CharField(choices=[('NIGHTLY', 'Cierre diario'), ('CHECKPOINT', 'Punto de control'), ('EDIT', 'Edición del producto'), ('RECONCILED', 'Conciliación'), ('OPENING', 'Saldo inicial (sin verificar)')], max_length=20, verbose_name='Origen'),
+        ),
+        migrations.RunPython(mark_opening, unmark_opening),
+    ]
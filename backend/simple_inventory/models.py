@@ -68,6 +68,9 @@ class StockMovement(models.Model):
     class Meta:
         db_table = 'simple_inventory_movements'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='simple_mov_product_created_idx'),
+        ]
         verbose_name = 'Movimiento de Stock'
         verbose_name_plural = 'Movimientos de Stock'
 
@@ -75,12 +78,48 @@ class StockMovement(models.Model):
         return f"{self.get_movement_type_display()} - {self.product.name} ({self.quantity})"
 
     def save(self, *args, **kwargs):
+        """Apply a new movement to the product's stock; exits may not go below zero."""
+        from django.db import transaction
+        from .services import STOCK_SIGNS, apply_quantity_deltas, stock_ledger
+
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if is_new:
+                apply_quantity_deltas({self.product_id: STOCK_SIGNS[self.movement_type] * self.quantity})
+            super().save(*args, **kwargs)
+            if is_new:
+                stock_ledger.checkpoint([self.product_id])
+
+
+class StockSnapshot(models.Model):
+    """Saldo de un producto en ``taken_at``, con todos los movimientos hasta entonces."""
+
+    class Source(models.TextChoices):
+        NIGHTLY = 'NIGHTLY', 'Cierre diario'
+        CHECKPOINT = 'CHECKPOINT', 'Punto de control'
+        EDIT = 'EDIT', 'Edición del producto'
+        RECONCILED = 'RECONCILED', 'Conciliación'
+        OPENING = 'OPENING', 'Saldo inicial (sin verificar)'
+
+    product = models.ForeignKey(
+        SimpleProduct,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name='Producto'
+    )
+    date = models.DateField(verbose_name='Fecha')
+    taken_at = models.DateTimeField(verbose_name='Tomado el')
+    balance = models.IntegerField(verbose_name='Saldo')
+    source = models.CharField(max_length=20, choices=Source.choices, verbose_name='Origen')
 
-        if is_new:
-            if self.movement_type == self.MovementType.ENTRY:
-                self.product.quantity += self.quantity
-            else:
-                self.product.quantity = max(0, self.product.quantity - self.quantity)
-            self.product.save(update_fields=['quantity', 'updated_at'])
+    class Meta:
+        db_table = 'simple_inventory_snapshots'
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='simple_snap_product_taken_idx'),
+        ]
+        verbose_name = 'Saldo de Inventario'
+        verbose_name_plural = 'Saldos de Inventario'
+
+    def __str__(self) -> str:  # pragma: no cover - representación simple
+        return f"{self.product.name} {self.date}: {self.balance}"
@@ -71,3 +71,25 @@ class StockAdjustmentSerializer(serializers.Serializer):
         if value == 0:
             raise serializers.ValidationError('La cantidad no puede ser cero.')
         return value
+
+
+class BulkAdjustmentLineSerializer(serializers.Serializer):
+    """One line of a stock count: a product and how much to add or remove."""
+
+    product = serializers.IntegerField(min_value=1)
+    delta = serializers.IntegerField()
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError('La cantidad no puede ser cero.')
+        return value
+
+
+class BulkAdjustmentSerializer(serializers.Serializer):
+    """Serializer for bulk stock adjustment requests."""
+
+    MAX_LINES = 1000
+
+    lines = BulkAdjustmentLineSerializer(many=True, allow_empty=False, max_length=MAX_LINES)
+    notes = serializers.CharField(required=False, allow_blank=True)
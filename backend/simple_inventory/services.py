@@ -0,0 +1,89 @@
+"""Stock posting: the only place that changes ``SimpleProduct.quantity``."""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+from django.db.models.lookups import GreaterThanOrEqual
+
+from utils.ledger import StockLedger
+
+from .models import SimpleProduct, StockMovement, StockSnapshot
+
+STOCK_SIGNS = {
+    StockMovement.MovementType.ENTRY: 1,
+    StockMovement.MovementType.EXIT: -1,
+}
+
+stock_ledger = StockLedger(StockMovement, StockSnapshot, STOCK_SIGNS, 'quantity', IntegerField())
+
+# Each product adds two parameters to the CASE; well below SQLite's limit.
+DELTA_CHUNK_SIZE = 400
+
+
+class InsufficientStock(ValueError):
+    """An exit would leave products below zero; nothing was applied."""
+
+    def __init__(self, product_ids):
+        super().__init__('La cantidad a restar excede el inventario disponible.')
+        self.product_ids = product_ids
+
+
+def apply_quantity_deltas(deltas):
+    """Add ``{product_id: delta}`` to stock, all or nothing.
+
+    Each chunk of products is one ``UPDATE ... SET quantity = quantity +
+    CASE ...`` that only matches rows which stay at or above zero, so the
+    check and the write happen in the same statement and concurrent
+    adjustments cannot lose each other's changes or go negative.
+    """
+    from reports.cache import invalidate
+
+    product_ids = sorted(product_id for product_id, delta in deltas.items() if delta)
+    try:
+        with transaction.atomic():
+            for start in range(0, len(product_ids), DELTA_CHUNK_SIZE):
+                chunk = product_ids[start:start + DELTA_CHUNK_SIZE]
+                new_quantity = F('quantity') + Case(
+                    *(When(pk=product_id, then=Value(deltas[product_id])) for product_id in chunk),
+                    output_field=IntegerField(),
+                )
+                updated = SimpleProduct.objects.filter(
+                    GreaterThanOrEqual(new_quantity, 0), pk__in=chunk,
+                ).update(quantity=new_quantity, updated_at=Now())
+                if updated != len(chunk):
+                    # Rolls back every chunk; the products at fault are found below.
+                    raise InsufficientStock(chunk)
+    except InsufficientStock as error:
+        quantities = dict(
+            SimpleProduct.objects.filter(pk__in=error.product_ids).values_list('pk', 'quantity')
+        )
+        missing = [product_id for product_id in error.product_ids if product_id not in quantities]
+        if missing:
+            raise SimpleProduct.DoesNotExist(
+                f"No existen los productos: {', '.join(map(str, missing))}."
+            ) from None
+        raise InsufficientStock([
+            product_id for product_id in error.product_ids
+            if quantities[product_id] + deltas[product_id] < 0
+        ]) from None
+    # Queryset updates send no signals.
+    invalidate('products')
+
+
+def post_stock_movements(movements):
+    """Save unsaved movements and apply them to stock in bulk.
+
+    Quantities are summed per product first, so a stock count with several
+    lines for the same product costs a single row update. Products due
+    for a ledger checkpoint are snapshotted in the same transaction.
+    """
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[movement.product_id] += STOCK_SIGNS[movement.movement_type] * movement.quantity
+
+    with transaction.atomic():
+        apply_quantity_deltas(deltas)
+        created = StockMovement.objects.bulk_create(movements)
+        stock_ledger.checkpoint(deltas)
+    return created
@@ -1,3 +1,230 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from utils.dates import local_midnight
+from utils.factories import make_simple_product, make_user
+
+from .models import SimpleProduct, StockMovement, StockSnapshot
+from .services import DELTA_CHUNK_SIZE, InsufficientStock, apply_quantity_deltas
+
+
+class AdjustStockTests(TestCase):
+    def setUp(self):
+        self.user = make_user(role=User.Role.SELLER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.product = make_simple_product(self.user, quantity=10)
+
+    def adjust(self, quantity, product=None):
+        product = product or self.product
+        return self.api.post(
+            f'/api/simple-inventory/products/{product.pk}/adjust_stock/',
+            {'quantity': quantity, 'notes': 'Conteo'}, format='json',
+        )
+
+    def test_entry_and_exit(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.adjust(5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 15)
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # get, update, insert, checkpoint count, refresh
+        self.assertLessEqual(len(statements), 5)
+
+        self.assertEqual(self.adjust(-15).data['quantity'], 0)
+        self.assertEqual(
+            list(StockMovement.objects.order_by('pk').values_list('movement_type', 'quantity')),
+            [('ENTRY', 5), ('EXIT', 15)],
+        )
+
+    def test_exit_beyond_stock_is_refused(self):
+        response = self.adjust(-11)
+        self.assertEqual(response.status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_movement_endpoint_refuses_negative_stock(self):
+        response = self.api.post('/api/simple-inventory/stock-movements/', {
+            'product': self.product.pk, 'movement_type': 'EXIT', 'quantity': 11,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.data)
+        self.assertFalse(StockMovement.objects.exists())
+
+
+    def test_missing_product_is_not_insufficient_stock(self):
+        with self.assertRaises(SimpleProduct.DoesNotExist):
+            apply_quantity_deltas({self.product.pk + 1000: -1})
+        with self.assertRaises(InsufficientStock) as raised:
+            apply_quantity_deltas({self.product.pk: -11})
+        self.assertEqual(raised.exception.product_ids, [self.product.pk])
+
+    # The admin pages need static files, which are not collected for tests.
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_exit_beyond_stock_is_a_form_error(self):
+        self.client.force_login(make_user(role=User.Role.ADMIN, is_staff=True, is_superuser=True))
+        url = '/admin/simple_inventory/stockmovement/add/'
+        data = {'product': self.product.pk, 'movement_type': 'EXIT', 'quantity': 11, 'notes': ''}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('quantity', response.context['adminform'].form.errors)
+        self.assertFalse(StockMovement.objects.exists())
+
+        response = self.client.post(url, {**data, 'quantity': 4})
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 6)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_edits_are_ledgered_and_snapshots_read_only(self):
+        self.client.force_login(make_user(role=User.Role.ADMIN, is_staff=True, is_superuser=True))
+        url = f'/admin/simple_inventory/simpleproduct/{self.product.pk}/change/'
+        data = {'name': self.product.name, 'sku': self.product.sku, 'description': '', 'quantity': 10}
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertFalse(StockSnapshot.objects.exists())
+        self.assertEqual(self.client.post(url, {**data, 'quantity': 12}).status_code, 302)
+        snapshot, = StockSnapshot.objects.values_list('pk', 'source', 'balance')
+        self.assertEqual(snapshot[1:], ('EDIT', 12))
+
+        self.assertEqual(self.client.get('/admin/simple_inventory/stocksnapshot/add/').status_code, 403)
+        change = f'/admin/simple_inventory/stocksnapshot/{snapshot[0]}/change/'
+        self.assertEqual(self.client.post(change, {'balance': 99}).status_code, 403)
+        self.assertEqual(StockSnapshot.objects.get().balance, 12)
+
+
+class BulkAdjustTests(TestCase):
+    url = '/api/simple-inventory/products/bulk_adjust/'
+
+    def setUp(self):
+        self.user = make_user(role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_applies_a_stock_count_in_few_statements(self):
+        products = [make_simple_product(self.user, quantity=20) for _ in range(DELTA_CHUNK_SIZE + 50)]
+        lines = [
+            {'product': product.pk, 'delta': -5 if index % 2 else 7}
+            for index, product in enumerate(products)
+        ]
+        lines.append({'product': products[0].pk, 'delta': -2, 'notes': 'Merma'})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.post(self.url, {'lines': lines, 'notes': 'Cierre de mes'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['adjusted'], len(lines))
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertLessEqual(len(statements), 8)
+
+        quantities = dict(SimpleProduct.objects.values_list('pk', 'quantity'))
+        self.assertEqual(quantities[products[0].pk], 25)
+        self.assertEqual(quantities[products[1].pk], 15)
+        self.assertEqual(quantities[products[2].pk], 27)
+        self.assertEqual(StockMovement.objects.filter(notes='Cierre de mes').count(), len(lines) - 1)
+        self.assertEqual(StockMovement.objects.get(notes='Merma').quantity, 2)
+
+    def test_nothing_is_applied_when_a_line_goes_negative(self):
+        enough, short = make_simple_product(quantity=5), make_simple_product(quantity=5)
+        response = self.api.post(self.url, {'lines': [
+            {'product': enough.pk, 'delta': -5},
+            {'product': short.pk, 'delta': -4},
+            {'product': short.pk, 'delta': -2},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'], [short.pk])
+        self.assertEqual(set(SimpleProduct.objects.values_list('quantity', flat=True)), {5})
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_unknown_products_and_bad_lines(self):
+        product = make_simple_product()
+        response = self.api.post(self.url, {'lines': [{'product': product.pk + 99, 'delta': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'], [product.pk + 99])
+
+        self.assertEqual(self.api.post(self.url, {'lines': []}, format='json').status_code, 400)
+        response = self.api.post(self.url, {'lines': [{'product': product.pk, 'delta': 0}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_designers_cannot_adjust(self):
+        designer = APIClient()
+        designer.force_authenticate(make_user(role=User.Role.DESIGNER))
+        product = make_simple_product()
+        response = designer.post(self.url, {'lines': [{'product': product.pk, 'delta': 1}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class AsOfTests(TestCase):
+    url = '/api/simple-inventory/products/as_of/'
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(make_user(role=User.Role.ADMIN))
+
+    def test_balances_follow_counts_and_hand_edits(self):
+        yesterday = local_midnight(timezone.localdate() - timedelta(days=1)) + timedelta(hours=12)
+        with mock.patch('django.utils.timezone.now', return_value=yesterday):
+            response = self.api.post('/api/simple-inventory/products/', {'name': 'Tinta', 'quantity': 8}, format='json')
+            product_id = response.data['id']
+        with mock.patch('django.utils.timezone.now', return_value=yesterday + timedelta(minutes=1)):
+            self.api.post('/api/simple-inventory/products/bulk_adjust/', {'lines': [
+                {'product': product_id, 'delta': -3},
+            ]}, format='json')
+        self.api.patch(f'/api/simple-inventory/products/{product_id}/', {'quantity': 20}, format='json')
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by('taken_at').values_list('source', 'balance')),
+            [('EDIT', 8), ('EDIT', 20)],
+        )
+
+        response = self.api.get(self.url, {'date': timezone.localdate(yesterday).isoformat()})
+        self.assertEqual(
+            [(row['id'], row['name'], row['balance']) for row in response.data['products']],
+            [(product_id, 'Tinta', 5)],
+        )
+        self.assertEqual(self.api.get(self.url).data['products'][0]['balance'], 20)
+        self.assertEqual(self.api.get(self.url, {'date': '31/03/2026'}).status_code, 400)
+
+
+@skipIf(
+    connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+    'Needs a test database shared by several connections.'
+)
+class ConcurrentAdjustmentTests(TransactionTestCase):
+    THREADS = 8
+
+    def test_no_update_is_lost_and_stock_never_goes_negative(self):
+        user = make_user(role=User.Role.ADMIN)
+        product = make_simple_product(user, quantity=5)
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def adjust():
+            api = APIClient()
+            api.force_authenticate(user)
+            try:
+                barrier.wait()
+                response = api.post(
+                    f'/api/simple-inventory/products/{product.pk}/adjust_stock/',
+                    {'quantity': -1}, format='json',
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=adjust) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        self.assertEqual(sorted(statuses), [200] * 5 + [400] * 3)
+        self.assertEqual(product.quantity, 0)
+        self.assertEqual(StockMovement.objects.count(), 5)
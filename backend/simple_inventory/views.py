@@ -1,7 +1,10 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import SimpleProduct, StockMovement
@@ -10,8 +13,14 @@ from .serializers import (
     SimpleProductListSerializer,
     StockMovementSerializer,
     StockAdjustmentSerializer,
+    BulkAdjustmentSerializer,
 )
+from .services import InsufficientStock, post_stock_movements, stock_ledger
 from .permissions import IsAdminOrReadOnly, IsAdminOrOperations, IsAdminOrOperationsOrReadOnly
+from users.permissions import IsAdmin
+from utils.dates import day_bounds, parse_local_date
+from utils.export import ExportMixin
+from utils.pagination import OptionalCursorPagination
 
 
 class SimpleProductViewSet(viewsets.ModelViewSet):
@@ -31,6 +40,8 @@ class SimpleProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action != 'list':
+            queryset = queryset.select_related('created_by')
         min_quantity = self.request.query_params.get('min_quantity')
         max_quantity = self.request.query_params.get('max_quantity')
 
@@ -46,6 +57,38 @@ class SimpleProductViewSet(viewsets.ModelViewSet):
                 pass
         return queryset
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            stock_ledger.record_edit(serializer.save())
+
+    def perform_update(self, serializer):
+        before = serializer.instance.quantity
+        with transaction.atomic():
+            stock_ledger.record_edit(serializer.save(), before)
+
+    @action(detail=False, methods=['get'])
+    def as_of(self, request):
+        """Stock at the end of ``?date=YYYY-MM-DD`` (default today), with the list filters.
+
+        Each balance is the product's latest snapshot before that day
+        ended plus the movements after it, in a single query.
+        """
+        day = parse_local_date(request.query_params.get('date'), 'date') or timezone.localdate()
+        products = stock_ledger.balances_before(self.filter_queryset(self.get_queryset()), day_bounds(day)[1])
+        return Response({
+            'date': day.isoformat(),
+            'products': list(products.values('id', 'name', 'sku', 'balance')),
+        })
+
+    @action(detail=False, methods=['get', 'post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def reconcile(self, request):
+        """Products whose stock disagrees with their movements; ``POST`` repairs them."""
+        repair = request.method == 'POST'
+        checked, mismatches, unverifiable = stock_ledger.reconcile(repair=repair)
+        return Response({
+            'checked': checked, 'mismatches': mismatches, 'unverifiable': unverifiable, 'repaired': repair,
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdminOrOperations])
     def adjust_stock(self, request, pk=None):
         product = self.get_object()
@@ -55,32 +98,79 @@ class SimpleProductViewSet(viewsets.ModelViewSet):
         quantity = serializer.validated_data['quantity']
         notes = serializer.validated_data.get('notes', '')
 
-        if quantity < 0 and abs(quantity) > product.quantity:
-            return Response(
-                {'detail': 'La cantidad a restar excede el inventario disponible.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
         movement_type = (
             StockMovement.MovementType.ENTRY
             if quantity > 0
             else StockMovement.MovementType.EXIT
         )
 
-        StockMovement.objects.create(
-            product=product,
-            movement_type=movement_type,
-            quantity=abs(quantity),
-            notes=notes,
-            created_by=request.user,
-        )
-
-        product.refresh_from_db()
+        try:
+            post_stock_movements([StockMovement(
+                product=product,
+                movement_type=movement_type,
+                quantity=abs(quantity),
+                notes=notes,
+                created_by=request.user,
+            )])
+        except InsufficientStock as error:
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        product.refresh_from_db(fields=['quantity', 'updated_at'])
         response_serializer = SimpleProductSerializer(product)
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminOrOperations])
+    def bulk_adjust(self, request):
+        """Apply a whole stock count in one transaction.
+
+        Body: ``{"lines": [{"product": 1, "delta": -3, "notes": "..."}], "notes": "..."}``.
+        Either every line is applied or none is.
+        """
+        serializer = BulkAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data['lines']
+        default_notes = serializer.validated_data.get('notes', '')
+
+        product_ids = {line['product'] for line in lines}
+        found = set(SimpleProduct.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        if found != product_ids:
+            return Response(
+                {'detail': 'Algunos productos no existen.', 'products': sorted(product_ids - found)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            movements = post_stock_movements([
+                StockMovement(
+                    product_id=line['product'],
+                    movement_type=(
+                        StockMovement.MovementType.ENTRY
+                        if line['delta'] > 0
+                        else StockMovement.MovementType.EXIT
+                    ),
+                    quantity=abs(line['delta']),
+                    notes=line.get('notes') or default_notes,
+                    created_by=request.user,
+                )
+                for line in lines
+            ])
+        except InsufficientStock as error:
+            return Response(
+                {'detail': str(error), 'products': error.product_ids},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except SimpleProduct.DoesNotExist as error:
+            # Deleted between the check above and the update.
+            return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = SimpleProduct.objects.filter(pk__in=product_ids).order_by('pk')
+        return Response({
+            'adjusted': len(movements),
+            'products': list(products.values('id', 'name', 'sku', 'quantity')),
+        }, status=status.HTTP_200_OK)
+
 
-class StockMovementViewSet(viewsets.ModelViewSet):
+class StockMovementViewSet(ExportMixin, viewsets.ModelViewSet):
     """Listado y creación de movimientos históricos de inventario."""
 
     queryset = StockMovement.objects.select_related('product', 'created_by').all()
@@ -89,9 +179,27 @@ class StockMovementViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['product', 'movement_type']
     ordering = ['-created_at']
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+
+    export_filename = 'Movimientos_Inventario_Manual'
+    export_columns = (
+        ('created_at', 'Fecha'),
+        ('product__name', 'Producto'),
+        ('product__sku', 'SKU'),
+        ('movement_type', 'Tipo de Movimiento'),
+        ('quantity', 'Cantidad'),
+        ('notes', 'Notas'),
+        ('created_by__username', 'Registrado por'),
+    )
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        try:
+            serializer.save(created_by=self.request.user)
+        except InsufficientStock as error:
+            raise ValidationError({'quantity': [str(error)]})
+        except SimpleProduct.DoesNotExist as error:
+            raise ValidationError({'product': [str(error)]})
 
     def get_queryset(self):
         queryset = super().get_queryset()
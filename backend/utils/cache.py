@@ -0,0 +1,38 @@
+"""File cache whose ``add`` can serve as a lock between worker processes."""
+import os
+import tempfile
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Django's file cache with an atomic ``add``.
+
+    The stock ``add`` checks for the file and then writes it, so two
+    workers can both succeed. Here the entry is written to a temporary
+    file and hard-linked into place: ``link`` fails when the name already
+    exists, so exactly one caller wins. An expired entry left behind is
+    removed and the link retried once.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    if self.has_key(key, version):
+                        return False
+                    # Expired, e.g. a lock whose holder died.
+                    self._delete(fname)
+            return False
+        finally:
+            os.remove(tmp_path)
@@ -0,0 +1,107 @@
+"""Local calendar dates as half-open, index-friendly datetime ranges.
+
+Filtering a ``DateTimeField`` with ``__date`` wraps the column in a date
+cast, so the database has to read every row. The helpers here turn
+local dates (``TIME_ZONE``, America/Tegucigalpa) into aware datetimes
+and filter with ``>= start AND < end`` instead, which the indexes on
+``created_at``/``completed_at`` can seek.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+
+# ``2024-05-31``; a trailing time part (``2024-05-31T00:00:00``) is ignored.
+DATE_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?:[T ].*)?$')
+
+
+def local_midnight(day):
+    """Aware datetime for the start of ``day`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def day_bounds(day):
+    """``(start, end)`` of a local day, for ``field__gte=start, field__lt=end``."""
+    return local_midnight(day), local_midnight(day + timedelta(days=1))
+
+
+def parse_local_date(value, param):
+    """Parse a ``YYYY-MM-DD`` query parameter; ``None`` when empty."""
+    if value in (None, ''):
+        return None
+    match = DATE_PATTERN.match(value.strip())
+    try:
+        if not match:
+            raise ValueError
+        return date(*(int(part) for part in match.groups()))
+    except ValueError:
+        raise ParseError(f'La fecha «{param}» debe tener el formato AAAA-MM-DD.')
+
+
+class DateRange(NamedTuple):
+    """Inclusive range of local dates; either end may be open."""
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    @classmethod
+    def from_params(cls, params, start_param='start_date', end_param='end_date'):
+        date_range = cls(
+            parse_local_date(params.get(start_param), start_param),
+            parse_local_date(params.get(end_param), end_param),
+        )
+        if date_range.start and date_range.end and date_range.start > date_range.end:
+            raise ParseError('La fecha inicial no puede ser posterior a la fecha final.')
+        return date_range
+
+    def __bool__(self):
+        return bool(self.start or self.end)
+
+    def q(self, field):
+        """``Q`` on a ``DateTimeField``: ``>= start`` midnight, ``<`` the day after ``end``."""
+        condition = Q()
+        if self.start:
+            condition &= Q(**{f'{field}__gte': local_midnight(self.start)})
+        if self.end:
+            condition &= Q(**{f'{field}__lt': local_midnight(self.end + timedelta(days=1))})
+        return condition
+
+    def date_q(self, field):
+        """``Q`` on a ``DateField``, where both ends are plain dates."""
+        condition = Q()
+        if self.start:
+            condition &= Q(**{f'{field}__gte': self.start})
+        if self.end:
+            condition &= Q(**{f'{field}__lte': self.end})
+        return condition
+
+    def filter(self, queryset, field):
+        model_field = queryset.model._meta.get_field(field)
+        if isinstance(model_field, models.DateTimeField):
+            return queryset.filter(self.q(field))
+        return queryset.filter(self.date_q(field))
+
+
+class DateRangeFilter:
+    """Filter backend for ``?<start>=YYYY-MM-DD&<end>=YYYY-MM-DD``.
+
+    Views set ``date_range_field`` and, if they differ from
+    ``start_date``/``end_date``, ``date_range_params``. Both dates are
+    inclusive local dates; invalid input is a 400.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, 'date_range_field', None)
+        if not field:
+            return queryset
+        date_range = get_date_range(request, view)
+        return date_range.filter(queryset, field) if date_range else queryset
+
+
+def get_date_range(request, view):
+    start_param, end_param = getattr(view, 'date_range_params', ('start_date', 'end_date'))
+    return DateRange.from_params(request.query_params, start_param, end_param)
@@ -0,0 +1,192 @@
+"""Factories for realistic test data.
+
+Every function saves what it builds and returns it. Anything not passed
+in gets a plausible default, so a test only spells out the fields it is
+actually about. ``seed_dataset`` fills every app at once for tests that
+exercise the whole API.
+"""
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+_sequence = itertools.count(1)
+
+
+def _next():
+    return next(_sequence)
+
+
+def make_user(role=None, **fields):
+    from users.models import User
+
+    number = _next()
+    fields.setdefault('username', f'usuario{number}')
+    fields.setdefault('email', f'usuario{number}@example.com')
+    return User.objects.create_user(
+        password=fields.pop('password', 'x'),
+        role=role or User.Role.ADMIN,
+        **fields
+    )
+
+
+def make_client(**fields):
+    from clients.models import Client
+
+    number = _next()
+    fields.setdefault('name', f'Cliente {number}')
+    fields.setdefault('company', f'Empresa {number}')
+    fields.setdefault('phone', f'9{number:07d}')
+    fields.setdefault('email', f'cliente{number}@example.com')
+    return Client.objects.create(**fields)
+
+
+def make_category(**fields):
+    from inventory.models import ProductCategory
+
+    fields.setdefault('name', f'Categoría {_next()}')
+    return ProductCategory.objects.create(**fields)
+
+
+def make_product(category=None, **fields):
+    from inventory.models import Product
+
+    number = _next()
+    fields.setdefault('name', f'Producto {number}')
+    fields.setdefault('sku', f'PRD-{number:06d}')
+    fields.setdefault('unit_cost', Decimal('10.00'))
+    fields.setdefault('unit_price', Decimal('25.00'))
+    fields.setdefault('price_per_square_inch', Decimal('0.05'))
+    fields.setdefault('quantity_available', Decimal('500.00'))
+    fields.setdefault('minimum_stock', Decimal('20.00'))
+    return Product.objects.create(category=category or make_category(), **fields)
+
+
+def make_stock_movement(product, user=None, **fields):
+    from inventory.models import StockMovement
+
+    fields.setdefault('movement_type', StockMovement.MovementType.ENTRY)
+    fields.setdefault('quantity', Decimal('5.00'))
+    fields.setdefault('reference', f'COMPRA-{_next()}')
+    return StockMovement.objects.create(product=product, created_by=user, **fields)
+
+
+def make_simple_product(user=None, **fields):
+    from simple_inventory.models import SimpleProduct
+
+    number = _next()
+    fields.setdefault('name', f'Material {number}')
+    fields.setdefault('sku', f'INV-{number:06d}')
+    fields.setdefault('quantity', 50)
+    return SimpleProduct.objects.create(created_by=user, **fields)
+
+
+def make_simple_movement(product, user=None, **fields):
+    from simple_inventory.models import StockMovement
+
+    fields.setdefault('movement_type', StockMovement.MovementType.ENTRY)
+    fields.setdefault('quantity', 3)
+    return StockMovement.objects.create(product=product, created_by=user, **fields)
+
+
+def make_expense(user=None, **fields):
+    from expenses.models import Expense
+
+    fields.setdefault('description', f'Gasto {_next()}')
+    fields.setdefault('date', timezone.localdate())
+    fields.setdefault('amount', Decimal('150.00'))
+    return Expense.objects.create(created_by=user, **fields)
+
+
+def add_sale_items(sale, products, lines=2):
+    from sales.models import SaleItem
+
+    items = []
+    for index in range(lines):
+        item = SaleItem(
+            sale=sale,
+            product=products[index % len(products)],
+            description=f'Línea {index + 1}',
+            width_inches=Decimal('24'),
+            height_inches=Decimal('12'),
+            unit_price=Decimal('0.05'),
+            quantity=1 + index % 3,
+        )
+        item.compute_line()
+        items.append(item)
+    SaleItem.objects.bulk_create(items)
+    sale.calculate_totals()
+    return items
+
+
+def make_sale(client, products, user=None, lines=2, complete=False, **fields):
+    from sales.models import Sale
+
+    sale = Sale.objects.create(client=client, created_by=user, **fields)
+    add_sale_items(sale, products, lines)
+    if complete:
+        sale.complete_sale()
+    return sale
+
+
+def add_quotation_items(quotation, products, lines=2):
+    from quotations.models import QuotationItem
+
+    items = []
+    for index in range(lines):
+        item = QuotationItem(
+            quotation=quotation,
+            product=products[index % len(products)],
+            description=f'Línea {index + 1}',
+            width_inches=Decimal('36'),
+            height_inches=Decimal('18'),
+            price_per_square_inch=Decimal('0.05'),
+            quantity=1 + index % 3,
+        )
+        item.compute_line()
+        items.append(item)
+    QuotationItem.objects.bulk_create(items)
+    quotation.calculate_totals()
+    return items
+
+
+def make_quotation(client, products, user=None, lines=2, **fields):
+    from quotations.models import Quotation
+
+    fields.setdefault('valid_until', timezone.localdate() + timedelta(days=15))
+    quotation = Quotation.objects.create(client=client, created_by=user, **fields)
+    add_quotation_items(quotation, products, lines)
+    return quotation
+
+
+def seed_dataset(user, size=3, lines=3):
+    """Create ``size`` rows of every kind of document, owned by ``user``.
+
+    Half of the sales are completed, so the stock movements, rollups and
+    report queries all have something to read. Calling it again adds
+    another batch on top of the existing data.
+    """
+    category = make_category()
+    products = [make_product(category=category) for _ in range(size)]
+    clients = [make_client() for _ in range(size)]
+    sales = [
+        make_sale(clients[index], products, user=user, lines=lines, complete=index % 2 == 0)
+        for index in range(size)
+    ]
+    quotations = [
+        make_quotation(clients[index], products, user=user, lines=lines)
+        for index in range(size)
+    ]
+    simple_products = [make_simple_product(user=user) for _ in range(size)]
+    for index in range(size):
+        make_stock_movement(products[index], user=user)
+        make_simple_movement(simple_products[index], user=user)
+        make_expense(user=user)
+    return {
+        'products': products,
+        'clients': clients,
+        'sales': sales,
+        'quotations': quotations,
+        'simple_products': simple_products,
+    }
@@ -0,0 +1,70 @@
+"""Batched writes for document line items (sale and quotation items)."""
+from decimal import Decimal
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+CENTS = Decimal('0.01')
+
+
+def to_cents(value):
+    """Round like a ``decimal_places=2`` column does when it is stored."""
+    return Decimal(value).quantize(CENTS)
+
+
+def sync_line_items(parent, related_name, items_data, created=False):
+    """Make ``parent``'s items match ``items_data`` with bulk queries.
+
+    Entries carrying the ``id`` of an existing item update it in place,
+    entries without one are inserted, and items missing from the payload
+    are deleted; pass ``created=True`` for a parent that was just inserted
+    to skip reading its (empty) item list. Line figures are computed in Python through the item's
+    ``compute_line()``, so ``save()`` and its per-item totals refresh are
+    never triggered. Returns the resulting items for
+    ``calculate_totals(items)``; callers run this inside a transaction.
+    """
+    manager = getattr(parent, related_name)
+    model = manager.model
+    fk_name = manager.field.name
+    existing = {} if created else {item.pk: item for item in manager.all()}
+
+    to_create, to_update, kept = [], [], []
+    update_fields = {'square_inches', 'total'}
+    for data in items_data:
+        data = dict(data)
+        item = existing.pop(data.pop('id', None), None)
+        if item is None:
+            item = model(**{fk_name: parent}, **data)
+            item.compute_line()
+            to_create.append(item)
+            continue
+
+        # Compare column values (``product_id``, not ``product``) so that
+        # foreign keys are never fetched just to detect a change.
+        columns = [model._meta.get_field(field).attname for field in data]
+        before = [getattr(item, column) for column in columns]
+        for field, value in data.items():
+            setattr(item, field, value)
+        item.compute_line()
+        if before != [getattr(item, column) for column in columns]:
+            update_fields.update(data)
+            to_update.append(item)
+        else:
+            kept.append(item)
+
+    if existing:
+        model.objects.filter(pk__in=list(existing)).delete()
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(update_fields))
+    if to_create:
+        model.objects.bulk_create(to_create)
+    return kept + to_update + to_create
+
+
+def prefetch_line_items(parent, related_name='items'):
+    """Load ``parent``'s items and their products for the response in two queries."""
+    model = getattr(parent, related_name).model
+    prefetch_related_objects(
+        [parent],
+        Prefetch(related_name, queryset=model.objects.select_related('product')),
+    )
+
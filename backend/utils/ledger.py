@@ -0,0 +1,280 @@
+"""Stock balances at past instants: the latest snapshot plus the movements after it.
+
+Both inventories only store a current quantity. Each app also keeps
+``StockSnapshot`` rows, the balance of one product at ``taken_at``
+including every movement created up to then. They are written by the
+nightly ``snapshot_stock`` command, after every ``STOCK_CHECKPOINT_EVERY``
+movements of a product, and whenever the quantity is set directly
+(product edits, inventory adjustments), so the delta to replay for any
+date stays short.
+
+Postings update the product row before inserting their movements, so a
+movement's ``created_at`` is always later than a snapshot read while the
+row was locked.
+
+``reconcile`` checks the counters themselves against the ledger.
+"""
+from contextlib import nullcontext
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# Snapshots that copy the counter rather than declare a quantity.
+DERIVED_SOURCES = ('NIGHTLY', 'CHECKPOINT', 'OPENING')
+
+# The copy taken when the ledger was introduced. Any drift from before
+# then is baked into it, so reconciliation replays the full history instead.
+OPENING_SOURCE = 'OPENING'
+
+RECONCILE_CHUNK_SIZE = 500
+
+
+class StockLedger:
+    """Snapshots and as-of balances for one app's products and movements."""
+
+    def __init__(self, movement_model, snapshot_model, signs, quantity_field, output_field, reset_type=None):
+        self.movement_model = movement_model
+        self.snapshot_model = snapshot_model
+        self.product_model = snapshot_model._meta.get_field('product').related_model
+        self.signs = signs
+        self.quantity_field = quantity_field
+        self.output_field = output_field
+        # Movement type whose ``quantity`` replaces the balance (adjustments).
+        self.reset_type = reset_type
+
+    def signed_quantity(self):
+        return Case(
+            *(When(movement_type=kind, then=F('quantity') * sign) for kind, sign in self.signs.items()),
+            default=Value(0),
+            output_field=self.output_field,
+        )
+
+    def delta(self, **window):
+        """Correlated sum of a product's signed movements within ``window``."""
+        movements = (
+            self.movement_model.objects.filter(product=OuterRef('pk'), **window)
+            .order_by()
+            .values('product')
+            .annotate(total=Sum(self.signed_quantity()))
+            .values('total')
+        )
+        return Coalesce(Subquery(movements, output_field=self.output_field), Value(0), output_field=self.output_field)
+
+    def last_snapshot(self, **filters):
+        return (
+            self.snapshot_model.objects.filter(product=OuterRef('pk'), **filters)
+            .order_by('-taken_at', '-pk')
+        )
+
+    def balances_before(self, products, moment):
+        """Annotate ``balance`` as of just before ``moment`` on ``products``.
+
+        One statement: per product, the latest snapshot before ``moment``
+        (an index seek on product and ``taken_at``) plus its movements
+        between the two. Products without such a snapshot are worked
+        back from their current quantity, which is exact unless they were
+        adjusted since. Products created later are left out.
+        """
+        snapshot = self.last_snapshot(taken_at__lt=moment)
+        return products.filter(created_at__lt=moment).annotate(
+            snapshot_at=Subquery(snapshot.values('taken_at')[:1]),
+            snapshot_balance=Subquery(snapshot.values('balance')[:1], output_field=self.output_field),
+        ).annotate(balance=Case(
+            When(
+                snapshot_at__isnull=True,
+                then=F(self.quantity_field) - self.delta(created_at__gte=moment),
+            ),
+            default=F('snapshot_balance') + self.delta(
+                created_at__gt=OuterRef('snapshot_at'), created_at__lt=moment,
+            ),
+            output_field=self.output_field,
+        ))
+
+    def record(self, balances, source, taken_at=None):
+        """Store ``{product_id: balance}`` as snapshots taken at ``taken_at`` (now)."""
+        taken_at = taken_at or timezone.now()
+        day = timezone.localdate(taken_at)
+        return self.snapshot_model.objects.bulk_create([
+            self.snapshot_model(product_id=product_id, date=day, taken_at=taken_at, balance=balance, source=source)
+            for product_id, balance in balances.items()
+        ], batch_size=500)
+
+    def record_edit(self, product, previous=None):
+        """Declare ``product``'s quantity after it was set by hand.
+
+        ``previous`` is the quantity before the edit, ``None`` for a new
+        product. The movements alone no longer explain a changed quantity,
+        so it becomes the balance later ones are counted from.
+        """
+        quantity = getattr(product, self.quantity_field)
+        if previous is None or quantity != previous:
+            self.record({product.pk: quantity}, self.snapshot_model.Source.EDIT)
+
+    def checkpoint(self, product_ids, every=None):
+        """Snapshot the given products that have ``every`` movements since their last one.
+
+        Call it inside the posting's transaction, after the stock update,
+        so the quantities read here include the movements just posted and
+        nobody else's. Costs one counting query, plus an insert when a
+        product is due.
+        """
+        every = every or settings.STOCK_CHECKPOINT_EVERY
+        since = Coalesce(OuterRef('last_snapshot_at'), OuterRef('created_at'))
+        pending = (
+            self.movement_model.objects.filter(product=OuterRef('pk'), created_at__gt=since)
+            .order_by()
+            .values('product')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        due = (
+            self.product_model.objects.filter(pk__in=list(product_ids))
+            .annotate(last_snapshot_at=Subquery(self.last_snapshot().values('taken_at')[:1]))
+            .annotate(pending=Coalesce(Subquery(pending, output_field=IntegerField()), 0))
+            .filter(pending__gte=every)
+            .values_list('pk', self.quantity_field)
+        )
+        balances = dict(due)
+        if balances:
+            self.record(balances, self.snapshot_model.Source.CHECKPOINT)
+        return balances
+
+    def snapshot_changed(self, source, include_unchanged=False):
+        """Snapshot every product moved since its last snapshot, or never snapshotted.
+
+        Run inside a transaction: the products are read ``FOR UPDATE`` so
+        postings in flight finish first and later ones wait for the commit.
+        """
+        taken = self.last_snapshot()
+        products = self.product_model.objects.order_by('pk')
+        if not include_unchanged:
+            products = products.annotate(
+                last_snapshot_at=Subquery(taken.values('taken_at')[:1]),
+            ).filter(
+                Q(last_snapshot_at__isnull=True)
+                | Exists(self.movement_model.objects.filter(
+                    product=OuterRef('pk'), created_at__gt=OuterRef('last_snapshot_at'),
+                ))
+            )
+        balances = dict(products.select_for_update().values_list('pk', self.quantity_field))
+        self.record(balances, source)
+        return balances
+
+    def expected_balances(self, products):
+        """Annotate ``expected``: the last declared balance plus the movements after it.
+
+        Declared balances are snapshots of a quantity someone set (product
+        edits, adjustments, repairs) and each product's first snapshot.
+        Nightly and checkpoint snapshots only copy the counter being
+        checked, so they are skipped. When the first snapshot is the
+        ledger's opening copy, ``expected`` is rebuilt from the whole
+        movement history instead: from zero, or from the last movement of
+        ``reset_type``. ``expected`` is ``None`` for products that have no
+        snapshot yet.
+        """
+        snapshots = self.snapshot_model.objects.filter(product=OuterRef('pk'))
+        declared = snapshots.exclude(source__in=DERIVED_SOURCES).order_by('-taken_at', '-pk')
+        first = snapshots.order_by('taken_at', 'pk')
+        anchor = self.snapshot_model.objects.filter(pk=OuterRef('anchor_id'))
+        products = products.annotate(
+            anchor_id=Coalesce(Subquery(declared.values('pk')[:1]), Subquery(first.values('pk')[:1])),
+        ).annotate(
+            anchor_at=Subquery(anchor.values('taken_at')[:1]),
+            anchor_balance=Subquery(anchor.values('balance')[:1], output_field=self.output_field),
+            anchor_source=Subquery(anchor.values('source')[:1]),
+        )
+        history = self.delta()
+        if self.reset_type:
+            reset = self.movement_model.objects.filter(
+                product=OuterRef('pk'), movement_type=self.reset_type,
+            ).order_by('-created_at', '-pk')
+            products = products.annotate(
+                reset_at=Subquery(reset.values('created_at')[:1]),
+                reset_quantity=Subquery(reset.values('quantity')[:1], output_field=self.output_field),
+            )
+            history = Case(
+                When(reset_at__isnull=True, then=history),
+                default=F('reset_quantity') + self.delta(created_at__gt=OuterRef('reset_at')),
+                output_field=self.output_field,
+            )
+        return products.annotate(expected=Case(
+            When(anchor_source=OPENING_SOURCE, then=history),
+            default=F('anchor_balance') + self.delta(created_at__gt=OuterRef('anchor_at')),
+            output_field=self.output_field,
+        ))
+
+    def reconcile(self, repair=False, chunk_size=RECONCILE_CHUNK_SIZE):
+        """Compare every counter with its ledger; return ``(checked, mismatches, unverifiable)``.
+
+        Products without any snapshot have no balance to start from, so
+        they cannot be judged: they are listed in ``unverifiable`` and left
+        out of ``checked`` until ``snapshot_stock`` records their first one.
+
+        The catalog is read ``chunk_size`` products at a time in id order,
+        one statement per chunk that sums each product's movements through
+        the (product, created_at) index, so no movement rows reach Python.
+        With ``repair`` each chunk runs under row locks and its mismatches
+        are fixed with one ``bulk_update``; the repaired balance is
+        recorded and the counter copies taken since the last declared
+        balance, now known to be wrong, are dropped.
+        """
+        quantity = self.quantity_field
+        checked, mismatches, unverifiable, last_pk = 0, [], [], 0
+        while True:
+            # Only a repair needs the chunk's reads and writes in one transaction.
+            with transaction.atomic() if repair else nullcontext():
+                products = self.product_model.objects.filter(pk__gt=last_pk).order_by('pk')
+                if repair:
+                    products = products.select_for_update()
+                chunk = list(
+                    self.expected_balances(products)
+                    .values('pk', 'name', 'sku', quantity, 'expected', 'anchor_at', 'anchor_source')[:chunk_size]
+                )
+                wrong = [
+                    row for row in chunk
+                    if row['expected'] is not None and row[quantity] != row['expected']
+                ]
+                if repair and wrong:
+                    self.repair(wrong)
+            unknown = [row for row in chunk if row['expected'] is None]
+            checked += len(chunk) - len(unknown)
+            unverifiable += [{
+                'id': row['pk'],
+                'name': row['name'],
+                'sku': row['sku'],
+                'quantity': row[quantity],
+            } for row in unknown]
+            mismatches += [{
+                'id': row['pk'],
+                'name': row['name'],
+                'sku': row['sku'],
+                'quantity': row[quantity],
+                'expected': row['expected'],
+                'difference': row['expected'] - row[quantity],
+            } for row in wrong]
+            if len(chunk) < chunk_size:
+                return checked, mismatches, unverifiable
+            last_pk = chunk[-1]['pk']
+
+    def repair(self, rows):
+        from reports.cache import invalidate
+
+        now = timezone.now()
+        self.product_model.objects.bulk_update([
+            self.product_model(pk=row['pk'], **{self.quantity_field: row['expected']}, updated_at=now)
+            for row in rows
+        ], [self.quantity_field, 'updated_at'])
+        self.snapshot_model.objects.filter(reduce(or_, (
+            # A history replay disowns every copy, the opening one included.
+            Q(product_id=row['pk']) if row['anchor_source'] == OPENING_SOURCE
+            else Q(product_id=row['pk'], taken_at__gt=row['anchor_at'])
+            for row in rows
+        )), source__in=DERIVED_SOURCES).delete()
+        self.record({row['pk']: row['expected'] for row in rows}, self.snapshot_model.Source.RECONCILED, now)
+        # ``bulk_update`` sends no signals.
+        invalidate('products')
@@ -0,0 +1,225 @@
+"""Prometheus metrics shared by every worker process.
+
+Gunicorn runs several sync workers, so in-memory counters would only
+describe whichever worker answered the scrape. Every worker adds to the
+same SQLite file instead (``METRICS_DB_PATH``), through the standard
+``sqlite3`` module so the metrics never show up in the app's own query
+counts. Each request costs one small write transaction; the file runs in
+WAL mode, so workers and the scraper do not block each other.
+
+Enabled with ``METRICS_ENABLED=True``; ``/api/metrics/`` serves the
+Prometheus text format to administrators.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from users.permissions import IsAdmin
+
+from .profiling import QueryTimer
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PDF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name: (type, help)
+FAMILIES = {
+    'rotuprinters_http_requests_total': ('counter', 'Peticiones atendidas por ruta, método y estado.'),
+    'rotuprinters_http_request_duration_seconds': ('histogram', 'Latencia de las peticiones por ruta.'),
+    'rotuprinters_http_db_queries_total': ('counter', 'Consultas SQL ejecutadas por ruta.'),
+    'rotuprinters_pdf_render_duration_seconds': ('histogram', 'Tiempo de generación de PDF por ruta.'),
+}
+
+# URL name of the request being served; PDFs rendered outside a request
+# (report jobs) are labelled "background".
+current_route = ContextVar('current_route', default='background')
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(**labels):
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def histogram_samples(name, value, buckets, **labels):
+    samples = [
+        (f'{name}_bucket', format_labels(**labels, le=format_bound(bound)), 1 if value <= bound else 0)
+        for bound in (*buckets, float('inf'))
+    ]
+    samples.append((f'{name}_sum', format_labels(**labels), value))
+    samples.append((f'{name}_count', format_labels(**labels), 1))
+    return samples
+
+
+class MetricsStore:
+    """Additive counters in a SQLite file, one row per sample."""
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS samples ('
+        ' name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL,'
+        ' PRIMARY KEY (name, labels))'
+    )
+    UPSERT = (
+        'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+        'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value'
+    )
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(self.SCHEMA)
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def add(self, samples):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(self.UPSERT, samples)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def collect(self):
+        return self.connection().execute(
+            'SELECT name, labels, value FROM samples ORDER BY name, labels'
+        ).fetchall()
+
+    def reset(self):
+        self.connection().execute('DELETE FROM samples')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(store_class=MetricsStore):
+    """Per-process store for the configured file; keeps its connections."""
+    key = (store_class, str(settings.METRICS_DB_PATH))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = store_class(key[1])
+        return _stores[key]
+
+
+def record(samples):
+    """Add ``samples``; metrics problems are logged, never raised."""
+    if not settings.METRICS_ENABLED:
+        return
+    try:
+        get_store().add(samples)
+    except sqlite3.Error:
+        logger.warning('No se pudieron registrar las métricas.', exc_info=True)
+
+
+def record_request(route, method, status_code, seconds, queries):
+    samples = [
+        ('rotuprinters_http_requests_total',
+         format_labels(route=route, method=method, status=status_code), 1),
+        ('rotuprinters_http_db_queries_total', format_labels(route=route), queries),
+    ]
+    samples += histogram_samples(
+        'rotuprinters_http_request_duration_seconds', seconds, REQUEST_BUCKETS, route=route
+    )
+    record(samples)
+
+
+@contextmanager
+def pdf_render_timer():
+    """Time a PDF build under the route currently being served."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(histogram_samples(
+            'rotuprinters_pdf_render_duration_seconds',
+            time.perf_counter() - started, PDF_BUCKETS, route=current_route.get(),
+        ))
+
+
+def family_of(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def exposition(rows):
+    """Render ``(name, labels, value)`` rows in the Prometheus text format."""
+    by_family = {name: [] for name in FAMILIES}
+    for name, labels, value in rows:
+        by_family.setdefault(family_of(name), []).append((name, labels, value))
+
+    lines = []
+    for family, samples in by_family.items():
+        kind, help_text = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in samples:
+            number = int(value) if float(value).is_integer() else value
+            lines.append(f'{name}{{{labels}}} {number}' if labels else f'{name} {number}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Counts requests, latency and queries per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        token = current_route.set('unresolved')
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            current_route.reset(token)
+        seconds = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            record_request(match.url_name, request.method, response.status_code, seconds, timer.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.url_name:
+            current_route.set(request.resolver_match.url_name)
+
+
+class MetricsView(APIView):
+    """Prometheus scrape endpoint, aggregated across all workers."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        rows = get_store().collect() if settings.METRICS_ENABLED else []
+        return HttpResponse(exposition(rows), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,47 @@
+"""Page-number pagination with an opt-in keyset (cursor) mode."""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pages over a fixed, unique ordering.
+
+    The ordering comes from the view's ``cursor_ordering`` and ignores
+    ``?ordering=``: a keyset needs a stable, indexed sort key, and an
+    arbitrary column would turn every page back into a scan.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', ('-created_at', '-id')))
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Numbered pages by default; ``?pagination=cursor`` switches to keyset.
+
+    Numbered pages run ``COUNT(*)`` and an ``OFFSET`` that grows with the
+    page number. Keyset pages seek straight to the ``(created_at, id)``
+    index position, so page 500 costs the same as page 1. Clients opt in
+    with ``?pagination=cursor`` and then follow the ``next``/``previous``
+    links, which carry the ``cursor`` parameter.
+    """
+
+    cursor_class = KeysetPagination
+    keyset = None
+
+    def wants_cursor(self, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or self.cursor_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request):
+            self.keyset = self.cursor_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,13 +1,31 @@
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
 
 from django.conf import settings
-from django.utils import timezone
+from django.http import HttpResponse
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 BRAND_COLOR = colors.HexColor('#FF6600')
+HEADER_COLOR = colors.HexColor('#0055A4')
+STRIPE_COLOR = colors.HexColor('#F5F5F5')
 TOP_BOTTOM_BAR_HEIGHT = 28
 FOOTER_MARGIN = 12
 
+LOGO_CANDIDATES = (
+    ('logo.png',),
+    ('static', 'logo.png'),
+    ('staticfiles', 'logo.png'),
+    ('..', 'frontend', 'public', 'logo.png'),
+    ('frontend_dist', 'logo.png'),
+)
+
 
 def add_branding_to_canvas(canvas, doc):
     """Draw brand rectangles and footer info on each PDF page."""
@@ -37,3 +55,165 @@ def add_branding_to_canvas(canvas, doc):
         canvas.drawString(x, y, line)
 
     canvas.restoreState()
+
+
+# Process-wide document toolkit. Everything below is computed once per
+# worker and shared by every PDF endpoint.
+
+@lru_cache(maxsize=None)
+def get_logo_path():
+    """Return an absolute path to the logo image if available."""
+    base_dir = Path(settings.BASE_DIR)
+    for parts in LOGO_CANDIDATES:
+        path = base_dir.joinpath(*parts)
+        if path.exists():
+            return str(path.resolve())
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_logo_reader():
+    """Return the decoded logo as an ``ImageReader``, or ``None``."""
+    logo_path = get_logo_path()
+    if not logo_path:
+        return None
+    try:
+        reader = ImageReader(logo_path)
+        # Decode the pixels now so every later document reuses them.
+        reader.getRGBData()
+    except Exception:
+        return None
+    return reader
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Shared ReportLab sample stylesheet."""
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=None)
+def get_title_style(font_size=24, space_after=30):
+    """Branded orange title style."""
+    return ParagraphStyle(
+        f'BrandTitle{font_size}x{space_after}',
+        parent=get_styles()['Heading1'],
+        fontSize=font_size,
+        textColor=BRAND_COLOR,
+        spaceAfter=space_after,
+        alignment=TA_CENTER,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_signature_label_style():
+    return ParagraphStyle(
+        'SignatureLabel',
+        parent=get_styles()['Normal'],
+        alignment=TA_CENTER,
+        spaceBefore=4,
+    )
+
+
+class Logo(Flowable):
+    """Draw the cached logo without re-reading it from disk."""
+
+    def __init__(self, reader, width=1.0 * inch, height=1.0 * inch):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+def build_header(title='RotuPrinters', with_logo=True, font_size=24, space_after=30, logo_gap=0.1 * inch):
+    """Company title, next to the logo when it is available."""
+    title_paragraph = Paragraph(title, get_title_style(font_size, space_after))
+    reader = get_logo_reader() if with_logo else None
+    if reader is None:
+        return [title_paragraph]
+
+    header = Table([[Logo(reader), title_paragraph]], colWidths=[1.2 * inch, 5.8 * inch])
+    header.setStyle(HEADER_TABLE_STYLE)
+    header.hAlign = 'CENTER'
+    return [header, Spacer(1, logo_gap)]
+
+
+def build_info_table(rows, col_widths, font_size=10, padding=6):
+    """Label/value table with bold labels (invoice data, quotation data)."""
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+    ]))
+    return table
+
+
+def build_summary_table(rows, col_widths=(3 * inch, 2 * inch), font_size=12, padding=8, shaded=True):
+    """Grey summary block with bold labels."""
+    commands = [
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+    ]
+    if shaded:
+        commands.append(('BACKGROUND', (0, 0), (-1, -1), STRIPE_COLOR))
+    table = Table(rows, colWidths=list(col_widths))
+    table.setStyle(TableStyle(commands))
+    return table
+
+
+def build_data_table(rows, col_widths, font_size=9, header_padding=12, grid_width=1, extra_styles=()):
+    """Striped table with the blue header row used by every listing."""
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), header_padding),
+        ('GRID', (0, 0), (-1, -1), grid_width, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, STRIPE_COLOR]),
+        *extra_styles,
+    ]))
+    return table
+
+
+def render_pdf(elements, pagesize=letter):
+    """Build a branded document and return its bytes."""
+    from .metrics import pdf_render_timer
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=pagesize)
+    with pdf_render_timer():
+        doc.build(
+            elements,
+            onFirstPage=add_branding_to_canvas,
+            onLaterPages=add_branding_to_canvas
+        )
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
+def pdf_response(pdf, filename):
+    """Wrap rendered PDF bytes in a download response."""
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.write(pdf)
+    return response
+
@@ -0,0 +1,95 @@
+"""Immutable on-disk cache for rendered PDFs of finalized documents."""
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from .pdf import pdf_response
+
+
+class PDFArtifactStore:
+    """Stores one PDF per ``(pk, updated_at)`` under ``MEDIA_ROOT``.
+
+    A finalized document never changes while its ``updated_at`` stays the
+    same, so the rendered bytes can be reused by every worker. Files are
+    written to a temporary name and renamed into place, which keeps
+    concurrent writers from ever exposing a partial file.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    @property
+    def root(self):
+        return Path(settings.MEDIA_ROOT) / 'pdf_cache' / self.namespace
+
+    def key(self, obj):
+        return f'{obj.pk}-{int(obj.updated_at.timestamp() * 1_000_000)}'
+
+    def etag(self, obj):
+        return quote_etag(f'{self.namespace}-{self.key(obj)}')
+
+    def path(self, obj):
+        return self.root / f'{self.key(obj)}.pdf'
+
+    def get_or_render(self, obj, render):
+        """Return the path of the stored PDF, rendering it on a miss."""
+        path = self.path(obj)
+        if path.exists():
+            return path
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        pdf = render(obj)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=f'.{obj.pk}-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(pdf)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._discard_stale(obj, keep=path)
+        return path
+
+    def response(self, request, obj, render, filename):
+        """Serve ``obj`` from the store, honouring ``If-None-Match``."""
+        etag = self.etag(obj)
+        # ``*`` matches any stored version; the document exists, so it always matches.
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        path = self.get_or_render(obj, render)
+        response = FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type='application/pdf',
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def _discard_stale(self, obj, keep):
+        for stale in self.root.glob(f'{obj.pk}-*.pdf'):
+            if stale != keep:
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+def cached_pdf_response(request, store, obj, is_final, render, filename):
+    """Serve finalized documents from ``store``; render the rest on the fly."""
+    if is_final:
+        return store.response(request, obj, render, filename)
+    return pdf_response(render(obj), filename)
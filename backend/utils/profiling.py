@@ -0,0 +1,144 @@
+"""Opt-in request profiling: per-view timings in ``Server-Timing`` headers.
+
+Enabled with ``REQUEST_PROFILING=True``. Every request that resolves to a
+view gets a ``Server-Timing`` header with its wall, SQL and Python time,
+the number of queries and the response size, and a log line on the
+``utils.profiling`` logger. Administrators can add ``?__profile=1`` to
+receive the cProfile statistics of that request instead of its body
+(``?__profile=raw`` returns the binary stats for ``snakeviz``/``pstats``).
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from users.authentication import QueryParamJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '__profile'
+PROFILE_LINES = 60
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and adds up their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def view_name(resolver_match, method):
+    """Dotted name of the view, with the action for viewsets.
+
+    ``reports.views.ClientsReportView``,
+    ``sales.views.SaleViewSet.generate_pdf``.
+    """
+    func = resolver_match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return f'{func.__module__}.{func.__qualname__}'
+    name = f'{view_class.__module__}.{view_class.__qualname__}'
+    action = (getattr(func, 'actions', None) or {}).get(method.lower())
+    return f'{name}.{action}' if action else name
+
+
+def is_admin_request(request):
+    """Authenticate the token the same way the API does, before the view runs."""
+    try:
+        result = QueryParamJWTAuthentication().authenticate(Request(request))
+    except APIException:
+        return False
+    user = result[0] if result else getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and getattr(user, 'is_admin', False))
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile_mode = request.GET.get(PROFILE_PARAM)
+        profiler = None
+        if profile_mode and is_admin_request(request):
+            profiler = cProfile.Profile()
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        wall = time.perf_counter() - started
+
+        if request.resolver_match is None:
+            return response
+
+        name = view_name(request.resolver_match, request.method)
+        size = None if response.streaming else len(response.content)
+        if profiler is not None:
+            response = self.profile_response(profiler, profile_mode, name)
+
+        response['Server-Timing'] = server_timing(name, wall, timer, size)
+        logger.info(
+            '%s %s %s: %.1f ms, %d queries in %.1f ms, %s bytes',
+            request.method, name, response.status_code, wall * 1000,
+            timer.count, timer.seconds * 1000, size if size is not None else '?',
+            extra={
+                'view': name,
+                'status_code': response.status_code,
+                'wall_ms': wall * 1000,
+                'sql_count': timer.count,
+                'sql_ms': timer.seconds * 1000,
+                'response_bytes': size,
+            },
+        )
+        return response
+
+    def profile_response(self, profiler, mode, name):
+        stats = pstats.Stats(profiler)
+        if mode == 'raw':
+            response = HttpResponse(marshal.dumps(stats.stats), content_type='application/octet-stream')
+            filename = name.replace('/', '_')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.prof"'
+            return response
+
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+
+
+def server_timing(name, wall, timer, size):
+    python = max(wall - timer.seconds, 0.0)
+    metrics = [
+        f'total;dur={wall * 1000:.1f}',
+        f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries"',
+        f'app;dur={python * 1000:.1f}',
+        f'view;desc="{name}"',
+    ]
+    if size is not None:
+        metrics.append(f'size;desc="{size} bytes"')
+    return ', '.join(metrics)
@@ -0,0 +1,20 @@
+"""Read-side query expressions shared by the list endpoints."""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def line_count(item_model, fk_name):
+    """Per-row count of a document's lines, for list annotations.
+
+    ``Count('items')`` groups the whole parent table before the page
+    ``LIMIT`` applies; this correlated subquery only counts the lines of
+    the rows actually returned, through the foreign key index.
+    """
+    lines = (
+        item_model.objects.filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(lines, output_field=IntegerField()), 0)
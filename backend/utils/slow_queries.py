@@ -0,0 +1,238 @@
+"""Slow-query log with optional ``EXPLAIN`` capture.
+
+Enabled by setting ``SLOW_QUERY_THRESHOLD_MS``. Every query slower than
+the threshold is logged on the ``utils.slow_queries`` logger with its
+SQL, the view that issued it and the application frames it came from.
+Parameter values are never logged or stored, only their number: they
+carry customer data. With ``SLOW_QUERY_EXPLAIN=True`` slow ``SELECT``
+statements are also explained with a plain ``EXPLAIN`` (``EXPLAIN QUERY
+PLAN`` on SQLite), which plans the query without running it.
+
+The worst ``SLOW_QUERY_TOP_N`` statements, grouped by their SQL, are
+kept in the shared metrics file so that ``/api/metrics/slow-queries/``
+shows what every worker has seen.
+"""
+import logging
+import re
+import threading
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.permissions import IsAdmin
+
+from . import metrics
+from .metrics import MetricsStore
+from .profiling import view_name
+
+logger = logging.getLogger(__name__)
+
+ORIGIN_FRAMES = 3
+current_view = ContextVar('current_view', default='background')
+
+_in_explain = threading.local()
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+
+
+def fingerprint(sql):
+    """SQL with ``IN (%s, %s, ...)`` collapsed, so batches group together."""
+    return _IN_LIST.sub('(%s, ...)', sql)
+
+
+def query_origin():
+    """``path:line in function`` for the innermost application frames."""
+    base_dir = str(Path(settings.BASE_DIR).resolve())
+    here = str(Path(__file__).resolve())
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        if not frame.filename.startswith(base_dir) or frame.filename == here:
+            continue
+        if 'site-packages' in frame.filename:
+            continue
+        frames.append(f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}')
+        if len(frames) == ORIGIN_FRAMES:
+            break
+    return frames
+
+
+def explain(connection, sql, params):
+    """Plan of a ``SELECT``, or ``''``; other statements are never explained."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    # Keeps the savepoint's own statements out of the log.
+    _in_explain.active = True
+    try:
+        # A failed EXPLAIN must not break the caller's transaction.
+        with transaction.atomic(using=connection.alias):
+            # The backend's own cursor: no execute_wrappers, no query logging.
+            cursor = connection.create_cursor()
+            try:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+    except DatabaseError:
+        return ''
+    finally:
+        _in_explain.active = False
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+class SlowQueryStore(MetricsStore):
+    """Worst statements seen by any worker, keyed by fingerprint."""
+
+    # Files written before parameters were dropped keep their old table.
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS slow_statements ('
+        ' fingerprint TEXT PRIMARY KEY, calls INTEGER NOT NULL, total_ms REAL NOT NULL,'
+        ' max_ms REAL NOT NULL, sql TEXT NOT NULL, view TEXT NOT NULL,'
+        ' origin TEXT NOT NULL, plan TEXT NOT NULL, last_seen REAL NOT NULL)'
+    )
+    UPSERT = (
+        'INSERT INTO slow_statements VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (fingerprint) DO UPDATE SET'
+        ' calls = calls + 1, total_ms = total_ms + excluded.total_ms,'
+        ' last_seen = excluded.last_seen,'
+        # The slowest run is the one worth keeping the details of.
+        ' sql = CASE WHEN excluded.max_ms > max_ms THEN excluded.sql ELSE sql END,'
+        ' view = CASE WHEN excluded.max_ms > max_ms THEN excluded.view ELSE view END,'
+        ' origin = CASE WHEN excluded.max_ms > max_ms THEN excluded.origin ELSE origin END,'
+        ' plan = CASE WHEN excluded.max_ms > max_ms AND excluded.plan != \'\''
+        ' THEN excluded.plan ELSE plan END,'
+        ' max_ms = MAX(max_ms, excluded.max_ms)'
+    )
+    PRUNE = (
+        'DELETE FROM slow_statements WHERE fingerprint NOT IN'
+        ' (SELECT fingerprint FROM slow_statements ORDER BY max_ms DESC LIMIT ?)'
+    )
+    COLUMNS = ('fingerprint', 'calls', 'total_ms', 'max_ms', 'sql', 'view', 'origin', 'plan', 'last_seen')
+
+    def record(self, sql, duration_ms, view, origin, plan, keep):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(self.UPSERT, (
+                fingerprint(sql), duration_ms, duration_ms, sql, view, origin, plan, time.time(),
+            ))
+            conn.execute(self.PRUNE, (keep,))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def top(self, limit):
+        rows = self.connection().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM slow_statements ORDER BY max_ms DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def reset(self):
+        self.connection().execute('DELETE FROM slow_statements')
+
+
+def get_store():
+    return metrics.get_store(SlowQueryStore)
+
+
+class SlowQueryLogger:
+    """``execute_wrapper`` that reports statements over the threshold."""
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self.store = get_store()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_in_explain, 'active', False):
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.threshold_ms:
+            self.report(sql, params, many, context['connection'], duration_ms)
+        return result
+
+    def report(self, sql, params, many, connection, duration_ms):
+        view = current_view.get()
+        origin = query_origin()
+        plan = ''
+        if settings.SLOW_QUERY_EXPLAIN and not many:
+            plan = explain(connection, sql, params)
+
+        logger.warning(
+            'Consulta lenta (%.1f ms) en %s\n%s\nparámetros: %d\norigen: %s%s',
+            duration_ms, view, sql, len(params or ()), ' <- '.join(origin) or '?',
+            f'\nplan:\n{plan}' if plan else '',
+        )
+        try:
+            self.store.record(
+                sql, duration_ms, view, '\n'.join(origin), plan, settings.SLOW_QUERY_TOP_N,
+            )
+        except Exception:
+            logger.exception('No se pudo guardar la consulta lenta.')
+
+
+@contextmanager
+def slow_query_log(view=None):
+    """Watch every database connection for the duration of the block."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None:
+        yield
+        return
+    token = current_view.set(view) if view else None
+    wrapper = SlowQueryLogger(threshold)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            yield
+    finally:
+        if token is not None:
+            current_view.reset(token)
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(request.path)
+        try:
+            with slow_query_log():
+                return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_view.set(view_name(request.resolver_match, request.method))
+
+
+class SlowQueryView(APIView):
+    """Worst statements seen by every worker (``DELETE`` clears the list)."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return Response({'enabled': False, 'results': []})
+        return Response({
+            'enabled': True,
+            'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+            'results': get_store().top(settings.SLOW_QUERY_TOP_N),
+        })
+
+    def delete(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+            get_store().reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
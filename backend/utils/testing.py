@@ -0,0 +1,65 @@
+"""Test helpers shared by the app test suites."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+
+
+class QueryBudgetMixin:
+    """Assertions for endpoints whose query count must not depend on data size.
+
+    Expects the test case to define ``self.api`` (an authenticated
+    ``APIClient``).
+    """
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+            # Streamed exports only hit the database while being consumed.
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(response.status_code, 200, f'{url}: {body[:500]}')
+        return queries
+
+    def assertConstantQueries(self, url, grow, sizes=(1, 5, 20)):
+        """GET ``url`` after ``grow(n)`` for every ``n`` in ``sizes``.
+
+        ``grow`` adds rows (list entries, document lines, ...) so that the
+        page being rendered gets bigger between requests; the number of
+        queries must stay the same every time. Returns that number.
+        """
+        counts = []
+        last = None
+        for size in sizes:
+            grow(size)
+            last = self.count_queries(url)
+            counts.append(len(last))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'{url}: query count grew with the data {counts}. Last run:\n'
+            + '\n'.join(query['sql'] for query in last.captured_queries),
+        )
+        return counts[0]
+
+
+def api_routes(patterns=None, prefix=''):
+    """Yield ``(name, pattern)`` for every named GET route under ``api/``."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for entry in patterns:
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            yield from api_routes(entry.url_patterns, route)
+            continue
+        if not route.startswith('api/') or not entry.name or entry.name == 'api-root':
+            continue
+        if 'format' in entry.pattern.regex.groupindex:
+            continue
+        if handles_get(entry):
+            yield entry.name, entry
+
+
+def handles_get(entry):
+    actions = getattr(entry.callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = getattr(entry.callback, 'view_class', None)
+    return view_class is not None and hasattr(view_class, 'get')
@@ -0,0 +1,423 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expenses.models import Expense
+from quotations.models import Quotation
+from quotations.pdf import quotation_store, render_quotation
+from reports.models import ReportJob
+from sales.models import Sale
+from sales.pdf import invoice_store, render_invoice
+from users.models import User
+
+from .cache import FileBasedCache
+from .dates import DateRange, day_bounds
+from .factories import make_client, make_expense, make_quotation, make_sale, make_user, seed_dataset
+from .metrics import MetricsStore, get_store
+from .pdf import get_logo_path, get_logo_reader
+from .slow_queries import explain, get_store as get_slow_query_store, slow_query_log
+from .testing import api_routes
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ['utils.profiling.RequestProfilingMiddleware'])
+class RequestProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.admin = make_user(role=User.Role.ADMIN)
+        self.seller = make_user(role=User.Role.SELLER)
+        seed_dataset(self.admin, size=1)
+
+    def get(self, url, user):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_server_timing_names_the_view(self):
+        response = self.get('/api/reports/clients/', self.seller)
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn('view;desc="reports.views.ClientsReportView"', timing)
+        self.assertRegex(timing, r'db;dur=[0-9.]+;desc="[1-9][0-9]* queries"')
+        self.assertIn(f'size;desc="{len(response.content)} bytes"', timing)
+
+        sale = self.get('/api/sales/', self.seller)
+        self.assertIn('view;desc="sales.views.SaleViewSet.list"', sale['Server-Timing'])
+
+    def test_profile_dump_for_admins_only(self):
+        response = self.get('/api/reports/clients/?__profile=1', self.admin)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn(b'function calls', response.content)
+
+        response = self.get('/api/reports/clients/?__profile=1', self.seller)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'function calls', response.content)
+
+
+def add_requests(path, count):
+    store = MetricsStore(path)
+    for _ in range(count):
+        store.add([('rotuprinters_http_requests_total', 'route="sale-list"', 1)])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        settings_override = override_settings(
+            METRICS_ENABLED=True,
+            METRICS_DB_PATH=str(Path(self.tmp) / 'metrics.sqlite3'),
+            # The invoice download stores its PDF under MEDIA_ROOT.
+            MEDIA_ROOT=str(Path(self.tmp) / 'media'),
+            MIDDLEWARE=settings.MIDDLEWARE + ['utils.metrics.MetricsMiddleware'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = make_user(role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.data = seed_dataset(self.admin, size=1)
+
+    def scrape(self):
+        response = self.api.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_queries_and_pdf_renders_per_route(self):
+        for _ in range(2):
+            self.api.get('/api/reports/dashboard/')
+        self.api.get(f"/api/sales/{self.data['sales'][0].pk}/generate_pdf/")
+
+        text = self.scrape()
+        self.assertIn('# TYPE rotuprinters_http_request_duration_seconds histogram', text)
+        self.assertIn(
+            'rotuprinters_http_requests_total{route="dashboard-stats",method="GET",status="200"} 2', text
+        )
+        self.assertIn('rotuprinters_http_request_duration_seconds_count{route="dashboard-stats"} 2', text)
+        self.assertIn('rotuprinters_http_request_duration_seconds_bucket{route="dashboard-stats",le="+Inf"} 2', text)
+        self.assertIn('rotuprinters_http_db_queries_total{route="dashboard-stats"} 16', text)
+        self.assertIn('rotuprinters_pdf_render_duration_seconds_count{route="sale-generate-pdf"} 1', text)
+
+    def test_admins_only(self):
+        seller = APIClient()
+        seller.force_authenticate(make_user(role=User.Role.SELLER))
+        self.assertEqual(seller.get('/api/metrics/').status_code, 403)
+
+    @skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Needs fork.')
+    def test_counts_from_every_process_add_up(self):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=add_requests, args=(get_store().path, 50)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertIn('rotuprinters_http_requests_total{route="sale-list"} 200', self.scrape())
+
+
+class PDFToolkitTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+        self.data = seed_dataset(user, size=1)
+
+    def test_every_pdf_endpoint_renders_through_the_toolkit(self):
+        routes = [(name, entry) for name, entry in api_routes() if name.endswith('-pdf')]
+        self.assertGreaterEqual(len(routes), 6)
+        for name, entry in routes:
+            with self.subTest(route=name):
+                kwargs = {}
+                if 'pk' in entry.pattern.regex.groupindex:
+                    kwargs['pk'] = entry.callback.cls.queryset.model.objects.order_by('pk').first().pk
+                with mock.patch('utils.pdf.SimpleDocTemplate', wraps=SimpleDocTemplate) as document:
+                    response = self.api.get(reverse(name, kwargs=kwargs))
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'application/pdf')
+                self.assertTrue(body.startswith(b'%PDF'))
+                self.assertEqual(document.call_count, 1)
+
+    def test_logo_is_decoded_once_per_process(self):
+        get_logo_reader.cache_clear()
+        self.addCleanup(get_logo_reader.cache_clear)
+        quotation = self.data['quotations'][0]
+        with mock.patch('utils.pdf.ImageReader', wraps=ImageReader) as reader:
+            for _ in range(2):
+                render_invoice(self.data['sales'][0])
+                render_quotation(quotation)
+        self.assertEqual(reader.call_count, 1 if get_logo_path() else 0)
+
+
+class PDFArtifactStoreTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = make_user()
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+        self.data = seed_dataset(user, size=1)
+        self.sale = self.data['sales'][0]
+        self.url = f'/api/sales/{self.sale.pk}/generate_pdf/'
+
+    def download(self, url, **headers):
+        with mock.patch('sales.views.render_invoice', wraps=render_invoice) as render_sale, \
+                mock.patch('quotations.views.render_quotation', wraps=render_quotation) as render_doc:
+            response = self.api.get(url, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, render_sale.call_count + render_doc.call_count
+
+    def stored(self, store):
+        return sorted(path.name for path in store.root.glob('*.pdf'))
+
+    def test_etag_and_not_modified(self):
+        response, renders = self.download(self.url)
+        self.assertEqual((response.status_code, renders), (200, 1))
+        self.assertEqual(response['ETag'], invoice_store.etag(self.sale))
+
+        for header in (response['ETag'], f'"other", {response["ETag"]}', '*'):
+            with self.subTest(if_none_match=header):
+                response, renders = self.download(self.url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual((response.status_code, renders), (304, 0))
+
+        response, _ = self.download(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_second_download_is_served_from_the_store(self):
+        _, renders = self.download(self.url)
+        self.assertEqual(renders, 1)
+        response, renders = self.download(self.url)
+        self.assertEqual((response.status_code, renders), (200, 0))
+        self.assertEqual(self.stored(invoice_store), [f'{invoice_store.key(self.sale)}.pdf'])
+
+    def test_update_renders_again_and_drops_the_stale_file(self):
+        old, _ = self.download(self.url)
+        Sale.objects.filter(pk=self.sale.pk).update(updated_at=self.sale.updated_at + timedelta(seconds=1))
+        self.sale.refresh_from_db()
+
+        new, renders = self.download(self.url, HTTP_IF_NONE_MATCH=old['ETag'])
+        self.assertEqual((new.status_code, renders), (200, 1))
+        self.assertNotEqual(new['ETag'], old['ETag'])
+        self.assertEqual(self.stored(invoice_store), [f'{invoice_store.key(self.sale)}.pdf'])
+
+    def test_only_final_quotations_are_stored(self):
+        for status in (Quotation.Status.CONVERTED, Quotation.Status.REJECTED):
+            with self.subTest(status=status):
+                quotation = make_quotation(self.data['clients'][0], self.data['products'], status=status)
+                url = f'/api/quotations/{quotation.pk}/generate_pdf/'
+                response, renders = self.download(url)
+                self.assertEqual((response.status_code, renders), (200, 1))
+                self.assertEqual(response['Content-Type'], 'application/pdf')
+                self.assertEqual(response['ETag'], quotation_store.etag(quotation))
+                response, renders = self.download(url)
+                self.assertEqual(renders, 0)
+
+        pending = make_quotation(self.data['clients'][0], self.data['products'])
+        response, renders = self.download(f'/api/quotations/{pending.pk}/generate_pdf/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual((response.status_code, renders), (200, 1))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(len(self.stored(quotation_store)), 2)
+
+
+def race_for_key(location, barrier, rounds, wins):
+    cache = FileBasedCache(location, {})
+    for round_number in range(rounds):
+        barrier.wait()
+        if cache.add(f'lock-{round_number}', os.getpid(), 60):
+            with wins.get_lock():
+                wins.value += 1
+
+
+class FileCacheTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.cache = FileBasedCache(self.location, {})
+
+    def test_add_does_not_replace_a_live_entry(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_add_takes_over_an_expired_entry(self):
+        self.cache.set('key', 1, timeout=-1)
+        self.assertTrue(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 2)
+
+    @skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Needs fork.')
+    def test_one_process_wins_each_add(self):
+        context = multiprocessing.get_context('fork')
+        processes, rounds = 6, 30
+        barrier = context.Barrier(processes)
+        wins = context.Value('i', 0)
+        workers = [
+            context.Process(target=race_for_key, args=(self.location, barrier, rounds, wins))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(wins.value, rounds)
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        settings_override = override_settings(
+            METRICS_DB_PATH=str(Path(tmp) / 'metrics.sqlite3'),
+            SLOW_QUERY_THRESHOLD_MS=0,
+            SLOW_QUERY_EXPLAIN=True,
+            MIDDLEWARE=settings.MIDDLEWARE + ['utils.slow_queries.SlowQueryMiddleware'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = make_user(role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        seed_dataset(self.admin, size=2)
+
+    def test_logs_and_keeps_queries_with_view_origin_and_plan(self):
+        with self.assertLogs('utils.slow_queries', 'WARNING') as logs:
+            self.assertEqual(self.api.get('/api/reports/dashboard/').status_code, 200)
+        self.assertTrue(any('reports.views.DashboardStatsView' in line for line in logs.output))
+
+        response = self.api.get('/api/metrics/slow-queries/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertTrue(results)
+        stats = [row for row in results if 'reports/stats.py' in row['origin']]
+        self.assertTrue(stats, [row['origin'] for row in results])
+        self.assertTrue(all(row['view'] == 'reports.views.DashboardStatsView' for row in stats))
+        self.assertTrue(all(row['plan'] for row in stats if row['sql'].startswith('SELECT')))
+
+        self.assertEqual(self.api.delete('/api/metrics/slow-queries/').status_code, 204)
+        self.assertEqual(self.api.get('/api/metrics/slow-queries/').data['results'], [])
+
+    def test_admins_only(self):
+        seller = APIClient()
+        seller.force_authenticate(make_user(role=User.Role.SELLER))
+        self.assertEqual(seller.get('/api/metrics/slow-queries/').status_code, 403)
+
+    def test_explain_plans_selects_only_and_outside_the_wrappers(self):
+        seen = []
+
+        def watch(execute, sql, params, many, context):
+            seen.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(watch):
+            plan = explain(connection, 'SELECT id FROM sales WHERE status = %s', ['COMPLETED'])
+            self.assertEqual(explain(connection, 'UPDATE sales SET notes = %s', ['x']), '')
+        self.assertTrue(plan)
+        self.assertFalse([sql for sql in seen if 'EXPLAIN' in sql], seen)
+
+    def test_parameters_are_not_kept(self):
+        client = make_client(name='Cliente secreto')
+        with self.assertLogs('utils.slow_queries', 'WARNING') as logs, slow_query_log('test'):
+            list(Sale.objects.filter(client__name=client.name))
+        self.assertNotIn('Cliente secreto', '\n'.join(logs.output))
+        rows = get_slow_query_store().top(10)
+        self.assertTrue(rows)
+        self.assertNotIn('params', rows[0])
+        self.assertNotIn('Cliente secreto', repr(rows))
+
+    def test_plan_shows_date_casts_skip_the_index(self):
+        today = timezone.localdate()
+        start = timezone.make_aware(datetime.combine(today, time.min))
+        completed = Sale.objects.filter(status=Sale.Status.COMPLETED)
+        with self.assertLogs('utils.slow_queries', 'WARNING'), slow_query_log('test'):
+            list(completed.filter(completed_at__date=today))
+            list(completed.filter(completed_at__gte=start, completed_at__lt=start + timedelta(days=1)))
+
+        plans = {row['sql']: row['plan'] for row in get_slow_query_store().top(10)}
+        cast, = [plan for sql, plan in plans.items() if 'django_datetime_cast_date' in sql]
+        ranged, = [plan for sql, plan in plans.items() if '"completed_at" <' in sql]
+        self.assertIn('(status=?)', cast)
+        self.assertIn('(status=? AND completed_at>? AND completed_at<?)', ranged)
+
+
+class DateRangeTests(TestCase):
+    def setUp(self):
+        self.admin = make_user(role=User.Role.ADMIN)
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.day = timezone.localdate() - timedelta(days=3)
+        start, end = day_bounds(self.day)
+        client = make_client()
+        self.edges = {}
+        for name, moment in (
+            ('before', start - timedelta(microseconds=1)),
+            ('first', start),
+            ('last', end - timedelta(microseconds=1)),
+            ('after', end),
+        ):
+            sale = make_sale(client, [], self.admin, lines=0)
+            Sale.objects.filter(pk=sale.pk).update(created_at=moment)
+            self.edges[name] = sale.pk
+
+    def test_bounds_are_local_midnights(self):
+        start, end = day_bounds(self.day)
+        self.assertEqual(timezone.localtime(start).time(), time.min)
+        self.assertEqual(end - start, timedelta(days=1))
+        self.assertEqual(start.utcoffset(), timedelta(hours=-6))
+
+    def test_sales_list_keeps_the_whole_local_day(self):
+        day = self.day.isoformat()
+        response = self.api.get(f'/api/sales/?date_from={day}&date_to={day}')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual({row['id'] for row in rows}, {self.edges['first'], self.edges['last']})
+
+    def test_expenses_include_both_ends(self):
+        for offset in range(-1, 3):
+            make_expense(self.admin, date=self.day + timedelta(days=offset))
+        end = self.day + timedelta(days=1)
+        response = self.api.get(f'/api/expenses/?start_date={self.day}&end_date={end}')
+        self.assertEqual([row['date'] for row in response.data], [end.isoformat(), self.day.isoformat()])
+
+    def test_invalid_dates_are_rejected(self):
+        for url in (
+            '/api/sales/?date_from=31/12/2024',
+            '/api/sales/export_pdf/?async=1&date_to=2024-02-30',
+            '/api/quotations/?start_date=ayer',
+            '/api/expenses/export_pdf/?async=1&start_date=2024-13-01',
+            '/api/reports/sales/?end_date=x',
+            '/api/reports/clients/?start_date=2024-05-02&end_date=2024-05-01',
+        ):
+            with self.subTest(url=url):
+                response = self.api.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.data)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_ranges_use_the_indexes(self):
+        date_range = DateRange(self.day, self.day)
+        sales_plan = date_range.filter(Sale.objects.order_by('-created_at'), 'created_at').explain()
+        self.assertIn('sales_created_id_idx', sales_plan)
+        expenses_plan = date_range.filter(Expense.objects.all(), 'date').explain()
+        self.assertIn('expenses_date_created_idx', expenses_plan)
@@ -457,10 +457,10 @@ function SaleModal({ onClose }) {
     try {
       const [clientsRes, productsRes] = await Promise.all([
         clientService.getAll(),
-        productService.getAll()
+        productService.getCatalog()
       ])
       setClients(clientsRes.data.results || clientsRes.data)
-      setProducts(productsRes.data.results || productsRes.data)
+      setProducts(productsRes.data.products)
     } catch (error) {
       console.error('Error loading data:', error)
     }
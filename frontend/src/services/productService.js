@@ -2,6 +2,8 @@ import api from './api'
 
 export const productService = {
   getAll: (params) => api.get('/inventory/products/', { params }),
+  // Every active product in one response; the browser revalidates it with its ETag.
+  getCatalog: () => api.get('/inventory/products/catalog/'),
   getById: (id) => api.get(`/inventory/products/${id}/`),
   create: (data) => api.post('/inventory/products/', data),
   update: (id, data) => api.put(`/inventory/products/${id}/`, data),